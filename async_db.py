@@ -0,0 +1,147 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+class AsyncDatabase:
+    """
+    Fachada assíncrona do Database: as consultas rodam fora do event loop do Discord.
+
+    - Escritas vão para uma única thread escritora (fila FIFO do executor), então nunca
+      disputam o lock de escrita do SQLite entre si e são aplicadas na ordem em que foram pedidas.
+    - Leituras (métodos get_/is_/was_/has_) usam um pool pequeno de threads leitoras; com WAL
+      elas rodam em paralelo com a escrita.
+
+    Qualquer método do Database vira awaitable: `await adb.get_user_accounts(discord_id)`.
+    Os pontos de chamada migram aos poucos: o `db` síncrono continua funcionando em paralelo.
+    """
+
+    READ_PREFIXES = ('get_', 'is_', 'was_', 'has_')
+
+    def __init__(self, db, readers: int = 4):
+        self.db = db
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='db-reader')
+        self._methods: Dict[str, Callable] = {}
+        self.stats = {'reads': 0, 'writes': 0, 'max_read_ms': 0.0, 'max_write_ms': 0.0}
+
+    async def _run(self, kind: str, executor: ThreadPoolExecutor, func: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stats[f'{kind}s'] += 1
+            self.stats[f'max_{kind}_ms'] = max(self.stats[f'max_{kind}_ms'], elapsed_ms)
+
+    async def read(self, func: Callable, *args, **kwargs):
+        """Executa uma função síncrona de leitura no pool de leitores"""
+        return await self._run('read', self._readers, func, *args, **kwargs)
+
+    async def write(self, func: Callable, *args, **kwargs):
+        """Executa uma função síncrona de escrita na thread escritora"""
+        return await self._run('write', self._writer, func, *args, **kwargs)
+
+    def _query(self, sql: str, params: tuple, fetch_one: bool):
+        conn = self.db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            return cursor.fetchone() if fetch_one else cursor.fetchall()
+        finally:
+            conn.close()
+
+    async def fetchall(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """SELECT avulso (somente leitura) no pool de leitores"""
+        return await self.read(self._query, sql, tuple(params), False)
+
+    async def fetchone(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        """SELECT avulso (somente leitura) no pool de leitores, primeira linha"""
+        return await self.read(self._query, sql, tuple(params), True)
+
+    def __getattr__(self, name: str) -> Any:
+        method = self._methods.get(name)
+        if method is not None:
+            return method
+
+        attr = getattr(self.db, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+
+        run = self.read if name.startswith(self.READ_PREFIXES) else self.write
+
+        async def method(*args, **kwargs):
+            return await run(attr, *args, **kwargs)
+
+        method.__name__ = name
+        method.__doc__ = attr.__doc__
+        self._methods[name] = method
+        return method
+
+    def close(self):
+        """Espera as escritas pendentes e encerra as threads"""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+
+    def get_stats(self) -> Dict[str, float]:
+        return {key: round(value, 1) if isinstance(value, float) else value
+                for key, value in self.stats.items()}
+
+
+class LoopLagMonitor:
+    """
+    Mede o atraso do event loop: agenda um sleep curto e compara com o tempo real decorrido.
+    Qualquer código síncrono lento (consulta SQLite no loop, CPU) aparece como atraso.
+    """
+
+    def __init__(self, interval: float = 0.5, report_every: float = 600):
+        self.interval = interval
+        self.report_every = report_every
+        self._task: Optional[asyncio.Task] = None
+        self._reset()
+
+    def _reset(self):
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.slow_ticks = 0  # atrasos acima de 100ms
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        last_report = time.monotonic()
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - started - self.interval)
+
+            self.samples += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag > 0.1:
+                self.slow_ticks += 1
+
+            if time.monotonic() - last_report >= self.report_every:
+                stats = self.get_stats()
+                print(f"⏱️ [Event Loop] Atraso médio {stats['avg_ms']}ms, máximo {stats['max_ms']}ms, "
+                      f"{stats['slow_ticks']} pico(s) acima de 100ms em {stats['samples']} amostras")
+                self._reset()
+                last_report = time.monotonic()
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            'samples': self.samples,
+            'avg_ms': round(self.total_lag / self.samples * 1000, 2) if self.samples else 0.0,
+            'max_ms': round(self.max_lag * 1000, 2),
+            'slow_ticks': self.slow_ticks,
+        }
@@ -3,16 +3,19 @@ from discord import app_commands
 from discord.ext import commands, tasks
 import os
 from dotenv import load_dotenv
-from database import Database
+from database import BRAZIL_TZ, Database
+from async_db import AsyncDatabase, LoopLagMonitor
 from riot_api import RiotAPI
-from datetime import datetime, timezone, timedelta
+from match_cache import MatchCache
+from expiring_map import ExpiringMap
+from poll_scheduler import PollScheduler, POLL_SPECTATOR, POLL_HISTORY
+from scoring import (BAN_IMMEDIATE_SCORE, BAN_STREAK_GAMES, BAN_STREAK_SCORE, DEFAULT_PROFILE,
+                     ScoringProfile, parse_weights, simulate_profiles)
+from datetime import datetime, time
 from typing import Dict, List
 import asyncio
 import json
 
-# Fuso horário do Brasil (UTC-3)
-BRAZIL_TZ = timezone(timedelta(hours=-3))
-
 load_dotenv()
 
 # Lista de campeões do League of Legends para autocomplete
@@ -40,11 +43,55 @@ TOKEN = os.getenv('DISCORD_TOKEN')
 RIOT_API_KEY = os.getenv('RIOT_API_KEY')
 DEFAULT_REGION = os.getenv('DEFAULT_REGION', 'br1')
 
+# Cache de detalhes de partidas (LRU em memória + SQLite comprimido)
+MATCH_CACHE_MEMORY_SIZE = int(os.getenv('MATCH_CACHE_MEMORY_SIZE', '500'))
+MATCH_CACHE_RETENTION_DAYS = int(os.getenv('MATCH_CACHE_RETENTION_DAYS', '120'))
+MATCH_CACHE_MAX_ROWS = int(os.getenv('MATCH_CACHE_MAX_ROWS', '50000'))
+
+# Início da temporada para o backfill de contas novas (YYYY-MM-DD, padrão: 1º de janeiro do ano atual)
+SEASON_START = os.getenv('SEASON_START')
+BACKFILL_PAGE_SIZE = 100
+
+class FlexBot(commands.Bot):
+    async def close(self):
+        """Fecha as sessões HTTP da Riot API e as conexões do banco antes de desligar o bot"""
+        await riot_api.close()
+        loop_lag.stop()
+        print(f"🗄️ [DB] Fachada assíncrona: {adb.get_stats()}")
+        adb.close()
+        # Marcadores "já enviado" ainda na fila de escrita
+        db.flush_sent_markers()
+        db.close()
+        await super().close()
+
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents)
+bot = FlexBot(command_prefix='!', intents=intents)
 db = Database()
-riot_api = RiotAPI(RIOT_API_KEY)
+# Fachada assíncrona: consultas fora do event loop (os pontos de chamada migram aos poucos)
+adb = AsyncDatabase(db)
+loop_lag = LoopLagMonitor()
+match_cache = MatchCache(
+    db,
+    memory_size=MATCH_CACHE_MEMORY_SIZE,
+    retention_days=MATCH_CACHE_RETENTION_DAYS,
+    max_rows=MATCH_CACHE_MAX_ROWS,
+)
+riot_api = RiotAPI(RIOT_API_KEY, match_cache=match_cache)
+poll_scheduler = PollScheduler(db)
+
+# Perfis de pontuação ativos por servidor, já compilados (guild_id -> ScoringProfile)
+guild_scoring_profiles: Dict[str, ScoringProfile] = {}
+
+def get_guild_scoring_profile(guild_id) -> ScoringProfile:
+    """Perfil de pontuação ativo do servidor (perfil padrão se o servidor não tiver um)"""
+    guild_id = str(guild_id)
+    profile = guild_scoring_profiles.get(guild_id)
+    if profile is None:
+        active = db.get_active_scoring_profile(guild_id)
+        profile = ScoringProfile.from_dict(active['name'], active['weights']) if active else DEFAULT_PROFILE
+        guild_scoring_profiles[guild_id] = profile
+    return profile
 
 async def check_command_channel(interaction: discord.Interaction) -> bool:
     """
@@ -250,6 +297,18 @@ class FlexGuideView(discord.ui.View):
         embed.set_footer(text="O bot verifica novas partidas a cada 5 minutos")
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+@bot.event
+async def on_guild_join(guild: discord.Guild):
+    # Volta a um servidor antigo: a configuração salva no banco reaparece na memória
+    db.reload_server_config(str(guild.id))
+    print(f'➕ Bot adicionado ao servidor {guild.name} ({guild.id})')
+
+@bot.event
+async def on_guild_remove(guild: discord.Guild):
+    db.forget_server_config(str(guild.id))
+    guild_scoring_profiles.pop(str(guild.id), None)
+    print(f'➖ Bot removido do servidor {guild.name} ({guild.id})')
+
 @bot.event
 async def on_ready():
     print(f'Bot {bot.user} está online!')
@@ -259,6 +318,17 @@ async def on_ready():
     bot.add_view(FlexGuideView())
     print('✅ Views persistentes registradas')
 
+    loop_lag.start()
+
+    # Configurações dos servidores ficam em memória (canais/cargos lidos sem ir ao SQLite)
+    print(f'⚙️ Configurações carregadas: {db.load_server_configs()} servidor(es)')
+    print(f'🔗 Índice de contas vinculadas: {db.load_account_index()} conta(s)')
+    # Notificações/alertas/live games já feitos ficam em memória (gravados no banco a cada 5s)
+    print(f'📨 Marcadores de envio carregados: {db.load_sent_markers()}')
+
+    match_cache.prune()
+    print(f'🗃️ Cache de partidas: {db.get_match_cache_size()} partidas no SQLite')
+
     try:
         synced = await bot.tree.sync()
         print(f'{len(synced)} comandos sincronizados')
@@ -291,6 +361,17 @@ async def on_ready():
         print('✅ Task de reset semanal Top Flex iniciada (todo dia à 00:00, executa na segunda)')
     else:
         print('⚠️ Task de reset semanal Top Flex já está rodando')
+
+    if not flush_sent_markers.is_running():
+        flush_sent_markers.start()
+        print('✅ Task de gravação dos marcadores de envio iniciada (a cada 5s)')
+
+    # Inicia o backfill do histórico da temporada (retoma jobs interrompidos)
+    if not run_season_backfill.is_running():
+        run_season_backfill.start()
+        print('✅ Task de backfill da temporada iniciada (uma página a cada 15s)')
+    else:
+        print('⚠️ Task de backfill da temporada já está rodando')
     
 
 async def region_autocomplete(
@@ -401,11 +482,13 @@ async def logar(interaction: discord.Interaction, riot_id: str, regiao: str = DE
         if new_account:
             try:
                 # Busca última partida sem processar (só para marcar como vista)
-                match_ids = await riot_api.get_match_history(account['puuid'], regiao, count=5)
+                match_ids = await riot_api.get_match_history(account['puuid'], regiao, count=5,
+                                                             priority=riot_api.PRIORITY_INTERACTIVE)
                 if match_ids and len(match_ids) > 0:
                     # Procura a primeira partida de Ranked Flex
                     for match_id in match_ids:
-                        match_data = await riot_api.get_match_details(match_id, regiao)
+                        match_data = await riot_api.get_match_details(match_id, regiao,
+                                                                      priority=riot_api.PRIORITY_INTERACTIVE)
                         if match_data:
                             queue_id = match_data.get('info', {}).get('queueId', 0)
                             if queue_id == 440:
@@ -419,6 +502,10 @@ async def logar(interaction: discord.Interaction, riot_id: str, regiao: str = DE
             except Exception as e:
                 print(f"⚠️ Erro ao marcar última partida: {e}")
                 # Não interrompe o fluxo se houver erro
+
+            # Agenda a importação das partidas de Flex da temporada (roda em segundo plano)
+            db.create_backfill_job(new_account['id'], get_season_start_timestamp(),
+                                   int(datetime.now().timestamp()))
         
         embed = discord.Embed(
             title="✅ Conta Vinculada!",
@@ -435,7 +522,7 @@ async def logar(interaction: discord.Interaction, riot_id: str, regiao: str = DE
             inline=True
         )
         
-        embed.set_footer(text="O bot começará a monitorar apenas suas PRÓXIMAS partidas de Flex!")
+        embed.set_footer(text="As partidas de Flex da temporada serão importadas em segundo plano (acompanhe em /contas)")
         await interaction.followup.send(embed=embed, ephemeral=True)
     else:
         await interaction.followup.send(f"❌ {message}", ephemeral=True)
@@ -465,9 +552,19 @@ async def contas(interaction: discord.Interaction):
     )
     
     for i, account in enumerate(accounts, 1):
+        value = f"🌍 Região: {account['region'].upper()}\n📅 Vinculada em: {account['created_at'][:10]}"
+
+        backfill = db.get_backfill_job(account['id'])
+        if backfill:
+            if backfill['status'] == 'done':
+                value += f"\n📥 Temporada importada: {backfill['saved']} partida(s) de Flex"
+            else:
+                value += (f"\n📥 Importando temporada: {backfill['processed']} partida(s) verificada(s), "
+                          f"{backfill['saved']} salva(s)...")
+
         embed.add_field(
             name=f"{i}. {account['summoner_name']}",
-            value=f"🌍 Região: {account['region'].upper()}\n📅 Vinculada em: {account['created_at'][:10]}",
+            value=value,
             inline=False
         )
     
@@ -518,6 +615,7 @@ async def deslogar(interaction: discord.Interaction, conta: str):
     success = db.unlink_lol_account(int(conta))
     
     if success:
+        poll_scheduler.forget(int(conta))
         await interaction.followup.send(
             f"✅ **Conta desvinculada com sucesso!**\n\n"
             f"🎮 **{account_to_remove['summoner_name']}** ({account_to_remove['region'].upper()})\n\n"
@@ -1089,7 +1187,7 @@ async def perfil(interaction: discord.Interaction, usuario: discord.User = None,
     await interaction.response.defer()
     
     # Define o ano (padrão: ano atual)
-    current_year = datetime.now().year
+    current_year = datetime.now(BRAZIL_TZ).year
     year = ano if ano else current_year
     
     # Define o usuário alvo
@@ -1302,7 +1400,7 @@ async def champinfo(interaction: discord.Interaction, usuario: discord.User, cam
     await interaction.response.defer()
     
     discord_id = str(usuario.id)
-    current_year = datetime.now().year
+    current_year = datetime.now(BRAZIL_TZ).year
     
     # Busca estatísticas do campeão
     champ_stats = db.get_champion_stats(discord_id, campeao, current_year)
@@ -1319,7 +1417,7 @@ async def champinfo(interaction: discord.Interaction, usuario: discord.User, cam
     
     # Busca Carry Score e posição atual
     from datetime import timedelta
-    today = datetime.now()
+    today = datetime.now(BRAZIL_TZ)
     days_since_monday = today.weekday()
     week_start = (today - timedelta(days=days_since_monday)).replace(hour=0, minute=0, second=0, microsecond=0)
     week_end = (week_start + timedelta(days=6)).replace(hour=23, minute=59, second=59)
@@ -1454,7 +1552,7 @@ async def tops_flex(interaction: discord.Interaction):
     
     # Calcula início e fim da semana atual (segunda a domingo)
     from datetime import timedelta
-    today = datetime.now()
+    today = datetime.now(BRAZIL_TZ)
     # Encontra a segunda-feira desta semana
     days_since_monday = today.weekday()
     week_start = (today - timedelta(days=days_since_monday)).replace(hour=0, minute=0, second=0, microsecond=0)
@@ -1463,8 +1561,10 @@ async def tops_flex(interaction: discord.Interaction):
     week_start_str = week_start.strftime('%Y-%m-%d')
     week_end_str = week_end.strftime('%Y-%m-%d')
     
-    # Busca ranking da semana
-    ranking = db.get_weekly_carry_score_ranking(week_start_str, week_end_str, limit=10)
+    # Busca ranking da semana e a posição de quem usou o comando (uma consulta)
+    leaderboard = await adb.get_weekly_leaderboard('carry', week_start_str, week_end_str,
+                                                   str(interaction.user.id), limit=10)
+    ranking = leaderboard['ranking']
     
     embed = discord.Embed(
         title="🏆 TOP FLEX - RANKING SEMANAL",
@@ -1484,8 +1584,9 @@ async def tops_flex(interaction: discord.Interaction):
         )
     else:
         ranking_text = ""
-        for i, player in enumerate(ranking, 1):
-            # Emoji de posição
+        for player in ranking:
+            # Emoji de posição (empatados ficam na mesma posição)
+            i = player['position']
             if i == 1:
                 pos_emoji = "👑"
             elif i == 2:
@@ -1502,6 +1603,15 @@ async def tops_flex(interaction: discord.Interaction):
             value=ranking_text,
             inline=False
         )
+        
+        # Posição de quem usou o comando, se não aparece no top 10
+        me = leaderboard['player']
+        if me['position'] and all(player['discord_id'] != str(interaction.user.id) for player in ranking):
+            embed.add_field(
+                name="📍 Sua Posição",
+                value=f"**{me['position']}º** de {me['total_participants']} - **{me['total_score']}** pontos",
+                inline=False
+            )
     
     # Mostra último vencedor
     guild_id = str(interaction.guild_id)
@@ -1535,7 +1645,7 @@ async def piorzin(interaction: discord.Interaction):
     
     # Calcula início e fim da semana atual (segunda a domingo)
     from datetime import timedelta
-    today = datetime.now()
+    today = datetime.now(BRAZIL_TZ)
     days_since_monday = today.weekday()
     week_start = (today - timedelta(days=days_since_monday)).replace(hour=0, minute=0, second=0, microsecond=0)
     week_end = (week_start + timedelta(days=6)).replace(hour=23, minute=59, second=59)
@@ -1543,8 +1653,10 @@ async def piorzin(interaction: discord.Interaction):
     week_start_str = week_start.strftime('%Y-%m-%d')
     week_end_str = week_end.strftime('%Y-%m-%d')
     
-    # Busca ranking da semana
-    ranking = db.get_weekly_piorzin_score_ranking(week_start_str, week_end_str, limit=10)
+    # Busca ranking da semana e a posição de quem usou o comando (uma consulta)
+    leaderboard = await adb.get_weekly_leaderboard('piorzin', week_start_str, week_end_str,
+                                                   str(interaction.user.id), limit=10)
+    ranking = leaderboard['ranking']
     
     embed = discord.Embed(
         title="💀 PIORZIN - RANKING SEMANAL",
@@ -1564,8 +1676,9 @@ async def piorzin(interaction: discord.Interaction):
         )
     else:
         ranking_text = ""
-        for i, player in enumerate(ranking, 1):
-            # Emoji de posição
+        for player in ranking:
+            # Emoji de posição (empatados ficam na mesma posição)
+            i = player['position']
             if i == 1:
                 pos_emoji = "💀"
             elif i == 2:
@@ -1582,6 +1695,15 @@ async def piorzin(interaction: discord.Interaction):
             value=ranking_text,
             inline=False
         )
+        
+        # Posição de quem usou o comando, se não aparece no top 10
+        me = leaderboard['player']
+        if me['position'] and all(player['discord_id'] != str(interaction.user.id) for player in ranking):
+            embed.add_field(
+                name="📍 Sua Posição",
+                value=f"**{me['position']}º** de {me['total_participants']} - **{me['total_score']}** pontos",
+                inline=False
+            )
     
     # Mostra último vencedor
     guild_id = str(interaction.guild_id)
@@ -2252,6 +2374,159 @@ async def reset_scores(interaction: discord.Interaction, tipo: str):
     view = ConfirmResetScoresView(tipo)
     await interaction.followup.send(embed=embed, view=view, ephemeral=True)
 
+def format_profile_weights(profile: ScoringProfile) -> str:
+    """Pesos do perfil em texto (percentuais) para os embeds"""
+    labels = {'kda': 'KDA', 'kp': 'KP', 'damage': 'Dano', 'gold': 'Gold', 'cs': 'CS', 'vision': 'Visão'}
+    lines = []
+    for title, weights in (("⚔️ Carry", profile.carry_weights), ("🛡️ Suporte", profile.support_weights)):
+        parts = [f"{labels[metric]} {weights[metric] * 100:.0f}%" for metric in labels]
+        lines.append(f"**{title}:** " + " | ".join(parts))
+    return "\n".join(lines)
+
+@bot.tree.command(name="perfil_score", description="🧮 [ADMIN] Perfis de pontuação do MVP Score do servidor")
+@app_commands.describe(
+    acao="O que fazer",
+    nome="Nome do perfil",
+    carry="Pesos dos carries, ex: 'kda=35 dano=30 gold=15 kp=10 cs=5 visao=5' (omitidos mantêm o valor atual)",
+    suporte="Pesos do suporte, ex: 'visao=30 kp=25' (omitidos mantêm o valor atual)",
+    partidas="Quantidade de partidas recentes usadas na simulação"
+)
+@app_commands.choices(acao=[
+    app_commands.Choice(name="📋 Ver perfis e o perfil ativo", value="ver"),
+    app_commands.Choice(name="✏️ Criar/editar perfil", value="criar"),
+    app_commands.Choice(name="🔮 Simular perfil nas últimas partidas", value="simular"),
+    app_commands.Choice(name="✅ Ativar perfil", value="ativar"),
+    app_commands.Choice(name="↩️ Voltar ao perfil padrão", value="padrao"),
+    app_commands.Choice(name="🗑️ Remover perfil", value="remover")
+])
+@app_commands.checks.has_permissions(administrator=True)
+async def perfil_score(interaction: discord.Interaction, acao: str, nome: str = None,
+                       carry: str = None, suporte: str = None, partidas: int = 50):
+    """[ADMIN] Gerencia os perfis de pontuação do servidor e simula o impacto antes de ativar"""
+    await interaction.response.defer(ephemeral=True)
+    guild_id = str(interaction.guild_id)
+    active = get_guild_scoring_profile(guild_id)
+
+    if acao != "ver" and acao != "padrao" and not nome:
+        await interaction.followup.send("❌ Informe o **nome** do perfil.", ephemeral=True)
+        return
+    if nome and nome.lower() == DEFAULT_PROFILE.name:
+        if acao not in ("ver", "simular"):
+            await interaction.followup.send(f"❌ O perfil **{DEFAULT_PROFILE.name}** é fixo e não pode ser alterado.", ephemeral=True)
+            return
+
+    if acao == "ver":
+        profiles = db.get_scoring_profiles(guild_id)
+        embed = discord.Embed(
+            title="🧮 Perfis de Pontuação",
+            description=f"Perfil ativo: **{active.name}**",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name=f"📌 {DEFAULT_PROFILE.name} (fixo)", value=format_profile_weights(DEFAULT_PROFILE), inline=False)
+        for stored in profiles[:20]:
+            profile = ScoringProfile.from_dict(stored['name'], stored['weights'])
+            embed.add_field(name=f"🧮 {profile.name}", value=format_profile_weights(profile), inline=False)
+        embed.set_footer(text="Os scores salvos e as restrições de campeão usam sempre o perfil padrão")
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        return
+
+    if acao == "criar":
+        stored = db.get_scoring_profile(guild_id, nome)
+        base = ScoringProfile.from_dict(nome, stored) if stored else DEFAULT_PROFILE
+        try:
+            carry_weights = parse_weights(carry, base.carry_weights) if carry else base.carry_weights
+            support_weights = parse_weights(suporte, base.support_weights) if suporte else base.support_weights
+        except ValueError as e:
+            await interaction.followup.send(f"❌ {e}", ephemeral=True)
+            return
+
+        profile = ScoringProfile(nome, support_weights, carry_weights)
+        if not db.save_scoring_profile(guild_id, nome, profile.to_dict(), str(interaction.user.id)):
+            await interaction.followup.send("❌ Erro ao salvar o perfil.", ephemeral=True)
+            return
+        guild_scoring_profiles.pop(guild_id, None)
+
+        embed = discord.Embed(
+            title=f"✏️ Perfil '{nome}' salvo",
+            description=format_profile_weights(profile),
+            color=discord.Color.green()
+        )
+        embed.set_footer(text="Use /perfil_score simular para ver o impacto antes de ativar")
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        print(f"🧮 [Perfil Score] {interaction.user.name} salvou o perfil '{nome}' no servidor {guild_id}")
+        return
+
+    if acao == "padrao":
+        db.set_active_scoring_profile(guild_id, None)
+        guild_scoring_profiles.pop(guild_id, None)
+        await interaction.followup.send(f"↩️ Servidor voltou ao perfil **{DEFAULT_PROFILE.name}**.", ephemeral=True)
+        return
+
+    if nome.lower() == DEFAULT_PROFILE.name:
+        candidate = DEFAULT_PROFILE
+    else:
+        stored = db.get_scoring_profile(guild_id, nome)
+        if not stored:
+            await interaction.followup.send(f"❌ Perfil **{nome}** não encontrado.", ephemeral=True)
+            return
+        candidate = ScoringProfile.from_dict(nome, stored)
+
+    if acao == "ativar":
+        db.set_active_scoring_profile(guild_id, nome)
+        guild_scoring_profiles.pop(guild_id, None)
+        await interaction.followup.send(f"✅ Perfil **{nome}** ativado neste servidor.", ephemeral=True)
+        print(f"🧮 [Perfil Score] {interaction.user.name} ativou o perfil '{nome}' no servidor {guild_id}")
+        return
+
+    if acao == "remover":
+        db.delete_scoring_profile(guild_id, nome)
+        guild_scoring_profiles.pop(guild_id, None)
+        await interaction.followup.send(f"🗑️ Perfil **{nome}** removido.", ephemeral=True)
+        return
+
+    # Simulação: mesmas partidas pontuadas com o perfil ativo e com o candidato
+    partidas = max(1, min(partidas, 500))
+    discord_ids = list({account['discord_id'] for account in db.get_all_lol_accounts()
+                        if interaction.guild.get_member(int(account['discord_id']))})
+    games = db.get_recent_scoring_games(discord_ids, limit=partidas)
+    if not games:
+        await interaction.followup.send("❌ Nenhuma partida completa salva para simular.", ephemeral=True)
+        return
+
+    result = simulate_profiles(games, active, candidate)
+    ranking = result['ranking']
+
+    embed = discord.Embed(
+        title=f"🔮 Simulação: {active.name} → {candidate.name}",
+        description=(
+            f"**{result['games']}** partida(s) recentes | "
+            f"**{result['changed_placements']}** colocação(ões) de jogadores do servidor mudariam"
+        ),
+        color=discord.Color.purple()
+    )
+
+    ordered = sorted(ranking.items(), key=lambda item: item[1]['candidate_position'])
+    lines = []
+    for discord_id, player in ordered[:10]:
+        member = interaction.guild.get_member(int(discord_id))
+        name = member.display_name if member else discord_id
+        shift = player['current_position'] - player['candidate_position']
+        arrow = f"⬆️{shift}" if shift > 0 else f"⬇️{-shift}" if shift < 0 else "➖"
+        lines.append(f"**{player['candidate_position']}º** {name} — {player['current']} → "
+                     f"**{player['candidate']}** {arrow} ({player['games']} partidas)")
+    embed.add_field(name="🏆 Ranking por média de MVP Score", value="\n".join(lines) or "Sem dados", inline=False)
+
+    current_bans, candidate_bans = result['bans']['current'], result['bans']['candidate']
+    ban_text = (
+        f"Perfil atual: **{len(current_bans)}** restrição(ões)\n"
+        f"Novo perfil: **{len(candidate_bans)}** restrição(ões)\n"
+        f"➕ Novas: **{len(candidate_bans - current_bans)}** | ➖ Deixariam de acontecer: **{len(current_bans - candidate_bans)}**"
+    )
+    embed.add_field(name="🚫 Restrições de campeão disparadas", value=ban_text, inline=False)
+    embed.add_field(name=f"🧮 Pesos de {candidate.name}", value=format_profile_weights(candidate), inline=False)
+    embed.set_footer(text="Nada foi alterado. Use /perfil_score ativar para aplicar o perfil.")
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
 async def send_match_notification(lol_account_id: int, stats: Dict):
     """
     Envia notificação INDIVIDUAL quando uma partida termina.
@@ -2612,8 +2887,8 @@ async def check_champion_performance(account_id: int, champion_name: str, mvp_sc
             SELECT mvp_score FROM matches
             WHERE lol_account_id = ? AND champion_name = ?
             ORDER BY played_at DESC
-            LIMIT 3
-        ''', (account_id, champion_name))
+            LIMIT ?
+        ''', (account_id, champion_name, BAN_STREAK_GAMES))
         recent_matches = cursor.fetchall()
         conn.close()
         
@@ -2623,20 +2898,20 @@ async def check_champion_performance(account_id: int, champion_name: str, mvp_sc
         ban_reason = ""
         
         # Regra 1: MVP < 35 = ban imediato
-        if mvp_score < 35:
+        if mvp_score < BAN_IMMEDIATE_SCORE:
             should_ban = True
-            ban_reason = f"MVP Score {mvp_score} (abaixo de 35)"
-            print(f"🚫 [ChampBan] REGRA 1 ATIVADA: MVP {mvp_score} < 35 - Aplicando restrição!")
+            ban_reason = f"MVP Score {mvp_score} (abaixo de {BAN_IMMEDIATE_SCORE})"
+            print(f"🚫 [ChampBan] REGRA 1 ATIVADA: MVP {mvp_score} < {BAN_IMMEDIATE_SCORE} - Aplicando restrição!")
         
         # Regra 2: 3 partidas consecutivas com MVP < 45
-        elif len(recent_matches) >= 3:
-            all_below_45 = all(m[0] < 45 for m in recent_matches)
-            print(f"   Verificando regra 2: {len(recent_matches)} partidas, todas < 45? {all_below_45}")
+        elif len(recent_matches) >= BAN_STREAK_GAMES:
+            all_below_45 = all(m[0] < BAN_STREAK_SCORE for m in recent_matches)
+            print(f"   Verificando regra 2: {len(recent_matches)} partidas, todas < {BAN_STREAK_SCORE}? {all_below_45}")
             if all_below_45:
                 should_ban = True
                 scores = [m[0] for m in recent_matches]
-                ban_reason = f"3 partidas consecutivas abaixo de 45 ({scores})"
-                print(f"🚫 [ChampBan] REGRA 2 ATIVADA: 3 partidas < 45 - Aplicando restrição!")
+                ban_reason = f"{BAN_STREAK_GAMES} partidas consecutivas abaixo de {BAN_STREAK_SCORE} ({scores})"
+                print(f"🚫 [ChampBan] REGRA 2 ATIVADA: {BAN_STREAK_GAMES} partidas < {BAN_STREAK_SCORE} - Aplicando restrição!")
         else:
             print(f"   Regra 2 não aplicável: apenas {len(recent_matches)} partida(s)")
         
@@ -2710,31 +2985,23 @@ async def update_live_game_result(game_id: str, match_data: Dict):
         conn = db.get_connection()
         cursor = conn.cursor()
         
-        # Debug: Lista todos os game_ids ativos
-        cursor.execute('SELECT game_id, message_id, puuid FROM live_games_notified WHERE message_id IS NOT NULL')
-        all_games = cursor.fetchall()
-        print(f"🔍 [Live Update DEBUG] Games ativos no banco ({len(all_games)} encontrados):")
-        for g in all_games:
-            print(f"   - Game ID: {g[0]} (tipo: {type(g[0])}), Message ID: {g[1]}, PUUID: {g[2][:20]}...")
-        
         # Busca PUUIDs dos participantes da partida
         match_puuids = [p['puuid'] for p in match_data['info']['participants']]
         print(f"🔍 [Live Update] PUUIDs da partida terminada ({len(match_puuids)} jogadores):")
         for i, p in enumerate(match_puuids[:3]):
             print(f"   {i+1}. {p[:30]}...")
         
-        # Busca TODAS as mensagens relacionadas a esta partida (por PUUIDs dos participantes)
-        print(f"🔍 [Live Update] Buscando mensagens por PUUIDs da partida...")
-        placeholders = ','.join('?' * len(match_puuids))
-        query = f'''
-            SELECT DISTINCT message_id, channel_id, guild_id, lol_account_id, game_id
-            FROM live_games_notified
-            WHERE puuid IN ({placeholders})
-              AND message_id IS NOT NULL
-            ORDER BY notified_at DESC
-        '''
-        cursor.execute(query, match_puuids)
-        results = cursor.fetchall()
+        # Só contas vinculadas recebem live game: o índice em memória separa os jogadores do bot
+        linked_accounts = db.get_linked_accounts(match_puuids)
+        
+        # Busca TODAS as mensagens relacionadas a esta partida (por PUUIDs dos jogadores do bot)
+        results = []
+        if linked_accounts:
+            print(f"🔍 [Live Update] Buscando mensagens de {len(linked_accounts)} jogador(es) do bot...")
+            linked_puuids = list(linked_accounts)
+            placeholders = ','.join('?' * len(linked_puuids))
+            cursor.execute(db.LIVE_GAME_MESSAGES_SQL.format(placeholders=placeholders), linked_puuids)
+            results = cursor.fetchall()
 
         if results:
             # Processa TODAS as mensagens encontradas (não apenas a primeira)
@@ -2753,17 +3020,13 @@ async def update_live_game_result(game_id: str, match_data: Dict):
                 print(f"🔄 [Live Update] Processando mensagem {message_id} para conta {lol_account_id}...")
 
                 # Busca informações da conta para pegar summoner_name e region
-                cursor.execute('''
-                    SELECT summoner_name, region FROM lol_accounts
-                    WHERE id = ?
-                ''', (lol_account_id,))
-                account_info = cursor.fetchone()
+                account_info = db.get_indexed_account(lol_account_id)
 
                 if not account_info:
                     print(f"⚠️ [Live Update] Informações da conta {lol_account_id} não encontradas")
                     continue
 
-                summoner_name, region = account_info
+                summoner_name, region = account_info['summoner_name'], account_info['region']
 
                 print(f"✅ [Live Update] Mensagem encontrada - ID: {message_id}, Canal: {channel_id}, Servidor: {guild_id}")
 
@@ -2867,67 +3130,18 @@ async def update_live_game_result(game_id: str, match_data: Dict):
                 # Calcula MVP score de todos os jogadores para determinar colocações únicas
                 all_players_with_scores = []
 
-                # Usa a instância global da RiotAPI que já foi inicializada com a chave
-                # riot = RiotAPI()  # <- linha removida, estava causando erro
-                # A variável global 'riot_api' já está disponível e inicializada com a chave
-
-                # Prepara dados globais para cálculo
-                all_kdas = [(pl['kills'] + pl['assists']) / max(pl['deaths'], 1) for pl in participants]
-                all_damages = [pl.get('totalDamageDealtToChampions', 0) for pl in participants]
-                all_golds = [pl.get('goldEarned', 0) for pl in participants]
-                all_cs_list = [pl.get('totalMinionsKilled', 0) + pl.get('neutralMinionsKilled', 0) for pl in participants]
-                all_visions = [pl.get('visionScore', 0) for pl in participants]
-
-                team_1_kills = sum(pl['kills'] for pl in participants if pl['teamId'] == 100)
-                team_2_kills = sum(pl['kills'] for pl in participants if pl['teamId'] == 200)
-                all_kps = [
-                    (pl['kills'] + pl['assists']) / max(team_1_kills if pl['teamId'] == 100 else team_2_kills, 1)
-                    for pl in participants
-                ]
-
-                all_players_stats = {
-                    'all_kdas': all_kdas,
-                    'all_kps': all_kps,
-                    'all_damages': all_damages,
-                    'all_golds': all_golds,
-                    'all_cs': all_cs_list,
-                    'all_visions': all_visions
-                }
-
-                for p in participants:
-                    p_team_id = p['teamId']
-                    p_team_kills = sum(
-                        pl['kills'] for pl in participants if pl['teamId'] == p_team_id
-                    )
-                    p_kda = (p['kills'] + p['assists']) / max(p['deaths'], 1)
-                    p_kp = (p['kills'] + p['assists']) / max(p_team_kills, 1)
-                    p_damage = p.get('totalDamageDealtToChampions', 0)
-                    p_gold = p.get('goldEarned', 0)
-                    p_cs = p.get('totalMinionsKilled', 0) + p.get('neutralMinionsKilled', 0)
-                    p_vision = p.get('visionScore', 0)
-                    p_role = p.get('teamPosition', '') or p.get('individualPosition', 'MIDDLE')
-
-                    player_stats = {
-                        'kda': p_kda,
-                        'kill_participation': p_kp,
-                        'total_damage_to_champions': p_damage,
-                        'gold_earned': p_gold,
-                        'total_minions_killed': p.get('totalMinionsKilled', 0),
-                        'neutral_minions_killed': p.get('neutralMinionsKilled', 0),
-                        'vision_score': p_vision,
-                        'win': p.get('win', False)
-                    }
-
-                    mvp_score, _ = riot_api.calculate_mvp_score(player_stats, all_players_stats, p_role)
-
+                # Scoreboard dos 10 jogadores no perfil de pontuação do servidor
+                # (no perfil padrão é o mesmo já usado ao salvar as estatísticas da partida)
+                scoreboard = riot_api.get_scoreboard(match_data, profile=get_guild_scoring_profile(guild_id))
+                for entry in scoreboard['players']:
                     all_players_with_scores.append({
-                        'player': p,
-                        'mvp_score': mvp_score,
-                        'kda': p_kda,
-                        'kp': p_kp * 100,
-                        'cs': p_cs,
-                        'damage': p_damage,
-                        'puuid': p['puuid']
+                        'player': entry['player'],
+                        'mvp_score': entry['mvp_score'],
+                        'kda': entry['kda'],
+                        'kp': entry['kp'] * 100,
+                        'cs': entry['cs'],
+                        'damage': entry['damage'],
+                        'puuid': entry['puuid']
                     })
 
                 # Ordena por MVP score para determinar colocações únicas
@@ -3074,12 +3288,10 @@ async def update_live_game_result(game_id: str, match_data: Dict):
                         # Inclui informações da partida para exibir na votação
                         voting_players = []
                         for puuid in match_puuids:
-                            cursor.execute('''
-                                SELECT la.id, la.discord_id, la.summoner_name
-                                FROM lol_accounts la
-                                WHERE la.puuid = ?
-                            ''', (puuid,))
-                            player_info = cursor.fetchone()
+                            # Primeira conta vinculada com o puuid (menor id, como o SELECT antigo)
+                            accounts = linked_accounts.get(puuid)
+                            player_info = (accounts[0]['id'], accounts[0]['discord_id'],
+                                           accounts[0]['summoner_name']) if accounts else None
                             if player_info:
                                 # Busca dados da partida deste jogador
                                 player_match_data = next(
@@ -3305,19 +3517,15 @@ class MVPVotingView(discord.ui.View):
                     )
                     return
                 
-                # Verifica se já votou
-                existing_votes = db.get_votes_for_game(self.game_id)
-                already_voted = any(v['voter'] == voter_id for v in existing_votes)
-                if already_voted:
+                # Registra o voto; o UNIQUE(game_id, voter) garante um voto por jogador
+                # mesmo com cliques simultâneos (sem ler antes de gravar)
+                if not await adb.add_mvp_vote(self.game_id, voter_id, voted_id):
                     await interaction.response.send_message(
                         "❌ Você já votou nesta partida!",
                         ephemeral=True
                     )
                     return
                 
-                # Registra o voto
-                db.add_mvp_vote(self.game_id, voter_id, voted_id)
-                
                 vote_type = "MVP" if self.is_victory else "Piorzin"
                 await interaction.response.send_message(
                     f"✅ Você votou em **{summoner_name}** como {vote_type}!",
@@ -3325,7 +3533,7 @@ class MVPVotingView(discord.ui.View):
                 )
                 
                 # Verifica se todos votaram
-                votes = db.get_votes_for_game(self.game_id)
+                votes = await adb.get_votes_for_game(self.game_id)
                 total_players = len(self.players)
                 max_votes = total_players  # Cada jogador pode votar 1x
                 
@@ -3349,7 +3557,7 @@ class MVPVotingView(discord.ui.View):
     async def finalize_voting(self, interaction: discord.Interaction):
         """Finaliza a votação e distribui carry score (vitória) ou piorzin score (derrota)"""
         try:
-            vote_counts = db.get_vote_count_for_game(self.game_id)
+            vote_counts = await adb.get_vote_count_for_game(self.game_id)
             
             if not vote_counts:
                 return
@@ -3372,9 +3580,9 @@ class MVPVotingView(discord.ui.View):
                 # Voto unânime - +5
                 winner_id = sorted_votes[0][0]
                 if self.is_victory:
-                    db.add_carry_score(winner_id, self.game_id, 5, f"Voto unânime de {vote_type}")
+                    await adb.add_carry_score(winner_id, self.game_id, 5, f"Voto unânime de {vote_type}")
                 else:
-                    db.add_piorzin_score(winner_id, self.game_id, 5, f"Voto unânime de {vote_type}")
+                    await adb.add_piorzin_score(winner_id, self.game_id, 5, f"Voto unânime de {vote_type}")
                 results_text += f"👑 **VOTO UNÂNIME!** <@{winner_id}> recebeu **+5 {score_name}**!"
             else:
                 # Distribui pontos normalmente
@@ -3387,17 +3595,17 @@ class MVPVotingView(discord.ui.View):
                     # Empate no primeiro lugar - +2 cada
                     for winner_id in first_place_winners:
                         if self.is_victory:
-                            db.add_carry_score(winner_id, self.game_id, 2, f"Empate em 1º lugar {vote_type}")
+                            await adb.add_carry_score(winner_id, self.game_id, 2, f"Empate em 1º lugar {vote_type}")
                         else:
-                            db.add_piorzin_score(winner_id, self.game_id, 2, f"Empate em 1º lugar {vote_type}")
+                            await adb.add_piorzin_score(winner_id, self.game_id, 2, f"Empate em 1º lugar {vote_type}")
                         results_text += f"🥇 <@{winner_id}> - **{first_place_votes} votos** → **+2 {score_name}** (empate)\n"
                 else:
                     # Primeiro lugar único - +3
                     winner_id = first_place_winners[0]
                     if self.is_victory:
-                        db.add_carry_score(winner_id, self.game_id, 3, f"1º lugar {vote_type}")
+                        await adb.add_carry_score(winner_id, self.game_id, 3, f"1º lugar {vote_type}")
                     else:
-                        db.add_piorzin_score(winner_id, self.game_id, 3, f"1º lugar {vote_type}")
+                        await adb.add_piorzin_score(winner_id, self.game_id, 3, f"1º lugar {vote_type}")
                     results_text += f"🥇 <@{winner_id}> - **{first_place_votes} votos** → **+3 {score_name}**\n"
                     
                     # Segundo lugar - +2 se tiver 2+ votos, +1 se tiver 1 voto
@@ -3408,20 +3616,20 @@ class MVPVotingView(discord.ui.View):
                         for second_id in second_place_winners:
                             if second_place_votes >= 2:
                                 if self.is_victory:
-                                    db.add_carry_score(second_id, self.game_id, 2, f"2º lugar {vote_type} (2+ votos)")
+                                    await adb.add_carry_score(second_id, self.game_id, 2, f"2º lugar {vote_type} (2+ votos)")
                                 else:
-                                    db.add_piorzin_score(second_id, self.game_id, 2, f"2º lugar {vote_type} (2+ votos)")
+                                    await adb.add_piorzin_score(second_id, self.game_id, 2, f"2º lugar {vote_type} (2+ votos)")
                                 results_text += f"🥈 <@{second_id}> - **{second_place_votes} votos** → **+2 {score_name}**\n"
                             else:
                                 # 1 voto = +1 ponto
                                 if self.is_victory:
-                                    db.add_carry_score(second_id, self.game_id, 1, f"2º lugar {vote_type} (1 voto)")
+                                    await adb.add_carry_score(second_id, self.game_id, 1, f"2º lugar {vote_type} (1 voto)")
                                 else:
-                                    db.add_piorzin_score(second_id, self.game_id, 1, f"2º lugar {vote_type} (1 voto)")
+                                    await adb.add_piorzin_score(second_id, self.game_id, 1, f"2º lugar {vote_type} (1 voto)")
                                 results_text += f"🥈 <@{second_id}> - **{second_place_votes} voto** → **+1 {score_name}**\n"
             
             # Fecha a votação
-            db.close_pending_vote(self.game_id, self.guild_id)
+            await adb.close_pending_vote(self.game_id, self.guild_id)
             
             # Atualiza a mensagem original
             embed = discord.Embed(
@@ -3448,7 +3656,7 @@ class MVPVotingView(discord.ui.View):
         try:
             print(f"⏰ [Votação] Timeout atingido para partida {self.game_id}")
             
-            vote_counts = db.get_vote_count_for_game(self.game_id)
+            vote_counts = await adb.get_vote_count_for_game(self.game_id)
             total_voters = len(self.players)
             unanimous_threshold = total_voters - 1 if total_voters > 1 else 1
             
@@ -3470,9 +3678,9 @@ class MVPVotingView(discord.ui.View):
                     if len(sorted_votes) == 1 and sorted_votes[0][1] >= unanimous_threshold:
                         winner_id = sorted_votes[0][0]
                         if self.is_victory:
-                            db.add_carry_score(winner_id, self.game_id, 5, f"Voto unânime de {vote_type} (timeout)")
+                            await adb.add_carry_score(winner_id, self.game_id, 5, f"Voto unânime de {vote_type} (timeout)")
                         else:
-                            db.add_piorzin_score(winner_id, self.game_id, 5, f"Voto unânime de {vote_type} (timeout)")
+                            await adb.add_piorzin_score(winner_id, self.game_id, 5, f"Voto unânime de {vote_type} (timeout)")
                         results_text += f"👑 **VOTO UNÂNIME!** <@{winner_id}> recebeu **+5 {score_name}**!"
                     else:
                         # Encontra todos os empatados em primeiro
@@ -3482,17 +3690,17 @@ class MVPVotingView(discord.ui.View):
                             # Empate no primeiro lugar - +2 cada
                             for winner_id in first_place_winners:
                                 if self.is_victory:
-                                    db.add_carry_score(winner_id, self.game_id, 2, f"Empate em 1º lugar {vote_type} (timeout)")
+                                    await adb.add_carry_score(winner_id, self.game_id, 2, f"Empate em 1º lugar {vote_type} (timeout)")
                                 else:
-                                    db.add_piorzin_score(winner_id, self.game_id, 2, f"Empate em 1º lugar {vote_type} (timeout)")
+                                    await adb.add_piorzin_score(winner_id, self.game_id, 2, f"Empate em 1º lugar {vote_type} (timeout)")
                                 results_text += f"🥇 <@{winner_id}> - **{first_place_votes} votos** → **+2 {score_name}**\n"
                         else:
                             # Primeiro lugar único - +3
                             winner_id = first_place_winners[0]
                             if self.is_victory:
-                                db.add_carry_score(winner_id, self.game_id, 3, f"1º lugar {vote_type} (timeout)")
+                                await adb.add_carry_score(winner_id, self.game_id, 3, f"1º lugar {vote_type} (timeout)")
                             else:
-                                db.add_piorzin_score(winner_id, self.game_id, 3, f"1º lugar {vote_type} (timeout)")
+                                await adb.add_piorzin_score(winner_id, self.game_id, 3, f"1º lugar {vote_type} (timeout)")
                             results_text += f"🥇 <@{winner_id}> - **{first_place_votes} votos** → **+3 {score_name}**\n"
                             
                             # Segundo lugar - +2 se tiver 2+ votos, +1 se tiver 1 voto
@@ -3503,21 +3711,21 @@ class MVPVotingView(discord.ui.View):
                                 for second_id in second_place_winners:
                                     if second_place_votes >= 2:
                                         if self.is_victory:
-                                            db.add_carry_score(second_id, self.game_id, 2, f"2º lugar {vote_type} (timeout)")
+                                            await adb.add_carry_score(second_id, self.game_id, 2, f"2º lugar {vote_type} (timeout)")
                                         else:
-                                            db.add_piorzin_score(second_id, self.game_id, 2, f"2º lugar {vote_type} (timeout)")
+                                            await adb.add_piorzin_score(second_id, self.game_id, 2, f"2º lugar {vote_type} (timeout)")
                                         results_text += f"🥈 <@{second_id}> - **{second_place_votes} votos** → **+2 {score_name}**\n"
                                     else:
                                         if self.is_victory:
-                                            db.add_carry_score(second_id, self.game_id, 1, f"2º lugar {vote_type} (1 voto, timeout)")
+                                            await adb.add_carry_score(second_id, self.game_id, 1, f"2º lugar {vote_type} (1 voto, timeout)")
                                         else:
-                                            db.add_piorzin_score(second_id, self.game_id, 1, f"2º lugar {vote_type} (1 voto, timeout)")
+                                            await adb.add_piorzin_score(second_id, self.game_id, 1, f"2º lugar {vote_type} (1 voto, timeout)")
                                         results_text += f"🥈 <@{second_id}> - **{second_place_votes} voto** → **+1 {score_name}**\n"
             else:
                 results_text += "Nenhum voto registrado."
             
             # Fecha a votação
-            db.close_pending_vote(self.game_id, self.guild_id)
+            await adb.close_pending_vote(self.game_id, self.guild_id)
             
             # Atualiza a mensagem original usando self.message
             embed = discord.Embed(
@@ -3757,7 +3965,8 @@ async def send_live_game_notification_grouped(game_id: str, players: List[Dict])
         print(f"📤 [Live Grouped] Primeiro jogador: discord_id={discord_id}, region={region}")
         
         # Busca dados completos da partida ao vivo para pegar TODOS os jogadores
-        game_data = await riot_api.get_active_game(first_player['puuid'], region)
+        game_data = await riot_api.get_active_game(first_player['puuid'], region,
+                                                   priority=riot_api.PRIORITY_FINISH_DETECTION)
         print(f"📤 [Live Grouped] game_data obtido: {game_data is not None}")
         
         # Busca servidor e canal
@@ -3895,7 +4104,8 @@ async def edit_live_game_message(message: discord.Message, game_id: str, players
         region = first_player.get('region', 'br1')
         
         # Busca dados completos da partida ao vivo
-        game_data = await riot_api.get_active_game(first_player['puuid'], region)
+        game_data = await riot_api.get_active_game(first_player['puuid'], region,
+                                                   priority=riot_api.PRIORITY_FINISH_DETECTION)
         
         # Monta lista de menções dos jogadores
         player_mentions = ", ".join([f"<@{p['discord_id']}>" for p in players])
@@ -3993,18 +4203,14 @@ async def check_live_games():
         print("🔄 [Live Games] Verificando partidas ao vivo...")
         
         # Limpa notificações antigas (mais de 6 horas)
-        db.cleanup_old_live_game_notifications(hours=6)
+        await adb.cleanup_old_live_game_notifications(hours=6)
 
         # Conta quantas notificações ativas existem
-        active_count = len(db.get_active_live_games(hours=1))
+        active_count = len(await adb.get_active_live_games(hours=1))
         print(f"📊 [Live Games] {active_count} notificações ativas na última hora")
         
         # Busca todas as contas vinculadas
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, puuid, region, discord_id, summoner_name FROM lol_accounts')
-        accounts = cursor.fetchall()
-        conn.close()
+        accounts = await adb.fetchall('SELECT id, puuid, region, discord_id, summoner_name FROM lol_accounts')
         
         if not accounts:
             print("⚠️ [Live Games] Nenhuma conta vinculada para verificar")
@@ -4012,47 +4218,79 @@ async def check_live_games():
         
         print(f"📊 [Live Games] Verificando {len(accounts)} conta(s)...")
         
-        # FASE 1: Escaneia TODAS as contas e agrupa por game_id
+        # FASE 1: Escaneia as contas e agrupa por game_id
         games_map = {}  # game_id -> lista de jogadores
-        
-        print(f"📡 [Live Games] FASE 1: Escaneando todas as contas...")
+
+        # Índice puuid -> contas vinculadas (o mesmo puuid pode estar vinculado a mais de um usuário)
+        accounts_by_puuid = {}
+        for account in accounts:
+            accounts_by_puuid.setdefault(account[1], []).append(account)
+
+        # PUUIDs já resolvidos nesta varredura (em partida ou confirmados fora de partida)
+        resolved_puuids = set()
+        spectator_calls = 0
+
+        # Só consulta contas cujo intervalo adaptativo venceu (todas continuam no índice do fan-out)
+        poll_scheduler.refresh_model()
+        due_ids = set(poll_scheduler.filter_due([account[0] for account in accounts], POLL_SPECTATOR))
+
+        print(f"📡 [Live Games] FASE 1: Escaneando {len(due_ids)} conta(s) com polling pendente...")
 
         for account_id, puuid, region, discord_id, summoner_name in accounts:
+            if puuid in resolved_puuids or account_id not in due_ids:
+                continue
+
             try:
                 # Busca se está em partida ativa
                 game_data = await riot_api.get_active_game(puuid, region)
+                spectator_calls += 1
+                resolved_puuids.add(puuid)
 
                 if game_data:
                     game_id = str(game_data.get('gameId'))
                     queue_id = game_data.get('gameQueueConfigId', 0)
-                    
-                    # Filtra apenas Ranked Flex (440) e Personalizadas (0)
-                    if queue_id not in [440, 0]:
-                        continue
 
-                    # Extrai informações
-                    live_info = riot_api.extract_live_game_info(game_data, puuid)
+                    # A resposta já lista os 10 participantes: resolve todas as contas vinculadas da partida
+                    game_puuids = [p.get('puuid') for p in game_data.get('participants', []) if p.get('puuid')]
+                    linked_puuids = [p for p in game_puuids if p in accounts_by_puuid and p not in resolved_puuids]
+                    resolved_puuids.update(linked_puuids)
 
-                    if live_info:
-                        # Agrupa por game_id
-                        if game_id not in games_map:
-                            games_map[game_id] = []
+                    # Em partida: todas as contas vinculadas voltam ao polling rápido
+                    for game_puuid in [puuid] + linked_puuids:
+                        for linked_account in accounts_by_puuid[game_puuid]:
+                            poll_scheduler.record_active(linked_account[0])
 
-                        games_map[game_id].append({
-                            'account_id': account_id,
-                            'puuid': puuid,
-                            'region': region,
-                            'discord_id': discord_id,
-                            'summoner_name': summoner_name,
-                            'live_info': live_info
-                        })
+                    # Filtra apenas Ranked Flex (440) e Personalizadas (0)
+                    if queue_id in [440, 0]:
+                        for game_puuid in [puuid] + linked_puuids:
+                            # Extrai informações
+                            live_info = riot_api.extract_live_game_info(game_data, game_puuid)
+                            if not live_info:
+                                continue
+
+                            # Agrupa por game_id
+                            for acc_id, acc_puuid, acc_region, acc_discord_id, acc_name in accounts_by_puuid[game_puuid]:
+                                games_map.setdefault(game_id, []).append({
+                                    'account_id': acc_id,
+                                    'puuid': acc_puuid,
+                                    'region': acc_region,
+                                    'discord_id': acc_discord_id,
+                                    'summoner_name': acc_name,
+                                    'live_info': live_info
+                                })
+                else:
+                    for linked_account in accounts_by_puuid[puuid]:
+                        poll_scheduler.record_idle(linked_account[0], POLL_SPECTATOR)
 
                 # Delay entre verificações de contas
                 await asyncio.sleep(1.5)
-                
+
             except Exception as e:
                 continue
-        
+
+        print(f"📡 [Live Games] {spectator_calls} chamada(s) ao spectator para {len(accounts)} conta(s) "
+              f"| agendador: {poll_scheduler.get_status()}")
+
         # Log resumo de detecções
         if games_map:
             print(f"\n📋 [Live Games] FASE 1 concluída - {len(games_map)} partida(s) detectada(s):")
@@ -4062,57 +4300,7 @@ async def check_live_games():
         else:
             print(f"\n📋 [Live Games] Nenhuma partida detectada")
             return
-        
-        # FASE 1.5: Re-verifica partidas para encontrar jogadores que podem ter sido perdidos
-        print(f"\n🔄 [Live Games] FASE 1.5: Re-verificando partidas para encontrar todos os jogadores...")
-        
-        for game_id, players in list(games_map.items()):
-            if len(players) >= 2:
-                # Já tem 2+ jogadores, mas pode ter mais
-                # Busca dados da partida ao vivo para verificar todos os participantes
-                first_player = players[0]
-                try:
-                    game_data = await riot_api.get_active_game(first_player['puuid'], first_player['region'])
-                    
-                    if game_data:
-                        # Pega todos os PUUIDs da partida
-                        participants = game_data.get('participants', [])
-                        game_puuids = [p.get('puuid') for p in participants if p.get('puuid')]
-                        
-                        # Verifica quais contas do bot estão na partida mas não foram detectadas
-                        detected_puuids = {p['puuid'] for p in players}
-                        
-                        for account_id, puuid, region, discord_id, summoner_name in accounts:
-                            if puuid in game_puuids and puuid not in detected_puuids:
-                                # Jogador está na partida mas não foi detectado
-                                print(f"   🔍 [Re-check] Encontrado jogador faltante: {summoner_name}")
-                                
-                                live_info = riot_api.extract_live_game_info(game_data, puuid)
-                                if live_info:
-                                    games_map[game_id].append({
-                                        'account_id': account_id,
-                                        'puuid': puuid,
-                                        'region': region,
-                                        'discord_id': discord_id,
-                                        'summoner_name': summoner_name,
-                                        'live_info': live_info
-                                    })
-                                    detected_puuids.add(puuid)
-                        
-                        if len(games_map[game_id]) > len(players):
-                            print(f"   ✅ [Re-check] Partida {game_id}: {len(players)} → {len(games_map[game_id])} jogadores")
-                
-                except Exception as e:
-                    print(f"   ⚠️ [Re-check] Erro ao re-verificar partida {game_id}: {e}")
-                
-                await asyncio.sleep(0.5)
-        
-        # Log após re-verificação
-        print(f"\n📋 [Live Games] Após re-verificação:")
-        for game_id, players in games_map.items():
-            player_names = [p['summoner_name'] for p in players]
-            print(f"   🎮 Partida {game_id}: {len(players)} jogador(es) - {', '.join(player_names)}")
-        
+
         # FASE 2: Processa cada partida - verifica se já existe mensagem
         print(f"\n📡 [Live Games] FASE 2: Processando partidas...")
         
@@ -4145,7 +4333,7 @@ async def check_live_games():
                                         existing_msg = await channel.fetch_message(int(msg_id))
                                         
                                         # Verifica se há novos jogadores para adicionar
-                                        existing_players = db.get_live_game_players(game_id, gld_id)
+                                        existing_players = await adb.get_live_game_players(game_id, gld_id)
                                         existing_puuids = {p['puuid'] for p in existing_players}
                                         new_players = [p for p in players if p['puuid'] not in existing_puuids]
                                         
@@ -4154,7 +4342,7 @@ async def check_live_games():
                                             
                                             # Adiciona novos jogadores ao banco
                                             for player in new_players:
-                                                db.mark_live_game_notified(
+                                                await adb.mark_live_game_notified(
                                                     player['account_id'],
                                                     game_id,
                                                     player['puuid'],
@@ -4177,7 +4365,7 @@ async def check_live_games():
                                         
                                     except discord.NotFound:
                                         print(f"🗑️ [Live Games] Mensagem foi apagada, limpando registro...")
-                                        db.clear_live_game_notifications(game_id)
+                                        await adb.clear_live_game_notifications(game_id)
                     except Exception as e:
                         print(f"⚠️ [Live Games] Erro ao verificar/editar mensagem: {e}")
                         import traceback
@@ -4193,6 +4381,7 @@ async def check_live_games():
                 for guild in bot.guilds:
                     member = guild.get_member(int(players[0]['discord_id']))
                     if member:
+                        # Configuração em memória: sem ida ao pool de leitores
                         channel_id = db.get_live_game_channel(str(guild.id))
                         if not channel_id:
                             channel_id = db.get_match_channel(str(guild.id))
@@ -4230,7 +4419,7 @@ async def check_live_games():
                     if message_info:
                         print(f"📝 [Live Games] Salvando {len(players)} jogadores no banco para partida {game_id}...")
                         for player in players:
-                            result = db.mark_live_game_notified(
+                            result = await adb.mark_live_game_notified(
                                 player['account_id'],
                                 game_id,
                                 player['puuid'],
@@ -4285,18 +4474,23 @@ async def check_new_matches():
         print("🔄 [Partidas] Verificando novas partidas...")
 
         # Busca todas as contas vinculadas
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, puuid, region FROM lol_accounts WHERE is_corrupted = 0 OR is_corrupted IS NULL')
-        accounts = cursor.fetchall()
-        conn.close()
+        accounts = await adb.fetchall(
+            'SELECT id, puuid, region FROM lol_accounts WHERE is_corrupted = 0 OR is_corrupted IS NULL')
 
         if not accounts:
             print("⚠️ [Partidas] Nenhuma conta vinculada para verificar")
             return
-        
-        print(f"📊 [Partidas] Verificando {len(accounts)} conta(s)...")
+
+        # Polling adaptativo: contas ociosas são consultadas com intervalos cada vez maiores
+        poll_scheduler.refresh_model()
+        due_ids = set(poll_scheduler.filter_due([account[0] for account in accounts], POLL_HISTORY))
+        skipped = len(accounts) - len(due_ids)
+        accounts = [account for account in accounts if account[0] in due_ids]
+
+        print(f"📊 [Partidas] Verificando {len(accounts)} conta(s) ({skipped} em backoff)...")
         new_matches_count = 0
+        # Partidas pontuadas neste ciclo (scoreboard compartilhado entre as contas, liberado no fim)
+        scored_matches = set()
 
         # Processa 8 contas simultaneamente para maior velocidade
         batch_size = 8
@@ -4306,17 +4500,24 @@ async def check_new_matches():
             # Processa batch em paralelo
             tasks = []
             for account_id, puuid, region in batch_accounts:
-                tasks.append(process_account_batch(account_id, puuid, region, riot_api, db))
+                tasks.append(process_account_batch(account_id, puuid, region, riot_api, adb, scored_matches))
 
             # Aguarda todas as tarefas do batch terminarem
             batch_results = await asyncio.gather(*tasks, return_exceptions=True)
 
             # Processa resultados
-            for result in batch_results:
+            for (account_id, _, _), result in zip(batch_accounts, batch_results):
                 if isinstance(result, Exception):
                     print(f"❌ [Partidas] Erro em processamento paralelo: {result}")
                 else:
                     new_matches_count += result
+                    if result > 0:
+                        poll_scheduler.record_active(account_id)
+                    else:
+                        poll_scheduler.record_idle(account_id, POLL_HISTORY)
+
+        for match_id in scored_matches:
+            riot_api.scoreboards.release(match_id)
 
         if new_matches_count > 0:
             print(f"🎮 [Partidas] {new_matches_count} nova(s) partida(s) encontrada(s) e salva(s) automaticamente")
@@ -4328,81 +4529,160 @@ async def check_new_matches():
         import traceback
         traceback.print_exc()
 
-async def process_account_batch(account_id: int, puuid: str, region: str, riot_api, db) -> int:
-    """Processa uma conta específica em paralelo"""
+# Falhas por partida na ingestão (detalhes indisponíveis, sem estatísticas, erro ao salvar).
+# Até MAX_MATCH_ATTEMPTS a conta para na partida (o cursor não passa dela); depois ela é pulada
+MAX_MATCH_ATTEMPTS = 5
+_match_failures = ExpiringMap(24 * 3600, 5000)
+
+def record_match_failure(account_id: int, match_id: str, reason: str) -> bool:
+    """Conta uma falha da partida na ingestão. True = tentativas esgotadas, pular a partida"""
+    attempts = _match_failures.get((account_id, match_id), 0) + 1
+    _match_failures.put((account_id, match_id), attempts)
+    if attempts >= MAX_MATCH_ATTEMPTS:
+        print(f"⏭️ Partida {match_id} ({reason}) falhou {attempts} vezes, pulando")
+        return True
+    print(f"⚠️ Partida {match_id}: {reason} (tentativa {attempts}/{MAX_MATCH_ATTEMPTS}), tentando no próximo ciclo")
+    return False
+
+def get_game_end(match_data: Dict):
+    """Fim da partida (epoch em segundos) a partir dos detalhes da match-v5, ou None"""
+    info = match_data.get('info', {})
+    game_end_timestamp = info.get('gameEndTimestamp') or \
+        (info.get('gameStartTimestamp', 0) + info.get('gameDuration', 0) * 1000)
+    return game_end_timestamp // 1000 if game_end_timestamp else None
+
+def count_bot_players(match_data: Dict) -> int:
+    """Quantas contas vinculadas ao bot participaram da partida (índice em memória, sem ir ao banco)"""
+    return db.count_linked_accounts([p['puuid'] for p in match_data['info']['participants']])
+
+async def process_account_batch(account_id: int, puuid: str, region: str, riot_api, adb,
+                                scored_matches: set = None) -> int:
+    """
+    Processa uma conta específica em paralelo.
+    Lista as partidas iniciadas desde o cursor da conta, descarta as já registradas
+    ANTES de baixar detalhes e processa as novas em ordem, avançando o cursor a cada uma.
+    Partidas já registradas e notificadas no começo da lista (ex: salvas pelo check de live games)
+    também avançam o cursor. Uma partida com falha segura o cursor até MAX_MATCH_ATTEMPTS tentativas.
+    As partidas pontuadas entram em scored_matches para o scoreboard ser liberado no fim do ciclo.
+    """
     try:
-        print(f"🔍 Buscando partidas recentes para conta {account_id}...")
+        cursor_time = await adb.get_ingestion_cursor(account_id)
+        if cursor_time is None:
+            # Primeira execução da conta: só olha as últimas 2 horas (mesmo limite das notificações)
+            cursor_time = int(datetime.now().timestamp()) - 7200
+
+        match_ids = await riot_api.get_match_ids_since(puuid, region, start_time=cursor_time, queue=440)
 
-        # Busca apenas 1 partida (otimizado)
-        flex_matches = await riot_api.get_flex_matches_batch(puuid, region, max_matches=1)
+        if match_ids is None:
+            print(f"⚠️ Falha ao listar partidas da conta {account_id}, tentando no próximo ciclo")
+            return 0
 
-        if not flex_matches:
-            print(f"⚠️ Nenhuma partida de flex encontrada para conta {account_id}")
+        if not match_ids:
             return 0
 
-        print(f"📋 Encontrada {len(flex_matches)} partida de flex para conta {account_id}")
+        known_ends = await adb.get_known_match_ends(account_id, match_ids)
+        known_ids = set(known_ends)
+        # Partidas de outras filas já conhecidas (cache negativo) nem entram na lista
+        new_ids = [match_id for match_id in match_ids
+                   if match_id not in known_ids and not match_cache.is_non_flex(match_id)]
+        print(f"🔍 Conta {account_id}: {len(match_ids)} partida(s) desde o cursor, {len(new_ids)} nova(s)")
+
+        # Notificações já enviadas das registradas, numa consulta fora do event loop
+        # (as ausências ficam no cache negativo, então send_match_notification não volta ao banco)
+        registered_ids = [match_id for match_id in match_ids if match_id in known_ids]
+        sent_ids = await adb.get_sent_match_notifications(account_id, registered_ids)
+        pending_ids = [match_id for match_id in registered_ids if match_id not in sent_ids]
+
+        # Partidas já registradas - mas verifica se notificação foi enviada
+        for match_id in pending_ids:
+            print(f"📨 Partida {match_id} já registrada, mas notificação não enviada - enviando...")
+            try:
+                match_data = await riot_api.get_match_details(match_id, region)
+                stats = riot_api.extract_player_stats(match_data, puuid) if match_data else None
+                if scored_matches is not None:
+                    scored_matches.add(match_id)
+                if stats:
+                    await send_match_notification(account_id, stats)
+            except Exception as e:
+                print(f"❌ Erro ao enviar notificação pendente: {e}")
+        if pending_ids:
+            # Relê fora do event loop: as enviadas agora já estão na memória
+            sent_ids = await adb.get_sent_match_notifications(account_id, registered_ids)
+
+        # Registradas e notificadas no começo da lista: o cursor passa delas para não relistá-las
+        handled_end = None
+        for match_id in match_ids:
+            if match_id not in known_ids or known_ends[match_id] is None or match_id not in sent_ids:
+                break
+            handled_end = known_ends[match_id]
+        if handled_end:
+            await adb.advance_ingestion_cursor(account_id, handled_end)
+
         matches_processed = 0
 
-        # Verifica cada partida e salva apenas as novas E recentes
-        for match_data in flex_matches:
-            match_id = match_data['metadata']['matchId']
+        # Processa as novas da mais antiga para a mais recente
+        for match_id in new_ids:
+            if _match_failures.get((account_id, match_id), 0) >= MAX_MATCH_ATTEMPTS:
+                # Tentativas esgotadas: as partidas seguintes levam o cursor para depois dela
+                continue
 
-            # Verifica se já está registrada
-            if db.get_last_match_id(account_id) == match_id:
-                # Partida já registrada - mas verifica se notificação foi enviada
-                if not db.was_match_notification_sent(account_id, match_id):
-                    print(f"📨 Partida {match_id} já registrada, mas notificação não enviada - enviando...")
-                    try:
-                        stats = riot_api.extract_player_stats(match_data, puuid)
-                        if stats:
-                            await send_match_notification(account_id, stats)
-                    except Exception as e:
-                        print(f"❌ Erro ao enviar notificação pendente: {e}")
-                else:
-                    print(f"⏭️ Partida {match_id} já registrada e notificada, pulando")
+            match_data = await riot_api.get_match_details(match_id, region)
+
+            if not match_data:
+                # Sem detalhes não dá para avançar o cursor sem perder a partida
+                if record_match_failure(account_id, match_id, 'detalhes indisponíveis'):
+                    continue
+                break
+
+            info = match_data.get('info', {})
+            game_end = get_game_end(match_data)
+
+            # Só Ranked Flex é registrada; as outras filas apenas avançam o cursor
+            if info.get('queueId') != 440:
+                if game_end:
+                    await adb.advance_ingestion_cursor(account_id, game_end)
                 continue
 
-            # Verifica se a partida acabou recentemente (última 1 hora)
-            game_end_timestamp = match_data.get('info', {}).get('gameEndTimestamp')
-            if game_end_timestamp:
-                from datetime import datetime, timedelta
-                game_end = datetime.fromtimestamp(game_end_timestamp / 1000)
-                now = datetime.now()
-                time_diff = (now - game_end).total_seconds()
+            # Verifica se a partida acabou recentemente
+            if game_end:
+                time_diff = (datetime.now() - datetime.fromtimestamp(game_end)).total_seconds()
 
                 # Só processa partidas que acabaram há menos de 2 horas
                 if time_diff > 7200:  # 2 horas
                     print(f"⏭️ Partida {match_id} antiga ({time_diff//60:.0f}min atrás, limite 2h), pulando")
+                    await adb.advance_ingestion_cursor(account_id, game_end)
                     continue
 
                 print(f"🕐 Partida {match_id} terminou há {time_diff//60:.0f}min - processando...")
 
+            failure = None
             try:
                 # Extrai estatísticas
                 stats = riot_api.extract_player_stats(match_data, puuid)
+                if scored_matches is not None:
+                    scored_matches.add(match_id)
 
-                if stats:
+                if not stats:
+                    failure = 'sem estatísticas do jogador'
+                else:
                     # Verifica quantos jogadores do bot estão nesta partida
-                    participants_puuids = [p['puuid'] for p in match_data['info']['participants']]
-                    conn = db.get_connection()
-                    cursor = conn.cursor()
-                    placeholders = ','.join('?' * len(participants_puuids))
-                    cursor.execute(f'SELECT COUNT(*) FROM lol_accounts WHERE puuid IN ({placeholders})', participants_puuids)
-                    bot_players_count = cursor.fetchone()[0]
-                    conn.close()
+                    bot_players_count = count_bot_players(match_data)
                     
                     print(f"👥 [Partidas] {bot_players_count} jogador(es) do bot nesta partida")
                     
                     # Só processa se tiver 2+ jogadores do bot
                     if bot_players_count < 2:
                         print(f"⏭️ [Partidas] Apenas {bot_players_count} jogador(es) do bot, pulando (mínimo 2)")
+                        if game_end:
+                            await adb.advance_ingestion_cursor(account_id, game_end)
                         continue
                     
-                    # Salva automaticamente no banco
-                    success = db.add_match(account_id, stats)
+                    # Salva automaticamente no banco (o cursor avança na mesma transação)
+                    success = await adb.add_match(account_id, stats, game_end=game_end)
 
                     if success:
                         matches_processed += 1
+                        _match_failures.discard((account_id, match_id))
 
                         # Log diferente para remakes
                         if stats.get('is_remake', False):
@@ -4418,11 +4698,18 @@ async def process_account_batch(account_id: int, puuid: str, region: str, riot_a
                         await send_match_notification(account_id, stats)
 
                     else:
-                        print(f"⚠️ Falha ao salvar partida {match_id} no banco")
+                        failure = 'falha ao salvar no banco'
 
             except Exception as e:
                 print(f"❌ Erro ao processar partida {match_id}: {e}")
-                continue
+                failure = f'erro: {e}'
+
+            if failure:
+                # Mesma regra para todas as falhas: segura o cursor até esgotar as tentativas
+                if not record_match_failure(account_id, match_id, failure):
+                    break
+                if game_end:
+                    await adb.advance_ingestion_cursor(account_id, game_end)
 
         return matches_processed
 
@@ -4450,7 +4737,7 @@ async def check_live_games_finished():
     """Task que verifica a cada 20 segundos se jogos ao vivo já terminaram"""
     try:
         # Busca todas as live games notificadas recentemente (últimas 2 horas)
-        live_games = db.get_active_live_games(hours=2)
+        live_games = await adb.get_active_live_games(hours=2)
         
         if not live_games:
             return
@@ -4463,6 +4750,8 @@ async def check_live_games_finished():
 
         # Agrupa por match_id para processar uma vez por partida
         processed_matches = set()
+        # Partidas pontuadas neste ciclo (scoreboard liberado depois de todas as contas da partida)
+        scored_matches = set()
         
         for live_game in live_games:
             account_id = live_game['lol_account_id']
@@ -4470,11 +4759,7 @@ async def check_live_games_finished():
             
             try:
                 # Busca informações da conta
-                conn = db.get_connection()
-                cursor = conn.cursor()
-                cursor.execute('SELECT puuid, region FROM lol_accounts WHERE id = ?', (account_id,))
-                account_data = cursor.fetchone()
-                conn.close()
+                account_data = await adb.fetchone('SELECT puuid, region FROM lol_accounts WHERE id = ?', (account_id,))
                 
                 if not account_data:
                     continue
@@ -4482,8 +4767,11 @@ async def check_live_games_finished():
                 puuid, region = account_data
                 
                 # Busca últimas 5 partidas (para ter mais opções de comparação)
+                # Sem filtro de fila: personalizadas também são acompanhadas; as demais filas
+                # caem no cache negativo e não são baixadas de novo
                 print(f"🔍 [Live Check] Buscando histórico para PUUID {puuid} na região {region}")
-                match_ids = await riot_api.get_match_history(puuid, region, count=5)
+                match_ids = await riot_api.get_match_history(puuid, region, count=5, queue=None,
+                                                             priority=riot_api.PRIORITY_FINISH_DETECTION)
 
                 if not match_ids:
                     print(f"⚠️ [Live Check] Nenhum histórico encontrado para {puuid}")
@@ -4495,7 +4783,8 @@ async def check_live_games_finished():
                 match_id = None
                 for mid in match_ids:
                     # Busca detalhes da partida para verificar se terminou recentemente
-                    match_data = await riot_api.get_match_details(mid, region)
+                    match_data = await riot_api.get_match_details(mid, region,
+                                                                  priority=riot_api.PRIORITY_FINISH_DETECTION)
                     if match_data:
                         game_end_timestamp = match_data.get('info', {}).get('gameEndTimestamp')
                         if game_end_timestamp:
@@ -4516,7 +4805,7 @@ async def check_live_games_finished():
                 print(f"🔍 [Live Check] Verificando partida {match_id} para live game {game_id}")
 
                 # Busca informações da live game para comparar com a partida terminada
-                live_game_info = db.get_live_game_message(account_id, match_id)
+                live_game_info = await adb.get_live_game_message(account_id, match_id)
                 if live_game_info:
                     print(f"🔍 [Live Check] Comparando live game {game_id} com partida terminada {match_id}")
                     print(f"   PUUID live: {live_game_info['puuid']} | PUUID partida: {puuid}")
@@ -4529,20 +4818,21 @@ async def check_live_games_finished():
                         # Continua verificando mesmo assim, pois pode haver erro na comparação
 
                 # Verifica se já está registrada no banco
-                last_match_id = db.get_last_match_id(account_id)
+                last_match_id = await adb.get_last_match_id(account_id)
                 print(f"🔍 [Live Check] Última partida registrada: {last_match_id} | Nova partida: {match_id}")
 
                 if last_match_id == match_id:
                     print(f"✅ [Live Check] Partida {match_id} já processada, removendo live game {game_id}")
                     # Já foi processada, pode remover da lista de live games
-                    db.remove_live_game_notification(account_id, game_id)
+                    await adb.remove_live_game_notification(account_id, game_id)
                     continue
 
                 print(f"🔍 [Live Check] Partida {match_id} ainda não processada, continuando verificação...")
 
                 # Busca detalhes da partida
                 print(f"🔍 [Live Check] Buscando detalhes da partida {match_id}...")
-                match_data = await riot_api.get_match_details(match_id, region)
+                match_data = await riot_api.get_match_details(match_id, region,
+                                                              priority=riot_api.PRIORITY_FINISH_DETECTION)
 
                 if match_data:
                     # Verifica se é Ranked Flex (440) ou Personalizada (0)
@@ -4590,18 +4880,13 @@ async def check_live_games_finished():
                             # Extrai estatísticas do jogador
                             print(f"📊 [Live Check] Extraindo estatísticas para {puuid}...")
                             stats = riot_api.extract_player_stats(match_data, puuid)
+                            scored_matches.add(match_id)
 
                             if stats:
                                 print(f"📊 [Live Check] Estatísticas extraídas para {puuid}: {stats['champion_name']} - MVP: {stats['mvp_score']}")
 
                                 # Verifica quantos jogadores do bot estão nesta partida
-                                participants_puuids = [p['puuid'] for p in match_data['info']['participants']]
-                                conn = db.get_connection()
-                                cursor = conn.cursor()
-                                placeholders = ','.join('?' * len(participants_puuids))
-                                cursor.execute(f'SELECT COUNT(*) FROM lol_accounts WHERE puuid IN ({placeholders})', participants_puuids)
-                                bot_players_count = cursor.fetchone()[0]
-                                conn.close()
+                                bot_players_count = count_bot_players(match_data)
                                 
                                 print(f"👥 [Live Check] {bot_players_count} jogador(es) do bot nesta partida")
                                 
@@ -4609,12 +4894,14 @@ async def check_live_games_finished():
                                 if bot_players_count < 2:
                                     print(f"⏭️ [Live Check] Apenas {bot_players_count} jogador(es) do bot, pulando (mínimo 2)")
                                     # Remove da lista de live games sem processar
-                                    db.remove_live_game_notification(account_id, game_id)
+                                    await adb.remove_live_game_notification(account_id, game_id)
                                     continue
 
                                 # Salva no banco de dados ANTES de tudo
                                 print(f"💾 [Live Check] Salvando partida no banco de dados...")
-                                save_result = db.add_match(account_id, stats)
+                                # O cursor de ingestão avança junto: o check_new_matches não relista a partida
+                                save_result = await adb.add_match(account_id, stats,
+                                                                  game_end=game_end_timestamp // 1000)
                                 if save_result:
                                     print(f"✅ [Live Check] Partida salva no banco com sucesso!")
                                 else:
@@ -4655,7 +4942,7 @@ async def check_live_games_finished():
 
                                 # Remove da lista de live games
                                 print(f"🗑️ [Live Check] Removendo live game {game_id} da lista")
-                                db.remove_live_game_notification(account_id, game_id)
+                                await adb.remove_live_game_notification(account_id, game_id)
                             else:
                                 print(f"❌ [Live Check] Falha ao extrair estatísticas para {puuid}")
                 
@@ -4665,6 +4952,9 @@ async def check_live_games_finished():
             except Exception as e:
                 print(f"❌ [Live Check] Erro ao verificar partida {game_id}: {e}")
                 continue
+
+        for match_id in scored_matches:
+            riot_api.scoreboards.release(match_id)
     
     except Exception as e:
         print(f"❌ [Live Check] Erro geral: {e}")
@@ -4708,12 +4998,12 @@ async def on_app_command_error(interaction: discord.Interaction, error: app_comm
     except Exception as e:
         print(f"Erro no error handler: {e}")
 
-@tasks.loop(time=datetime.strptime("00:00", "%H:%M").time())
+@tasks.loop(time=time(0, 0, tzinfo=BRAZIL_TZ))
 async def check_weekly_reset():
-    """Task que roda todo dia à 00:00 e executa o reset semanal na virada para segunda-feira"""
+    """Task que roda todo dia à 00:00 (horário do Brasil) e executa o reset semanal na virada para segunda-feira"""
     from datetime import timedelta
     try:
-        now = datetime.now()
+        now = datetime.now(BRAZIL_TZ)
         
         # Verifica se é segunda-feira (weekday() == 0)
         if now.weekday() != 0:
@@ -4729,12 +5019,10 @@ async def check_weekly_reset():
         week_start_str = week_start.strftime('%Y-%m-%d')
         week_end_str = week_end.strftime('%Y-%m-%d')
         
-        # Busca ranking COMPLETO da semana que acabou (todos os participantes)
-        full_ranking = db.get_weekly_carry_score_ranking(week_start_str, week_end_str, limit=100)
-        
-        # Salva histórico de posições de TODOS os participantes
+        # Salva o histórico de posições de TODOS os participantes da semana que acabou
+        # (cópia do placar semanal, já com as posições)
+        full_ranking = await adb.snapshot_weekly_ranking(week_start_str, week_end_str)
         if full_ranking:
-            db.save_weekly_ranking(week_start_str, week_end_str, full_ranking)
             print(f"📊 [Top Flex] Salvo histórico de {len(full_ranking)} participantes")
         
         ranking = full_ranking[:1] if full_ranking else []
@@ -4821,6 +5109,119 @@ async def check_weekly_reset():
 async def before_weekly_reset():
     await bot.wait_until_ready()
 
+def get_season_start_timestamp() -> int:
+    """Início da temporada atual (epoch em segundos) usado pelo backfill"""
+    if SEASON_START:
+        try:
+            return int(datetime.strptime(SEASON_START, "%Y-%m-%d").replace(tzinfo=BRAZIL_TZ).timestamp())
+        except ValueError:
+            print(f"⚠️ [Backfill] SEASON_START inválido ({SEASON_START}), usando 1º de janeiro")
+    return int(datetime(datetime.now(BRAZIL_TZ).year, 1, 1, tzinfo=BRAZIL_TZ).timestamp())
+
+async def process_backfill_page(job: Dict) -> int:
+    """
+    Importa uma página (até 100 partidas de Flex) do histórico da temporada de uma conta.
+    Usa a prioridade de backfill do rate limiter e grava o checkpoint ao final da página,
+    então um reinício no meio só repete a página atual (add_match ignora duplicatas).
+    Se os detalhes de uma partida falharem, o checkpoint para antes dela e a página é retomada dali
+    no próximo ciclo (depois de MAX_MATCH_ATTEMPTS tentativas a partida é pulada).
+    """
+    account_id = job['lol_account_id']
+    puuid = job['puuid']
+    region = job['region']
+
+    match_ids = await riot_api.get_match_ids_page(
+        puuid, region,
+        start=job['next_start'],
+        count=BACKFILL_PAGE_SIZE,
+        start_time=job['season_start'],
+        end_time=job['end_time'],
+        queue=440,
+        priority=riot_api.PRIORITY_BACKFILL
+    )
+
+    if match_ids is None:
+        print(f"⚠️ [Backfill] Falha ao listar partidas da conta {account_id}, tentando depois")
+        return 0
+
+    known_ids = await adb.get_known_match_ids(account_id, match_ids)
+    saved = 0
+    # Partidas da página já tratadas (o checkpoint só avança até aqui)
+    handled = 0
+
+    for match_id in match_ids:
+        if match_id in known_ids or match_cache.is_non_flex(match_id) or \
+                _match_failures.get((account_id, match_id), 0) >= MAX_MATCH_ATTEMPTS:
+            handled += 1
+            continue
+
+        failure = None
+        try:
+            match_data = await riot_api.get_match_details(match_id, region, priority=riot_api.PRIORITY_BACKFILL)
+            if not match_data:
+                failure = 'detalhes indisponíveis'
+            elif match_data.get('info', {}).get('queueId') == 440:
+                stats = riot_api.extract_player_stats(match_data, puuid)
+                # Partida histórica: salva sem notificar (e marca como notificada para não notificar depois)
+                if stats and count_bot_players(match_data) >= 2:
+                    if await adb.add_match(account_id, stats):
+                        db.mark_match_notification_sent(account_id, match_id)
+                        saved += 1
+                    else:
+                        failure = 'falha ao salvar no banco'
+        except Exception as e:
+            print(f"❌ [Backfill] Erro ao importar partida {match_id}: {e}")
+            failure = f'erro: {e}'
+        finally:
+            # Partida histórica: não ocupa o cache de scoreboards das partidas em processamento
+            riot_api.scoreboards.release(match_id)
+
+        if failure and not record_match_failure(account_id, match_id, failure):
+            break
+        handled += 1
+
+    if handled < len(match_ids):
+        status = 'running'
+    else:
+        status = 'done' if len(match_ids) < BACKFILL_PAGE_SIZE else 'running'
+    await adb.update_backfill_progress(
+        account_id,
+        next_start=job['next_start'] + handled,
+        processed=job['processed'] + handled,
+        saved=job['saved'] + saved,
+        status=status
+    )
+
+    print(f"📥 [Backfill] Conta {account_id}: {handled}/{len(match_ids)} partida(s) da página, {saved} salva(s)"
+          f"{' - concluído!' if status == 'done' else ''}")
+    return saved
+
+@tasks.loop(seconds=15)
+async def run_season_backfill():
+    """Task que importa, uma página por vez, o histórico da temporada das contas recém-vinculadas"""
+    try:
+        job = await adb.get_next_backfill_job()
+        if job:
+            await process_backfill_page(job)
+    except Exception as e:
+        print(f"❌ [Backfill] Erro ao processar backfill: {e}")
+        import traceback
+        traceback.print_exc()
+
+@run_season_backfill.before_loop
+async def before_season_backfill():
+    await bot.wait_until_ready()
+
+@tasks.loop(seconds=5)
+async def flush_sent_markers():
+    """Grava no banco os marcadores de notificação/alerta já aplicados em memória (write-behind)"""
+    try:
+        written = await adb.flush_sent_markers()
+        if written:
+            print(f"💾 [Marcadores] {written} marcador(es) de envio gravado(s) no banco")
+    except Exception as e:
+        print(f"❌ [Marcadores] Erro ao gravar marcadores: {e}")
+
 if __name__ == "__main__":
     if not TOKEN or not RIOT_API_KEY:
         print("❌ ERRO: Configure as variáveis DISCORD_TOKEN e RIOT_API_KEY no arquivo .env")
@@ -1,11 +1,41 @@
 import sqlite3
 import json
 import os
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Dict
 
+from db_pool import ConnectionPool
+from expiring_map import ExpiringMap
+
+# Fuso das colunas de data local (dia/ano/semana das partidas e dos scores)
+BRAZIL_TZ = timezone(timedelta(hours=-3))
+
+
+def local_time_columns(timestamp: int) -> tuple:
+    """Epoch (segundos) -> (data 'YYYY-MM-DD', ano, segunda-feira da semana 'YYYY-MM-DD') no horário do Brasil"""
+    local = datetime.fromtimestamp(timestamp, BRAZIL_TZ)
+    week_start = local.date() - timedelta(days=local.weekday())
+    return local.strftime('%Y-%m-%d'), local.year, week_start.isoformat()
+
+
+def played_at_timestamp(played_at: str) -> Optional[int]:
+    """played_at (isoformat no horário local do servidor, como gravado pela RiotAPI) -> epoch em segundos"""
+    try:
+        return int(datetime.fromisoformat(played_at).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+def month_range(year: int, month: int) -> tuple:
+    """Primeiro dia do mês e do mês seguinte ('YYYY-MM-DD'), para filtros played_date >= ? AND played_date < ?"""
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{year:04d}-{month:02d}-01", f"{next_year:04d}-{next_month:02d}-01"
+
+
 class Database:
-    def __init__(self, db_name=None):
+    def __init__(self, db_name=None, auto_migrate: bool = True):
         # Suporte para Railway Volumes
         if db_name is None:
             # Usa /data se existir (Railway Volume), senão usa local
@@ -17,16 +47,90 @@ class Database:
                 print("📁 Usando banco de dados local: bot_lol.db")
         
         self.db_name = db_name
-        self.init_database()
+        # Conexões de longa duração (WAL + pragmas); conn.close() devolve a conexão ao pool
+        self.pool = ConnectionPool(db_name)
+        # Cópia em memória de server_configs (carregada no primeiro uso ou por load_server_configs)
+        self._server_configs: Optional[Dict[str, Dict]] = None
+        self._server_configs_lock = threading.Lock()
+        # Índice puuid -> contas vinculadas (carregado no primeiro uso ou por load_account_index)
+        self._accounts_by_puuid: Optional[Dict[str, tuple]] = None
+        self._accounts_by_id: Optional[Dict[int, Dict]] = None
+        self._account_index_lock = threading.Lock()
+        # Marcadores "já feito" em memória (carregados no primeiro uso ou por load_sent_markers)
+        self._match_notifications: Optional[ExpiringMap] = None
+        self._performance_alerts: Optional[ExpiringMap] = None
+        self._live_games_notified: Optional[ExpiringMap] = None  # (conta, game_id) -> dados da mensagem
+        self._live_game_accounts: Optional[ExpiringMap] = None  # game_id -> contas notificadas
+        self._pending_markers: List[tuple] = []  # escritas adiadas, gravadas por flush_sent_markers
+        # (tipo, chave) de marcadores confirmados ausentes no banco, por pouco tempo (cache negativo)
+        self._sent_marker_misses = ExpiringMap(self.SENT_MARKER_MISS_TTL_SECONDS, self.SENT_MARKER_MAX_ENTRIES)
+        self._markers_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        if auto_migrate:
+            self.init_database()
     
     def get_connection(self):
-        return sqlite3.connect(self.db_name)
+        return self.pool.acquire()
+    
+    def close(self):
+        """Fecha de verdade todas as conexões do pool (desligamento)"""
+        stats = self.pool.get_stats()
+        self.pool.close_all()
+        print(f"🗄️ [DB] Pool de conexões fechado: {stats['created']} criadas, {stats['reused']} reaproveitamentos")
+    
+    # Migrações do esquema, em ordem: (versão, descrição, método que recebe o cursor).
+    # PRAGMA user_version guarda a última versão aplicada; mudança nova no esquema = nova entrada no fim.
+    MIGRATIONS = (
+        (1, 'esquema base (tabelas, colunas antigas, partidas normalizadas, colunas de data e índices)',
+         '_migration_baseline'),
+        (2, 'rollups de estatísticas por conta/ano/campeão/role (stat_rollups)', '_migration_stat_rollups'),
+        (3, 'placar semanal materializado de Carry/Piorzin (weekly_scores)', '_migration_weekly_scores'),
+        (4, 'índices por horário dos marcadores de notificação/alerta enviados', '_migration_sent_markers'),
+    )
     
-    def init_database(self):
-        """Inicializa as tabelas do banco de dados"""
+    def init_database(self, dry_run: bool = False) -> List[tuple]:
+        """
+        Aplica as migrações pendentes, cada uma na sua transação (se falhar, o banco continua na versão
+        anterior). Num banco atualizado só lê PRAGMA user_version. dry_run: apenas lista as pendentes.
+        Retorna as migrações pendentes [(versão, descrição)].
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
+        cursor.execute('PRAGMA user_version')
+        current_version = cursor.fetchone()[0]
+        pending = [migration for migration in self.MIGRATIONS if migration[0] > current_version]
+        
+        if dry_run:
+            print(f"🔎 [Migrações] Banco na versão {current_version}: {len(pending)} migração(ões) pendente(s)")
+            for version, description, _ in pending:
+                print(f"   • {version}: {description}")
+            conn.close()
+            return [(version, description) for version, description, _ in pending]
+        
+        for version, description, method in pending:
+            print(f"🔄 [Migrações] Aplicando versão {version}: {description}...")
+            started = time.perf_counter()
+            try:
+                cursor.execute('BEGIN')
+                getattr(self, method)(cursor)
+                cursor.execute(f'PRAGMA user_version = {int(version)}')
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                conn.close()
+                print(f"❌ [Migrações] Falha na versão {version}, banco mantido na versão {current_version}: {e}")
+                raise
+            current_version = version
+            print(f"✅ [Migrações] Versão {version} aplicada em {time.perf_counter() - started:.2f}s")
         
+        conn.close()
+        return [(version, description) for version, description, _ in pending]
+    
+    def _migration_baseline(self, cursor):
+        """
+        Versão 1: o esquema como era criado a cada boot (CREATE IF NOT EXISTS + sondagem de colunas).
+        Continua idempotente porque bancos sem versão chegam aqui em qualquer estado anterior.
+        """
         # Tabela de usuários Discord
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -51,36 +155,12 @@ class Database:
             )
         ''')
         
-        # Tabela de partidas
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS matches (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                lol_account_id INTEGER NOT NULL,
-                match_id TEXT NOT NULL,
-                game_mode TEXT,
-                champion_name TEXT,
-                role TEXT,
-                kills INTEGER,
-                deaths INTEGER,
-                assists INTEGER,
-                damage_dealt INTEGER,
-                damage_taken INTEGER,
-                gold_earned INTEGER,
-                cs INTEGER,
-                vision_score INTEGER,
-                game_duration INTEGER,
-                win BOOLEAN,
-                mvp_score REAL DEFAULT 0,
-                mvp_placement INTEGER DEFAULT 0,
-                kda REAL,
-                kill_participation REAL,
-                played_at TIMESTAMP,
-                is_remake BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (lol_account_id) REFERENCES lol_accounts(id),
-                UNIQUE(lol_account_id, match_id)
-            )
-        ''')
+        # Partidas: dados da partida (match_core) e dos 10 jogadores (match_participants) guardados uma
+        # única vez; match_accounts liga cada conta vinculada ao seu participante e a view 'matches'
+        # mantém o formato antigo (uma linha por conta/partida) para as consultas existentes
+        self._create_match_tables(cursor)
+        self._migrate_legacy_matches(cursor)
+        self._create_matches_view(cursor)
         
         # Tabela de configurações dos servidores
         cursor.execute('''
@@ -159,30 +239,6 @@ class Database:
             cursor.execute('ALTER TABLE live_games_notified ADD COLUMN champion_name TEXT')
             print("✅ Migração de identificação concluída!")
         
-        # Migração: Adiciona coluna is_remake em matches
-        try:
-            cursor.execute("SELECT is_remake FROM matches LIMIT 1")
-        except sqlite3.OperationalError:
-            print("🔄 Migrando banco: adicionando coluna is_remake...")
-            cursor.execute('ALTER TABLE matches ADD COLUMN is_remake BOOLEAN DEFAULT 0')
-            print("✅ Migração is_remake concluída!")
-        
-        # Migração: Adiciona coluna mvp_score em matches
-        try:
-            cursor.execute("SELECT mvp_score FROM matches LIMIT 1")
-        except sqlite3.OperationalError:
-            print("🔄 Migrando banco: adicionando coluna mvp_score...")
-            cursor.execute('ALTER TABLE matches ADD COLUMN mvp_score REAL DEFAULT 0')
-            print("✅ Migração mvp_score concluída!")
-        
-        # Migração: Adiciona coluna mvp_placement em matches
-        try:
-            cursor.execute("SELECT mvp_placement FROM matches LIMIT 1")
-        except sqlite3.OperationalError:
-            print("🔄 Migrando banco: adicionando coluna mvp_placement...")
-            cursor.execute('ALTER TABLE matches ADD COLUMN mvp_placement INTEGER DEFAULT 0')
-            print("✅ Migração mvp_placement concluída!")
-        
         # Tabela de banimentos de campeões (sistema progressivo)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS champion_bans (
@@ -263,9 +319,13 @@ class Database:
                 reason TEXT,
                 year INTEGER NOT NULL,
                 earned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                earned_ts INTEGER,
+                earned_date TEXT,
+                earned_week TEXT,
                 UNIQUE(discord_id, game_id)
             )
         ''')
+        self._score_time_columns(cursor, 'carry_scores')
         
         # Tabela para rastrear votações pendentes
         cursor.execute('''
@@ -315,6 +375,27 @@ class Database:
             cursor.execute('ALTER TABLE server_configs ADD COLUMN piorzin_role_id TEXT')
             print("✅ Migração piorzin_role_id concluída!")
         
+        # Migração: Adiciona coluna scoring_profile (perfil de pontuação ativo) em server_configs
+        try:
+            cursor.execute("SELECT scoring_profile FROM server_configs LIMIT 1")
+        except sqlite3.OperationalError:
+            print("🔄 Migrando banco: adicionando coluna scoring_profile...")
+            cursor.execute('ALTER TABLE server_configs ADD COLUMN scoring_profile TEXT')
+            print("✅ Migração scoring_profile concluída!")
+        
+        # Perfis de pontuação do MVP Score por servidor (pesos em JSON: {'support': {...}, 'carry': {...}})
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scoring_profiles (
+                guild_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                weights TEXT NOT NULL,
+                created_by TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (guild_id, name)
+            )
+        ''')
+        
         # Tabela de piorzin score acumulado
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS piorzin_scores (
@@ -325,9 +406,13 @@ class Database:
                 reason TEXT,
                 year INTEGER NOT NULL,
                 earned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                earned_ts INTEGER,
+                earned_date TEXT,
+                earned_week TEXT,
                 UNIQUE(discord_id, game_id)
             )
         ''')
+        self._score_time_columns(cursor, 'piorzin_scores')
         
         # Tabela para histórico de vencedores do piorzin semanal
         cursor.execute('''
@@ -372,8 +457,532 @@ class Database:
             )
         ''')
         
-        conn.commit()
+        # Cursor de ingestão por conta (fim da última partida já tratada, epoch em segundos)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ingestion_cursors (
+                lol_account_id INTEGER PRIMARY KEY,
+                last_game_end INTEGER NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (lol_account_id) REFERENCES lol_accounts(id)
+            )
+        ''')
+        
+        # Jobs de backfill do histórico da temporada (checkpoint para retomar após reinício)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS backfill_jobs (
+                lol_account_id INTEGER PRIMARY KEY,
+                season_start INTEGER NOT NULL,
+                end_time INTEGER NOT NULL,
+                next_start INTEGER DEFAULT 0,
+                processed INTEGER DEFAULT 0,
+                saved INTEGER DEFAULT 0,
+                status TEXT DEFAULT 'pending',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (lol_account_id) REFERENCES lol_accounts(id)
+            )
+        ''')
+        
+        # Cache persistente dos detalhes de partidas (JSON da match-v5 comprimido com zlib)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS match_cache (
+                match_id TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_access TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_match_cache_last_access
+            ON match_cache(last_access)
+        ''')
+        
+        # Cache negativo: partidas de filas que o bot não acompanha (nunca são baixadas de novo)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS non_flex_matches (
+                match_id TEXT PRIMARY KEY,
+                queue_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        self._backfill_time_columns(cursor)
+        self._create_indexes(cursor)
+    
+    # Colunas de match_participants preenchidas a partir das estatísticas de cada jogador
+    # (mesmos nomes das chaves de RiotAPI.extract_player_stats / da view matches)
+    PARTICIPANT_COLUMNS = (
+        'participant_index', 'puuid', 'team_id', 'champion_id', 'champion_name', 'role', 'win',
+        'kills', 'deaths', 'assists', 'damage_dealt', 'damage_taken', 'damage_to_objectives',
+        'gold_earned', 'cs', 'vision_score', 'wards_placed', 'wards_killed', 'champ_level',
+        'turret_kills', 'largest_multi_kill', 'total_heal', 'time_ccing_others', 'team_kills',
+        'mvp_score', 'mvp_placement', 'scoring_version', 'kda', 'kill_participation',
+    )
+    
+    # Participantes migrados da tabela antiga não têm a posição real na partida (0 a 9)
+    LEGACY_PARTICIPANT_OFFSET = 10
+    
+    def _create_match_tables(self, cursor):
+        """Cria as tabelas normalizadas de partidas"""
+        # Uma linha por partida
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS match_core (
+                match_id TEXT PRIMARY KEY,
+                queue_id INTEGER,
+                game_mode TEXT,
+                game_duration INTEGER,
+                played_at TIMESTAMP,
+                is_remake BOOLEAN DEFAULT 0,
+                full_roster BOOLEAN DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Uma linha por jogador da partida (os 10, vinculados ou não ao bot)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS match_participants (
+                match_id TEXT NOT NULL,
+                participant_index INTEGER NOT NULL,
+                puuid TEXT,
+                team_id INTEGER,
+                champion_id INTEGER,
+                champion_name TEXT,
+                role TEXT,
+                win BOOLEAN,
+                kills INTEGER,
+                deaths INTEGER,
+                assists INTEGER,
+                damage_dealt INTEGER,
+                damage_taken INTEGER,
+                damage_to_objectives INTEGER,
+                gold_earned INTEGER,
+                cs INTEGER,
+                vision_score INTEGER,
+                wards_placed INTEGER,
+                wards_killed INTEGER,
+                champ_level INTEGER,
+                turret_kills INTEGER,
+                largest_multi_kill INTEGER,
+                total_heal INTEGER,
+                time_ccing_others INTEGER,
+                team_kills INTEGER,
+                mvp_score REAL DEFAULT 0,
+                mvp_placement INTEGER DEFAULT 0,
+                scoring_version INTEGER,
+                kda REAL,
+                kill_participation REAL,
+                PRIMARY KEY (match_id, participant_index),
+                FOREIGN KEY (match_id) REFERENCES match_core(match_id)
+            ) WITHOUT ROWID
+        ''')
+        # Migração: versão da fórmula do MVP Score usada em cada jogador (NULL = desconhecida)
+        try:
+            cursor.execute("SELECT scoring_version FROM match_participants LIMIT 1")
+        except sqlite3.OperationalError:
+            print("🔄 Migrando banco: adicionando coluna scoring_version...")
+            cursor.execute('ALTER TABLE match_participants ADD COLUMN scoring_version INTEGER')
+            print("✅ Migração scoring_version concluída!")
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_match_participants_puuid
+            ON match_participants(puuid)
+        ''')
+        
+        # Conta vinculada -> participante (o id continua sendo o antigo matches.id)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS match_accounts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                lol_account_id INTEGER NOT NULL,
+                match_id TEXT NOT NULL,
+                participant_index INTEGER NOT NULL,
+                played_at TIMESTAMP,
+                is_remake BOOLEAN DEFAULT 0,
+                played_ts INTEGER,
+                played_date TEXT,
+                played_year INTEGER,
+                played_week TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (lol_account_id) REFERENCES lol_accounts(id),
+                FOREIGN KEY (match_id) REFERENCES match_core(match_id),
+                UNIQUE(lol_account_id, match_id)
+            )
+        ''')
+        # Migração: cópia de played_at/is_remake no vínculo, para o histórico de cada conta sair
+        # direto do índice (lol_account_id, played_at) sem ordenar nem filtrar remakes depois
+        try:
+            cursor.execute("SELECT played_at FROM match_accounts LIMIT 1")
+        except sqlite3.OperationalError:
+            print("🔄 Migrando banco: adicionando played_at/is_remake em match_accounts...")
+            cursor.execute('ALTER TABLE match_accounts ADD COLUMN played_at TIMESTAMP')
+            cursor.execute('ALTER TABLE match_accounts ADD COLUMN is_remake BOOLEAN DEFAULT 0')
+            cursor.execute('''
+                UPDATE match_accounts SET
+                    played_at = (SELECT played_at FROM match_core mc WHERE mc.match_id = match_accounts.match_id),
+                    is_remake = (SELECT COALESCE(is_remake, 0) FROM match_core mc WHERE mc.match_id = match_accounts.match_id)
+            ''')
+            # A view passa a usar as colunas novas
+            cursor.execute("SELECT type FROM sqlite_master WHERE name = 'matches'")
+            row = cursor.fetchone()
+            if row and row[0] == 'view':
+                cursor.execute('DROP VIEW matches')
+            print("✅ Migração de match_accounts concluída!")
+        
+        # Migração: epoch e data/ano/semana no horário do Brasil (filtros de período por faixa no índice)
+        try:
+            cursor.execute("SELECT played_ts FROM match_accounts LIMIT 1")
+        except sqlite3.OperationalError:
+            print("🔄 Migrando banco: adicionando colunas de data em match_accounts...")
+            for column, definition in (('played_ts', 'INTEGER'), ('played_date', 'TEXT'),
+                                       ('played_year', 'INTEGER'), ('played_week', 'TEXT')):
+                cursor.execute(f'ALTER TABLE match_accounts ADD COLUMN {column} {definition}')
+            cursor.execute("SELECT type FROM sqlite_master WHERE name = 'matches'")
+            row = cursor.fetchone()
+            if row and row[0] == 'view':
+                cursor.execute('DROP VIEW matches')
+            # Substituídos pelas colunas de data (ver _create_indexes)
+            for index in ('idx_match_accounts_played_valid', 'idx_carry_scores_date', 'idx_piorzin_scores_date'):
+                cursor.execute(f'DROP INDEX IF EXISTS {index}')
+            print("✅ Migração das colunas de data concluída (preenchidas em seguida)!")
+    
+    @staticmethod
+    def _score_time_columns(cursor, table: str):
+        """Adiciona earned_ts/earned_date/earned_week numa tabela de scores (carry_scores / piorzin_scores)"""
+        try:
+            cursor.execute(f"SELECT earned_ts FROM {table} LIMIT 1")
+        except sqlite3.OperationalError:
+            print(f"🔄 Migrando banco: adicionando colunas de data em {table}...")
+            for column, definition in (('earned_ts', 'INTEGER'), ('earned_date', 'TEXT'), ('earned_week', 'TEXT')):
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+            print(f"✅ Migração das colunas de data de {table} concluída!")
+    
+    def _backfill_time_columns(self, cursor):
+        """Preenche as colunas de epoch/data local que ainda estão vazias (migração e partidas antigas)"""
+        cursor.execute('SELECT id, played_at FROM match_accounts WHERE played_ts IS NULL')
+        updates = []
+        for row_id, played_at in cursor.fetchall():
+            timestamp = played_at_timestamp(played_at)
+            if timestamp is not None:
+                updates.append((timestamp, *local_time_columns(timestamp), row_id))
+        if updates:
+            cursor.executemany('''
+                UPDATE match_accounts SET played_ts = ?, played_date = ?, played_year = ?, played_week = ?
+                WHERE id = ?
+            ''', updates)
+            print(f"✅ Colunas de data preenchidas em {len(updates)} vínculo(s) de partida")
+        
+        for table in ('carry_scores', 'piorzin_scores'):
+            # earned_at vem do CURRENT_TIMESTAMP do SQLite (UTC)
+            cursor.execute(f"SELECT id, CAST(strftime('%s', earned_at) AS INTEGER) FROM {table} WHERE earned_ts IS NULL")
+            updates = []
+            for row_id, timestamp in cursor.fetchall():
+                if timestamp is not None:
+                    date_str, _, week_str = local_time_columns(timestamp)
+                    updates.append((timestamp, date_str, week_str, row_id))
+            if updates:
+                cursor.executemany(f'''
+                    UPDATE {table} SET earned_ts = ?, earned_date = ?, earned_week = ? WHERE id = ?
+                ''', updates)
+                print(f"✅ Colunas de data preenchidas em {len(updates)} registro(s) de {table}")
+    
+    def _create_matches_view(self, cursor):
+        """View com o formato da antiga tabela matches (uma linha por conta vinculada e partida)"""
+        cursor.execute('''
+            CREATE VIEW IF NOT EXISTS matches AS
+            SELECT ma.id, ma.lol_account_id, ma.match_id, mc.game_mode, mp.champion_name, mp.role,
+                   mp.kills, mp.deaths, mp.assists, mp.damage_dealt, mp.damage_taken,
+                   mp.gold_earned, mp.cs, mp.vision_score, mc.game_duration, mp.win,
+                   mp.mvp_score, mp.mvp_placement, mp.kda, mp.kill_participation,
+                   ma.played_at, ma.is_remake, ma.created_at,
+                   ma.played_ts, ma.played_date, ma.played_year, ma.played_week
+            FROM match_accounts ma
+            JOIN match_core mc ON mc.match_id = ma.match_id
+            JOIN match_participants mp ON mp.match_id = ma.match_id
+                                      AND mp.participant_index = ma.participant_index
+        ''')
+    
+    def _create_indexes(self, cursor):
+        """Índices secundários das consultas mais frequentes (ver hot_queries / check_query_plans)"""
+        indexes = (
+            # Histórico de cada conta: última partida, últimas N com o campeão, partidas por período
+            ('idx_match_accounts_account_played', 'match_accounts(lol_account_id, played_at)', None),
+            ('idx_match_accounts_account_valid', 'match_accounts(lol_account_id, played_at)',
+             '(is_remake = 0 OR is_remake IS NULL)'),
+            # Períodos: dia/mês (played_date) e ano (played_year) no horário do Brasil
+            ('idx_match_accounts_account_date', 'match_accounts(lol_account_id, played_date)', None),
+            ('idx_match_accounts_account_year', 'match_accounts(lol_account_id, played_year)',
+             '(is_remake = 0 OR is_remake IS NULL)'),
+            ('idx_match_accounts_date_valid', 'match_accounts(played_date)',
+             '(is_remake = 0 OR is_remake IS NULL)'),
+            ('idx_match_accounts_played_ts', 'match_accounts(played_ts)', None),
+            # Vínculos de uma partida (upgrade de partidas migradas, limpeza de órfãs)
+            ('idx_match_accounts_match', 'match_accounts(match_id)', None),
+            # Partidas completas usadas na simulação de perfis de pontuação
+            ('idx_match_core_scoring', 'match_core(played_at)',
+             'full_roster = 1 AND (is_remake = 0 OR is_remake IS NULL)'),
+            # "Quantos jogadores do bot estão nesta partida" (puuid IN ...)
+            ('idx_lol_accounts_puuid', 'lol_accounts(puuid)', None),
+            # Live games: mensagens por partida/puuid e limpeza por horário
+            ('idx_live_games_game', 'live_games_notified(game_id, guild_id)', 'message_id IS NOT NULL'),
+            ('idx_live_games_puuid', 'live_games_notified(puuid, notified_at)', 'message_id IS NOT NULL'),
+            ('idx_live_games_notified_at', 'live_games_notified(notified_at)', None),
+            # Bans ativos (listagem e limpeza)
+            ('idx_champion_bans_expires', 'champion_bans(expires_at)', None),
+            # Rankings semanais (earned_date no horário do Brasil) e totais do ano
+            ('idx_carry_scores_earned_date', 'carry_scores(earned_date, discord_id, score)', None),
+            ('idx_carry_scores_year', 'carry_scores(year, discord_id, score)', None),
+            ('idx_piorzin_scores_earned_date', 'piorzin_scores(earned_date, discord_id, score)', None),
+            ('idx_piorzin_scores_year', 'piorzin_scores(year, discord_id, score)', None),
+            ('idx_gold_medals_account_year', 'gold_medals(lol_account_id, year)', None),
+        )
+        for name, target, where in indexes:
+            sql = f'CREATE INDEX IF NOT EXISTS {name} ON {target}'
+            if where:
+                sql += f' WHERE {where}'
+            cursor.execute(sql)
+    
+    def hot_queries(self) -> List[tuple]:
+        """
+        Consultas quentes verificadas por check_query_plans: (nome, SQL, parâmetros de exemplo).
+        O SQL é a mesma constante usada pelo método; listas IN usam alguns "?" de exemplo.
+        """
+        def placeholders(count: int) -> str:
+            return ','.join('?' * count)
+        
+        return [
+            ('get_last_match_id', self.LAST_MATCH_ID_SQL, (1,)),
+            ('get_known_match_ids', self.KNOWN_MATCH_IDS_SQL.format(placeholders=placeholders(3)),
+             (1, 'BR1_1', 'BR1_2', 'BR1_3')),
+            ('get_last_n_matches_with_champion', self.LAST_N_MATCHES_WITH_CHAMPION_SQL, (1, 'Ahri', 3)),
+            ('get_monthly_matches', self.MONTHLY_MATCHES_SQL.format(remake_filter=''),
+             (1, '2026-01-01', '2026-02-01')),
+            ('get_monthly_matches (sem remakes)', self.MONTHLY_MATCHES_SQL.format(remake_filter=self.NO_REMAKES_FILTER),
+             (1, '2026-01-01', '2026-02-01')),
+            ('get_all_matches_by_date', self.ALL_MATCHES_BY_DATE_SQL, ('1', '2026-01-02')),
+            ('get_profile_stats', self.PROFILE_STATS_SQL, ('1', 2026)),
+            ('get_champion_stats', self.CHAMPION_STATS_SQL, ('1', 2026, 'Ahri')),
+            ('get_top_players_by_mvp', self.TOP_PLAYERS_BY_MVP_SQL, ('2026-01-01', '2026-02-01', 5, 10)),
+            ('update_live_game_result', self.LIVE_GAME_MESSAGES_SQL.format(placeholders=placeholders(10)),
+             tuple(f'p{i}' for i in range(10))),
+            ('get_active_live_games', self.ACTIVE_LIVE_GAMES_SQL, (2,)),
+            ('was_match_notification_sent', self.MATCH_NOTIFICATION_SENT_SQL, (1, 'BR1_1')),
+            ('was_performance_alert_sent', self.PERFORMANCE_ALERT_SENT_SQL, (1, 'BR1_1', 'Ahri')),
+            ('get_sent_match_notifications', self.SENT_MATCH_NOTIFICATIONS_SQL.format(placeholders=placeholders(3)),
+             (1, 'BR1_1', 'BR1_2', 'BR1_3')),
+            ('is_champion_banned', self.CHAMPION_BANNED_SQL, (1, 'Ahri')),
+            ('get_weekly_leaderboard', self.WEEKLY_LEADERBOARD_SQL,
+             ('carry', '2026-01-05', '2026-01-11', 10, '1')),
+            ('get_total_carry_score', self.TOTAL_CARRY_SCORE_SQL, ('1', 2026)),
+            ('get_recent_scoring_games', self.RECENT_SCORING_GAMES_SQL.format(placeholders=placeholders(2)),
+             ('1', '2', 50)),
+        ]
+    
+    def check_query_plans(self) -> Dict[str, List[str]]:
+        """
+        Roda EXPLAIN QUERY PLAN nas hot_queries e retorna as que varrem uma tabela inteira
+        ({consulta: [passos com SCAN]}). Vazio = todas usam índice.
+        Percorrer um índice parcial em ordem (ORDER BY ... LIMIT) não conta: ele só tem as linhas
+        que a consulta quer. Nem o SCAN do resultado intermediário de uma window function (subquery)
+        ou de uma CTE (WITH ranked AS ...).
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql LIKE '% WHERE %'")
+        partial_indexes = {row[0] for row in cursor.fetchall()}
+        
+        full_scans = {}
+        for name, sql, params in self.hot_queries():
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [detail for *_, detail in cursor.fetchall()]
+            intermediate = {detail.split(' ', 1)[1] for detail in plan
+                            if detail.startswith(('CO-ROUTINE ', 'MATERIALIZE '))}
+            scans = [detail for detail in plan
+                     if detail.startswith('SCAN ') and detail[5:] not in intermediate
+                     and not detail.startswith('SCAN (subquery')
+                     and detail.split(' INDEX ')[-1] not in partial_indexes]
+            if scans:
+                full_scans[name] = scans
+        
         conn.close()
+        return full_scans
+    
+    def _migrate_legacy_matches(self, cursor):
+        """
+        Migração única: converte a antiga tabela matches (uma linha por conta/partida, campos da
+        partida duplicados) para match_core + match_participants + match_accounts.
+        Os ids das linhas são mantidos; a tabela antiga é removida para dar lugar à view.
+        Roda dentro da transação da migração: com erro, a tabela antiga fica intacta.
+        """
+        cursor.execute("SELECT type FROM sqlite_master WHERE name = 'matches'")
+        row = cursor.fetchone()
+        if not row or row[0] != 'table':
+            return
+        
+        # Colunas adicionadas em versões antigas (bancos criados antes delas)
+        for column, definition in (('is_remake', 'BOOLEAN DEFAULT 0'),
+                                   ('mvp_score', 'REAL DEFAULT 0'),
+                                   ('mvp_placement', 'INTEGER DEFAULT 0')):
+            try:
+                cursor.execute(f"SELECT {column} FROM matches LIMIT 1")
+            except sqlite3.OperationalError:
+                print(f"🔄 Migrando banco: adicionando coluna {column}...")
+                cursor.execute(f'ALTER TABLE matches ADD COLUMN {column} {definition}')
+        
+        cursor.execute('SELECT COUNT(*) FROM matches')
+        total = cursor.fetchone()[0]
+        print(f"🔄 Migrando banco: normalizando {total} partida(s) em match_core/match_participants...")
+        
+        # Dados da partida: os da primeira linha registrada
+        cursor.execute('''
+            INSERT OR IGNORE INTO match_core (match_id, game_mode, game_duration, played_at, is_remake)
+            SELECT match_id, game_mode, game_duration, played_at, COALESCE(is_remake, 0)
+            FROM matches
+            WHERE id IN (SELECT MIN(id) FROM matches GROUP BY match_id)
+        ''')
+        
+        # Só os jogadores vinculados foram guardados; a posição real na partida não é conhecida
+        cursor.execute('''
+            CREATE TEMP TABLE legacy_match_rows AS
+            SELECT m.*, a.puuid AS account_puuid,
+                   ? + ROW_NUMBER() OVER (PARTITION BY m.match_id ORDER BY m.id) - 1 AS participant_index
+            FROM matches m
+            LEFT JOIN lol_accounts a ON a.id = m.lol_account_id
+        ''', (self.LEGACY_PARTICIPANT_OFFSET,))
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO match_participants (
+                match_id, participant_index, puuid, champion_name, role, win,
+                kills, deaths, assists, damage_dealt, damage_taken, gold_earned, cs, vision_score,
+                mvp_score, mvp_placement, kda, kill_participation
+            )
+            SELECT match_id, participant_index, account_puuid, champion_name, role, win,
+                   kills, deaths, assists, damage_dealt, damage_taken, gold_earned, cs, vision_score,
+                   COALESCE(mvp_score, 0), COALESCE(mvp_placement, 0), kda, kill_participation
+            FROM legacy_match_rows
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO match_accounts (id, lol_account_id, match_id, participant_index,
+                                                  played_at, is_remake, created_at)
+            SELECT id, lol_account_id, match_id, participant_index,
+                   played_at, COALESCE(is_remake, 0), created_at
+            FROM legacy_match_rows
+        ''')
+        
+        cursor.execute('DROP TABLE legacy_match_rows')
+        cursor.execute('DROP TABLE matches')
+        
+        cursor.execute('SELECT COUNT(*) FROM match_core')
+        games = cursor.fetchone()[0]
+        print(f"✅ Migração concluída: {total} registro(s) -> {games} partida(s) únicas")
+    
+    def _save_match_rows(self, cursor, match_data: Dict) -> int:
+        """
+        Grava a partida em match_core e os jogadores em match_participants (uma vez por partida).
+        match_data são as estatísticas de RiotAPI.extract_player_stats; 'participants' traz os 10
+        jogadores. Se a partida só tinha os jogadores migrados da tabela antiga, os registros das
+        contas passam a apontar para a posição real e as linhas antigas são descartadas.
+        Retorna a posição (participant_index) do jogador das estatísticas.
+        """
+        match_id = match_data['match_id']
+        participants = match_data.get('participants')
+        full_roster = bool(participants)
+        
+        participant_index = match_data.get('participant_index')
+        if participant_index is None:
+            # Sem a posição real: próxima posição livre depois das reais (como na migração)
+            cursor.execute('''
+                SELECT MAX(participant_index) FROM match_participants
+                WHERE match_id = ? AND participant_index >= ?
+            ''', (match_id, self.LEGACY_PARTICIPANT_OFFSET))
+            last_index = cursor.fetchone()[0]
+            participant_index = self.LEGACY_PARTICIPANT_OFFSET if last_index is None else last_index + 1
+        if not participants:
+            # Sem o restante da partida: guarda só o jogador
+            participants = [dict(match_data, participant_index=participant_index)]
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO match_core (match_id, queue_id, game_mode, game_duration, played_at, is_remake, full_roster)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            match_id,
+            match_data.get('queue_id'),
+            match_data['game_mode'],
+            match_data['game_duration'],
+            match_data['played_at'],
+            match_data.get('is_remake', False),
+            full_roster
+        ))
+        
+        upgraded = False
+        if cursor.rowcount == 0:
+            cursor.execute('SELECT full_roster FROM match_core WHERE match_id = ?', (match_id,))
+            if cursor.fetchone()[0]:
+                # Os 10 jogadores da partida já estão gravados
+                return participant_index
+            if full_roster:
+                cursor.execute('''
+                    UPDATE match_core SET queue_id = ?, full_roster = 1 WHERE match_id = ?
+                ''', (match_data.get('queue_id'), match_id))
+                upgraded = True
+        
+        columns = ', '.join(self.PARTICIPANT_COLUMNS)
+        placeholders = ', '.join('?' * (len(self.PARTICIPANT_COLUMNS) + 1))
+        cursor.executemany(f'''
+            INSERT OR IGNORE INTO match_participants (match_id, {columns}) VALUES ({placeholders})
+        ''', [(match_id, *(p.get(column) for column in self.PARTICIPANT_COLUMNS)) for p in participants])
+        
+        if upgraded:
+            # Partida migrada: contas apontam para a posição real (mesmo puuid) e as linhas antigas saem;
+            # os rollups trocam as estatísticas antigas pelas da posição real
+            self._apply_match_rollups(cursor, 'ma.match_id = ?', (match_id,), sign=-1)
+            cursor.execute('''
+                UPDATE match_accounts SET participant_index = (
+                    SELECT real.participant_index
+                    FROM match_participants legacy
+                    JOIN match_participants real ON real.match_id = legacy.match_id AND real.puuid = legacy.puuid
+                    WHERE legacy.match_id = match_accounts.match_id
+                      AND legacy.participant_index = match_accounts.participant_index
+                      AND real.participant_index < ?
+                )
+                WHERE match_id = ? AND participant_index >= ? AND EXISTS (
+                    SELECT 1
+                    FROM match_participants legacy
+                    JOIN match_participants real ON real.match_id = legacy.match_id AND real.puuid = legacy.puuid
+                    WHERE legacy.match_id = match_accounts.match_id
+                      AND legacy.participant_index = match_accounts.participant_index
+                      AND real.participant_index < ?
+                )
+            ''', (self.LEGACY_PARTICIPANT_OFFSET, match_id, self.LEGACY_PARTICIPANT_OFFSET, self.LEGACY_PARTICIPANT_OFFSET))
+            cursor.execute('''
+                DELETE FROM match_participants
+                WHERE match_id = ? AND participant_index >= ?
+                  AND NOT EXISTS (
+                      SELECT 1 FROM match_accounts ma
+                      WHERE ma.match_id = match_participants.match_id
+                        AND ma.participant_index = match_participants.participant_index
+                  )
+            ''', (match_id, self.LEGACY_PARTICIPANT_OFFSET))
+            self._apply_match_rollups(cursor, 'ma.match_id = ?', (match_id,))
+            cursor.execute('''
+                DELETE FROM stat_rollups
+                WHERE games = 0 AND gold_medals = 0
+                  AND lol_account_id IN (SELECT lol_account_id FROM match_accounts WHERE match_id = ?)
+            ''', (match_id,))
+        
+        return participant_index
+    
+    @staticmethod
+    def _delete_orphan_match_rows(cursor):
+        """Remove partidas (e seus jogadores) que não têm mais nenhuma conta vinculada"""
+        cursor.execute('''
+            DELETE FROM match_participants
+            WHERE match_id NOT IN (SELECT match_id FROM match_accounts)
+        ''')
+        cursor.execute('''
+            DELETE FROM match_core
+            WHERE match_id NOT IN (SELECT match_id FROM match_accounts)
+        ''')
     
     def add_user(self, discord_id: str) -> bool:
         """Adiciona um usuário Discord"""
@@ -438,6 +1047,70 @@ class Database:
         conn.close()
         return accounts
     
+    # Índice em memória puuid -> contas vinculadas, para "quais/quantos dos 10 jogadores são do bot"
+    # sem ir ao banco. Mantido por add_lol_account, unlink_lol_account e update_account_puuid.
+    
+    def load_account_index(self) -> int:
+        """Carrega o índice puuid -> contas (boot). Retorna quantas contas"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, discord_id, region, summoner_name, puuid FROM lol_accounts ORDER BY id')
+        rows = cursor.fetchall()
+        conn.close()
+        
+        by_puuid: Dict[str, tuple] = {}
+        by_id: Dict[int, Dict] = {}
+        for row in rows:
+            account = {'id': row[0], 'discord_id': row[1], 'region': row[2], 'summoner_name': row[3], 'puuid': row[4]}
+            by_puuid[account['puuid']] = by_puuid.get(account['puuid'], ()) + (account,)
+            by_id[account['id']] = account
+        with self._account_index_lock:
+            self._accounts_by_puuid, self._accounts_by_id = by_puuid, by_id
+        return len(by_id)
+    
+    def _reindex_account(self, cursor, account_id: int):
+        """Relê uma conta do banco para o índice (chamado depois do commit de quem alterou lol_accounts)"""
+        if self._accounts_by_puuid is None:
+            self.load_account_index()
+            return
+        cursor.execute('SELECT id, discord_id, region, summoner_name, puuid FROM lol_accounts WHERE id = ?', (account_id,))
+        row = cursor.fetchone()
+        
+        with self._account_index_lock:
+            # Tuplas novas no lugar das antigas: leitores em outras threads nunca veem uma lista pela metade
+            old = self._accounts_by_id.pop(account_id, None)
+            if old is not None:
+                remaining = tuple(a for a in self._accounts_by_puuid.get(old['puuid'], ()) if a['id'] != account_id)
+                if remaining:
+                    self._accounts_by_puuid[old['puuid']] = remaining
+                else:
+                    self._accounts_by_puuid.pop(old['puuid'], None)
+            if row:
+                account = {'id': row[0], 'discord_id': row[1], 'region': row[2], 'summoner_name': row[3], 'puuid': row[4]}
+                self._accounts_by_id[account_id] = account
+                self._accounts_by_puuid[account['puuid']] = tuple(sorted(
+                    self._accounts_by_puuid.get(account['puuid'], ()) + (account,), key=lambda a: a['id']))
+    
+    def get_linked_accounts(self, puuids: List[str]) -> Dict[str, tuple]:
+        """Contas vinculadas de cada puuid da lista que é do bot ({puuid: (conta, ...)}); sem I/O"""
+        if self._accounts_by_puuid is None:
+            self.load_account_index()
+        index = self._accounts_by_puuid
+        return {puuid: index[puuid] for puuid in set(puuids) & index.keys()}
+    
+    def count_linked_accounts(self, puuids: List[str]) -> int:
+        """Quantas contas vinculadas têm um dos puuids (mesma contagem do antigo COUNT(*) ... puuid IN)"""
+        if self._accounts_by_puuid is None:
+            self.load_account_index()
+        index = self._accounts_by_puuid
+        return sum(len(index.get(puuid, ())) for puuid in puuids)
+    
+    def get_indexed_account(self, lol_account_id: int) -> Optional[Dict]:
+        """Conta vinculada pelo id (id, discord_id, region, summoner_name, puuid), lida do índice em memória"""
+        if self._accounts_by_id is None:
+            self.load_account_index()
+        return self._accounts_by_id.get(lol_account_id)
+    
     def add_lol_account(self, discord_id: str, summoner_name: str, summoner_id: str, 
                        puuid: str, account_id: str, region: str) -> tuple[bool, str]:
         """Adiciona uma conta LOL para um usuário (máximo 3)"""
@@ -459,6 +1132,7 @@ class Database:
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (discord_id, summoner_name, summoner_id, puuid, account_id, region))
             conn.commit()
+            self._reindex_account(cursor, cursor.lastrowid)
             conn.close()
             return True, "Conta vinculada com sucesso!"
         except sqlite3.IntegrityError:
@@ -483,49 +1157,42 @@ class Database:
             
             conn.commit()
             deleted = cursor.rowcount
+            self._reindex_account(cursor, lol_account_id)
             conn.close()
+            self._reload_live_game_markers()
             
             return deleted > 0
         except Exception as e:
             print(f"❌ [DATABASE] Erro ao desvincular conta: {e}")
             return False
     
-    def add_match(self, lol_account_id: int, match_data: Dict) -> bool:
-        """Adiciona uma partida ao histórico"""
+    def add_match(self, lol_account_id: int, match_data: Dict, game_end: int = None) -> bool:
+        """
+        Adiciona uma partida ao histórico.
+        A partida e os 10 jogadores são gravados uma única vez (match_core/match_participants);
+        para a conta só é registrado o vínculo com o seu participante.
+        Se game_end (epoch em segundos) for informado, avança o cursor de ingestão na mesma transação.
+        """
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
             
+            participant_index = self._save_match_rows(cursor, match_data)
+            
+            played_ts = match_data.get('played_ts') or played_at_timestamp(match_data.get('played_at'))
+            time_columns = local_time_columns(played_ts) if played_ts is not None else (None, None, None)
             cursor.execute('''
-                INSERT OR IGNORE INTO matches (
-                    lol_account_id, match_id, game_mode, champion_name, role,
-                    kills, deaths, assists, damage_dealt, damage_taken,
-                    gold_earned, cs, vision_score, game_duration, win,
-                    mvp_score, mvp_placement, kda, kill_participation, played_at, is_remake
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                lol_account_id,
-                match_data['match_id'],
-                match_data['game_mode'],
-                match_data['champion_name'],
-                match_data.get('role', 'Unknown'),
-                match_data['kills'],
-                match_data['deaths'],
-                match_data['assists'],
-                match_data['damage_dealt'],
-                match_data['damage_taken'],
-                match_data['gold_earned'],
-                match_data['cs'],
-                match_data['vision_score'],
-                match_data['game_duration'],
-                match_data['win'],
-                match_data.get('mvp_score', 0),
-                match_data.get('mvp_placement', 0),
-                match_data.get('kda', 0),
-                match_data.get('kill_participation', 0),
-                match_data['played_at'],
-                match_data.get('is_remake', False)
-            ))
+                INSERT OR IGNORE INTO match_accounts (lol_account_id, match_id, participant_index, played_at, is_remake,
+                                                      played_ts, played_date, played_year, played_week)
+                SELECT ?, ?, ?, played_at, COALESCE(is_remake, 0), ?, ?, ?, ? FROM match_core WHERE match_id = ?
+            ''', (lol_account_id, match_data['match_id'], participant_index, played_ts, *time_columns,
+                  match_data['match_id']))
+            if cursor.rowcount == 1:
+                self._apply_match_rollups(cursor, 'ma.lol_account_id = ? AND ma.match_id = ?',
+                                          (lol_account_id, match_data['match_id']))
+            
+            if game_end is not None:
+                self._advance_ingestion_cursor(cursor, lol_account_id, game_end)
             
             conn.commit()
             conn.close()
@@ -534,29 +1201,102 @@ class Database:
             print(f"Erro ao adicionar partida: {e}")
             return False
     
-    def get_monthly_matches(self, lol_account_id: int, year: int, month: int, include_remakes: bool = True) -> List[Dict]:
-        """Retorna todas as partidas de um mês específico (por padrão inclui remakes apenas para histórico)"""
+    @staticmethod
+    def _advance_ingestion_cursor(cursor, lol_account_id: int, game_end: int):
+        # O cursor só anda para frente, mesmo com execuções concorrentes
+        cursor.execute('''
+            INSERT INTO ingestion_cursors (lol_account_id, last_game_end)
+            VALUES (?, ?)
+            ON CONFLICT(lol_account_id) DO UPDATE SET
+                last_game_end = MAX(last_game_end, excluded.last_game_end),
+                updated_at = CURRENT_TIMESTAMP
+        ''', (lol_account_id, int(game_end)))
+    
+    def advance_ingestion_cursor(self, lol_account_id: int, game_end: int) -> bool:
+        """Avança o cursor de ingestão da conta (partida tratada sem ser salva, ex: outra fila)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            self._advance_ingestion_cursor(cursor, lol_account_id, game_end)
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"❌ Erro ao avançar cursor da conta {lol_account_id}: {e}")
+            return False
+    
+    def get_ingestion_cursor(self, lol_account_id: int) -> Optional[int]:
+        """Retorna o fim (epoch em segundos) da última partida já tratada da conta"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        
-        # Query base
-        query = '''
-            SELECT match_id, game_mode, champion_name, role, kills, deaths, assists,
-                   damage_dealt, damage_taken, gold_earned, cs, vision_score,
-                   game_duration, win, kda, kill_participation, played_at, is_remake
-            FROM matches
+        cursor.execute('''
+            SELECT last_game_end FROM ingestion_cursors
             WHERE lol_account_id = ?
-              AND strftime('%Y', played_at) = ?
-              AND strftime('%m', played_at) = ?
-        '''
+        ''', (lol_account_id,))
         
-        # Se não quer incluir remakes, adiciona filtro
-        if not include_remakes:
-            query += ' AND (is_remake = 0 OR is_remake IS NULL)'
+        result = cursor.fetchone()
+        conn.close()
+        return result[0] if result else None
+    
+    # SQL das consultas quentes: usado pelo método e por check_query_plans ({placeholders} = "?, ?, ...")
+    KNOWN_MATCH_IDS_SQL = '''
+        SELECT match_id FROM matches
+        WHERE lol_account_id = ? AND match_id IN ({placeholders})
+    '''
+    
+    def get_known_match_ids(self, lol_account_id: int, match_ids: List[str]) -> set:
+        """Retorna quais dos match_ids já estão registrados para a conta"""
+        if not match_ids:
+            return set()
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(match_ids))
+        cursor.execute(self.KNOWN_MATCH_IDS_SQL.format(placeholders=placeholders), (lol_account_id, *match_ids))
+        
+        known = {row[0] for row in cursor.fetchall()}
+        conn.close()
+        return known
+    
+    def get_known_match_ends(self, lol_account_id: int, match_ids: List[str]) -> Dict[str, Optional[int]]:
+        """Dos match_ids, os já registrados para a conta com o fim da partida (epoch em segundos, ou None)"""
+        if not match_ids:
+            return {}
         
-        query += ' ORDER BY played_at DESC'
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(match_ids))
+        cursor.execute(f'''
+            SELECT ma.match_id, ma.played_ts + COALESCE(mc.game_duration, 0)
+            FROM match_accounts ma
+            JOIN match_core mc ON mc.match_id = ma.match_id
+            WHERE ma.lol_account_id = ? AND ma.match_id IN ({placeholders})
+        ''', (lol_account_id, *match_ids))
+        
+        known = {row[0]: row[1] for row in cursor.fetchall()}
+        conn.close()
+        return known
+    
+    # {remake_filter}: vazio (com remakes) ou NO_REMAKES_FILTER
+    MONTHLY_MATCHES_SQL = '''
+        SELECT match_id, game_mode, champion_name, role, kills, deaths, assists,
+               damage_dealt, damage_taken, gold_earned, cs, vision_score,
+               game_duration, win, kda, kill_participation, played_at, is_remake
+        FROM matches
+        WHERE lol_account_id = ?
+          AND played_date >= ? AND played_date < ?{remake_filter}
+        ORDER BY played_at DESC
+    '''
+    NO_REMAKES_FILTER = ' AND (is_remake = 0 OR is_remake IS NULL)'
+    
+    def get_monthly_matches(self, lol_account_id: int, year: int, month: int, include_remakes: bool = True) -> List[Dict]:
+        """Retorna todas as partidas de um mês específico (por padrão inclui remakes apenas para histórico)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
         
-        cursor.execute(query, (lol_account_id, str(year), f"{month:02d}"))
+        # Se não quer incluir remakes, adiciona filtro
+        query = self.MONTHLY_MATCHES_SQL.format(remake_filter='' if include_remakes else self.NO_REMAKES_FILTER)
+        cursor.execute(query, (lol_account_id, *month_range(year, month)))
         
         matches = []
         for row in cursor.fetchall():
@@ -584,16 +1324,18 @@ class Database:
         conn.close()
         return matches
     
+    LAST_MATCH_ID_SQL = '''
+        SELECT match_id FROM matches
+        WHERE lol_account_id = ?
+        ORDER BY played_at DESC
+        LIMIT 1
+    '''
+    
     def get_last_match_id(self, lol_account_id: int) -> Optional[str]:
         """Retorna o ID da última partida registrada"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT match_id FROM matches
-            WHERE lol_account_id = ?
-            ORDER BY played_at DESC
-            LIMIT 1
-        ''', (lol_account_id,))
+        cursor.execute(self.LAST_MATCH_ID_SQL, (lol_account_id,))
         
         result = cursor.fetchone()
         conn.close()
@@ -611,7 +1353,7 @@ class Database:
                    mvp_score, mvp_placement
             FROM matches
             WHERE lol_account_id = ?
-              AND date(played_at) = ?
+              AND played_date = ?
             ORDER BY played_at DESC
         ''', (lol_account_id, date_str))
         
@@ -643,22 +1385,24 @@ class Database:
         conn.close()
         return matches
     
+    ALL_MATCHES_BY_DATE_SQL = '''
+        SELECT m.match_id, m.game_mode, m.champion_name, m.role, m.kills, m.deaths, m.assists,
+               m.damage_dealt, m.damage_taken, m.gold_earned, m.cs, m.vision_score,
+               m.game_duration, m.win, m.kda, m.kill_participation, m.played_at, m.is_remake,
+               m.mvp_score, m.mvp_placement, la.summoner_name, la.id as account_id
+        FROM matches m
+        JOIN lol_accounts la ON m.lol_account_id = la.id
+        WHERE la.discord_id = ?
+          AND m.played_date = ?
+        ORDER BY m.played_at DESC
+    '''
+    
     def get_all_matches_by_date(self, discord_id: str, date_str: str) -> List[Dict]:
         """Retorna todas as partidas de todas as contas de um usuário em uma data específica"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT m.match_id, m.game_mode, m.champion_name, m.role, m.kills, m.deaths, m.assists,
-                   m.damage_dealt, m.damage_taken, m.gold_earned, m.cs, m.vision_score,
-                   m.game_duration, m.win, m.kda, m.kill_participation, m.played_at, m.is_remake,
-                   m.mvp_score, m.mvp_placement, la.summoner_name, la.id as account_id
-            FROM matches m
-            JOIN lol_accounts la ON m.lol_account_id = la.id
-            WHERE la.discord_id = ?
-              AND date(m.played_at) = ?
-            ORDER BY m.played_at DESC
-        ''', (discord_id, date_str))
+        cursor.execute(self.ALL_MATCHES_BY_DATE_SQL, (discord_id, date_str))
         
         matches = []
         for row in cursor.fetchall():
@@ -690,6 +1434,61 @@ class Database:
         conn.close()
         return matches
     
+    # ==================== CONFIGURAÇÕES DOS SERVIDORES ====================
+    
+    # Colunas de server_configs mantidas em memória (as leituras de configuração nunca vão ao SQLite)
+    SERVER_CONFIG_COLUMNS = (
+        'notification_channel_id', 'match_channel_id', 'command_channel_id', 'live_game_channel_id',
+        'voting_channel_id', 'top_flex_role_id', 'piorzin_role_id', 'scoring_profile',
+    )
+    
+    def load_server_configs(self) -> int:
+        """Carrega todas as configurações de servidor para a memória (boot). Retorna quantos servidores"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT guild_id, {', '.join(self.SERVER_CONFIG_COLUMNS)} FROM server_configs")
+        configs = {row[0]: dict(zip(self.SERVER_CONFIG_COLUMNS, row[1:])) for row in cursor.fetchall()}
+        conn.close()
+        with self._server_configs_lock:
+            self._server_configs = configs
+        return len(configs)
+    
+    def reload_server_config(self, guild_id: str, cursor=None):
+        """
+        Relê do banco a configuração de um servidor para a memória (write-through dos set_*, logo depois
+        do commit, e entrada do bot num servidor). Sem linha no banco = sai da memória.
+        """
+        conn = None
+        if cursor is None:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(self.SERVER_CONFIG_COLUMNS)} FROM server_configs WHERE guild_id = ?",
+                       (guild_id,))
+        row = cursor.fetchone()
+        if conn is not None:
+            conn.close()
+        
+        if self._server_configs is None:
+            self.load_server_configs()
+        with self._server_configs_lock:
+            # Troca o dicionário inteiro do servidor: leitores nunca veem uma configuração pela metade
+            if row:
+                self._server_configs[guild_id] = dict(zip(self.SERVER_CONFIG_COLUMNS, row))
+            else:
+                self._server_configs.pop(guild_id, None)
+    
+    def forget_server_config(self, guild_id: str):
+        """Tira o servidor da memória (bot saiu do servidor); a linha no banco fica para uma volta futura"""
+        if self._server_configs is not None:
+            with self._server_configs_lock:
+                self._server_configs.pop(guild_id, None)
+    
+    def _server_config_value(self, guild_id: str, column: str) -> Optional[str]:
+        if self._server_configs is None:
+            self.load_server_configs()
+        config = self._server_configs.get(guild_id)
+        return config[column] if config else None
+    
     def set_notification_channel(self, guild_id: str, channel_id: str) -> bool:
         """Define o canal de notificações para um servidor"""
         try:
@@ -700,6 +1499,7 @@ class Database:
                 VALUES (?, ?, CURRENT_TIMESTAMP)
             ''', (guild_id, channel_id))
             conn.commit()
+            self.reload_server_config(guild_id, cursor)
             conn.close()
             return True
         except Exception as e:
@@ -708,16 +1508,7 @@ class Database:
     
     def get_notification_channel(self, guild_id: str) -> Optional[str]:
         """Retorna o canal de notificações configurado para um servidor"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT notification_channel_id FROM server_configs
-            WHERE guild_id = ?
-        ''', (guild_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else None
+        return self._server_config_value(guild_id, 'notification_channel_id')
     
     def set_match_channel(self, guild_id: str, channel_id: str) -> bool:
         """Define o canal de partidas para um servidor"""
@@ -742,6 +1533,7 @@ class Database:
                 ''', (guild_id, channel_id))
             
             conn.commit()
+            self.reload_server_config(guild_id, cursor)
             conn.close()
             return True
         except Exception as e:
@@ -750,16 +1542,7 @@ class Database:
     
     def get_match_channel(self, guild_id: str) -> Optional[str]:
         """Retorna o canal de partidas configurado para um servidor"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT match_channel_id FROM server_configs
-            WHERE guild_id = ?
-        ''', (guild_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else None
+        return self._server_config_value(guild_id, 'match_channel_id')
     
     def set_command_channel(self, guild_id: str, channel_id: str) -> bool:
         """Define o canal de comandos para um servidor"""
@@ -784,6 +1567,7 @@ class Database:
                 ''', (guild_id, channel_id))
             
             conn.commit()
+            self.reload_server_config(guild_id, cursor)
             conn.close()
             return True
         except Exception as e:
@@ -792,16 +1576,7 @@ class Database:
     
     def get_command_channel(self, guild_id: str) -> Optional[str]:
         """Retorna o canal de comandos configurado para um servidor"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT command_channel_id FROM server_configs
-            WHERE guild_id = ?
-        ''', (guild_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else None
+        return self._server_config_value(guild_id, 'command_channel_id')
     
     def set_live_game_channel(self, guild_id: str, channel_id: str) -> bool:
         """Define o canal de live games para um servidor"""
@@ -826,6 +1601,7 @@ class Database:
                 ''', (guild_id, channel_id))
             
             conn.commit()
+            self.reload_server_config(guild_id, cursor)
             conn.close()
             return True
         except Exception as e:
@@ -834,29 +1610,13 @@ class Database:
     
     def get_live_game_channel(self, guild_id: str) -> Optional[str]:
         """Retorna o canal de live games configurado para um servidor"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT live_game_channel_id FROM server_configs
-            WHERE guild_id = ?
-        ''', (guild_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else None
+        return self._server_config_value(guild_id, 'live_game_channel_id')
     
     def is_live_game_notified(self, lol_account_id: int, game_id: str) -> bool:
-        """Verifica se uma live game já foi notificada"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id FROM live_games_notified
-            WHERE lol_account_id = ? AND game_id = ?
-        ''', (lol_account_id, game_id))
-
-        result = cursor.fetchone()
-        conn.close()
-        return result is not None
+        """Verifica se uma live game já foi notificada (memória, sem ir ao banco)"""
+        if self._live_games_notified is None:
+            self._load_live_game_markers()
+        return (lol_account_id, str(game_id)) in self._live_games_notified
 
     def get_live_game_notification_time(self, game_id: str) -> Optional[str]:
         """Retorna o horário da última notificação para um game_id específico"""
@@ -891,6 +1651,8 @@ class Database:
             ''', (lol_account_id, game_id, puuid, summoner_name, champion_id, champion_name, message_id, channel_id, guild_id))
             rows_affected = cursor.rowcount
             conn.commit()
+            self._remember_live_game(lol_account_id, game_id, {
+                'message_id': message_id, 'channel_id': channel_id, 'guild_id': guild_id})
             
             # Verifica se foi salvo
             cursor.execute('SELECT COUNT(*) FROM live_games_notified WHERE game_id = ?', (game_id,))
@@ -918,6 +1680,9 @@ class Database:
             deleted = cursor.rowcount
             conn.close()
             if deleted > 0:
+                # Na janela padrão a memória já expirou as mesmas; outra janela exige recarregar
+                if hours < self.LIVE_GAME_TTL_HOURS:
+                    self._reload_live_game_markers()
                 print(f"🧹 Limpeza: {deleted} notificações antigas removidas")
             return True
         except Exception as e:
@@ -956,43 +1721,16 @@ class Database:
         return None
     
     def get_live_game_message_by_game_id(self, game_id: str, guild_id: str = None) -> Optional[Dict]:
-        """Busca a mensagem de uma partida ao vivo pelo game_id"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Debug: mostra o game_id sendo buscado
-        print(f"🔍 [DB] Buscando mensagem para game_id={game_id} (tipo: {type(game_id)})")
-        
-        # Primeiro, lista todos os game_ids no banco para debug
-        cursor.execute('SELECT DISTINCT game_id FROM live_games_notified WHERE message_id IS NOT NULL')
-        all_game_ids = [row[0] for row in cursor.fetchall()]
-        print(f"🔍 [DB] Game IDs no banco: {all_game_ids}")
-        
-        if guild_id:
-            cursor.execute('''
-                SELECT message_id, channel_id, guild_id
-                FROM live_games_notified
-                WHERE game_id = ? AND guild_id = ? AND message_id IS NOT NULL
-                LIMIT 1
-            ''', (game_id, guild_id))
-        else:
-            cursor.execute('''
-                SELECT message_id, channel_id, guild_id
-                FROM live_games_notified
-                WHERE game_id = ? AND message_id IS NOT NULL
-                LIMIT 1
-            ''', (game_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result:
-            print(f"✅ [DB] Mensagem encontrada: message_id={result[0]}")
-            return {
-                'message_id': result[0],
-                'channel_id': result[1],
-                'guild_id': result[2]
-            }
+        """Busca a mensagem de uma partida ao vivo pelo game_id (memória, sem ir ao banco)"""
+        if self._live_games_notified is None:
+            self._load_live_game_markers()
+        game_id = str(game_id)
+        
+        for lol_account_id in self._live_game_accounts.get(game_id, ()):
+            message = self._live_games_notified.get((lol_account_id, game_id))
+            if message and message['message_id'] and (not guild_id or message['guild_id'] == guild_id):
+                print(f"✅ [DB] Mensagem encontrada: message_id={message['message_id']}")
+                return dict(message)
         print(f"⚠️ [DB] Nenhuma mensagem encontrada para game_id={game_id}")
         return None
     
@@ -1032,40 +1770,36 @@ class Database:
     
     def get_server_config(self, guild_id: str) -> Optional[Dict]:
         """Retorna todas as configurações de um servidor"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT notification_channel_id, match_channel_id, command_channel_id, live_game_channel_id, voting_channel_id, top_flex_role_id FROM server_configs
-            WHERE guild_id = ?
-        ''', (guild_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
+        if self._server_configs is None:
+            self.load_server_configs()
+        config = self._server_configs.get(guild_id)
         
-        if result:
+        if config:
             return {
-                'notification_channel_id': result[0],
-                'match_channel_id': result[1],
-                'command_channel_id': result[2],
-                'live_game_channel_id': result[3],
-                'voting_channel_id': result[4] if len(result) > 4 else None,
-                'top_flex_role_id': result[5] if len(result) > 5 else None
+                'notification_channel_id': config['notification_channel_id'],
+                'match_channel_id': config['match_channel_id'],
+                'command_channel_id': config['command_channel_id'],
+                'live_game_channel_id': config['live_game_channel_id'],
+                'voting_channel_id': config['voting_channel_id'],
+                'top_flex_role_id': config['top_flex_role_id']
             }
         return None
     
+    LAST_N_MATCHES_WITH_CHAMPION_SQL = '''
+        SELECT match_id, champion_name, role, kills, deaths, assists,
+               mvp_score, mvp_placement, win, played_at
+        FROM matches
+        WHERE lol_account_id = ? AND champion_name = ?
+          AND (is_remake = 0 OR is_remake IS NULL)
+        ORDER BY played_at DESC
+        LIMIT ?
+    '''
+    
     def get_last_n_matches_with_champion(self, lol_account_id: int, champion_name: str, n: int = 3) -> List[Dict]:
         """Retorna as últimas N partidas de um usuário com um campeão específico (exclui remakes)"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT match_id, champion_name, role, kills, deaths, assists,
-                   mvp_score, mvp_placement, win, played_at
-            FROM matches
-            WHERE lol_account_id = ? AND champion_name = ?
-              AND (is_remake = 0 OR is_remake IS NULL)
-            ORDER BY played_at DESC
-            LIMIT ?
-        ''', (lol_account_id, champion_name, n))
+        cursor.execute(self.LAST_N_MATCHES_WITH_CHAMPION_SQL, (lol_account_id, champion_name, n))
         
         matches = []
         for row in cursor.fetchall():
@@ -1085,32 +1819,35 @@ class Database:
         conn.close()
         return matches
     
+    # Melhores médias (apenas jogadores com mínimo de partidas, excluindo remakes), ordenado por MVP Score médio
+    TOP_PLAYERS_BY_MVP_SQL = '''
+        SELECT
+            la.discord_id,
+            la.summoner_name,
+            la.region,
+            COUNT(m.id) as total_games,
+            AVG(COALESCE(m.mvp_score, 0)) as avg_mvp,
+            SUM(CASE WHEN m.win = 1 THEN 1 ELSE 0 END) as wins,
+            AVG(m.kda) as avg_kda,
+            AVG(m.kill_participation) as avg_kp
+        FROM matches m
+        JOIN lol_accounts la ON m.lol_account_id = la.id
+        WHERE m.played_date >= ? AND m.played_date < ?
+          AND (m.is_remake = 0 OR m.is_remake IS NULL)
+        GROUP BY la.id
+        HAVING COUNT(m.id) >= ?
+        ORDER BY avg_mvp DESC
+        LIMIT ?
+    '''
+    
     def get_top_players_by_mvp(self, limit: int = 10, min_games: int = 5) -> List[Dict]:
         """Retorna o ranking dos melhores jogadores por MVP score médio (mínimo de jogos, exclui remakes)"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        # Busca melhores médias (apenas jogadores com mínimo de partidas, excluindo remakes)
-        # Ordenado por MVP Score médio
-        cursor.execute('''
-            SELECT
-                la.discord_id,
-                la.summoner_name,
-                la.region,
-                COUNT(m.id) as total_games,
-                AVG(COALESCE(m.mvp_score, 0)) as avg_mvp,
-                SUM(CASE WHEN m.win = 1 THEN 1 ELSE 0 END) as wins,
-                AVG(m.kda) as avg_kda,
-                AVG(m.kill_participation) as avg_kp
-            FROM matches m
-            JOIN lol_accounts la ON m.lol_account_id = la.id
-            WHERE strftime('%Y-%m', m.played_at) = strftime('%Y-%m', 'now')
-              AND (m.is_remake = 0 OR m.is_remake IS NULL)
-            GROUP BY la.id
-            HAVING COUNT(m.id) >= ?
-            ORDER BY avg_mvp DESC
-            LIMIT ?
-        ''', (min_games, limit))
+        # Mês atual no horário do Brasil
+        now = datetime.now(BRAZIL_TZ)
+        cursor.execute(self.TOP_PLAYERS_BY_MVP_SQL, (*month_range(now.year, now.month), min_games, limit))
         
         ranking = []
         for row in cursor.fetchall():
@@ -1145,11 +1882,10 @@ class Database:
             FROM matches
             WHERE lol_account_id = ?
               AND champion_name = ?
-              AND strftime('%Y', played_at) = ?
-              AND strftime('%m', played_at) = ?
+              AND played_date >= ? AND played_date < ?
               AND (is_remake = 0 OR is_remake IS NULL)
             ORDER BY played_at DESC
-        ''', (lol_account_id, champion_name, str(year), f"{month:02d}"))
+        ''', (lol_account_id, champion_name, *month_range(year, month)))
         
         matches = []
         for row in cursor.fetchall():
@@ -1185,15 +1921,112 @@ class Database:
             SELECT DISTINCT champion_name
             FROM matches
             WHERE lol_account_id = ?
-              AND strftime('%Y', played_at) = ?
-              AND strftime('%m', played_at) = ?
+              AND played_date >= ? AND played_date < ?
             ORDER BY champion_name
-        ''', (lol_account_id, str(year), f"{month:02d}"))
+        ''', (lol_account_id, *month_range(year, month)))
         
         champions = [row[0] for row in cursor.fetchall()]
         conn.close()
         return champions
     
+    # ==================== BACKFILL DA TEMPORADA ====================
+    
+    def create_backfill_job(self, lol_account_id: int, season_start: int, end_time: int) -> bool:
+        """Agenda a importação das partidas da temporada (season_start..end_time, epoch em segundos)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR IGNORE INTO backfill_jobs (lol_account_id, season_start, end_time)
+                VALUES (?, ?, ?)
+            ''', (lol_account_id, season_start, end_time))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"❌ [Backfill] Erro ao criar job da conta {lol_account_id}: {e}")
+            return False
+    
+    def _backfill_row_to_dict(self, row) -> Dict:
+        return {
+            'lol_account_id': row[0],
+            'season_start': row[1],
+            'end_time': row[2],
+            'next_start': row[3],
+            'processed': row[4],
+            'saved': row[5],
+            'status': row[6],
+            'puuid': row[7],
+            'region': row[8]
+        }
+    
+    def get_next_backfill_job(self) -> Optional[Dict]:
+        """Retorna o job de backfill pendente mais antigo (de contas ainda vinculadas)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT b.lol_account_id, b.season_start, b.end_time, b.next_start,
+                   b.processed, b.saved, b.status, la.puuid, la.region
+            FROM backfill_jobs b
+            JOIN lol_accounts la ON la.id = b.lol_account_id
+            WHERE b.status IN ('pending', 'running')
+            ORDER BY b.created_at
+            LIMIT 1
+        ''')
+        result = cursor.fetchone()
+        conn.close()
+        return self._backfill_row_to_dict(result) if result else None
+    
+    def get_backfill_job(self, lol_account_id: int) -> Optional[Dict]:
+        """Retorna o progresso do backfill de uma conta"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT b.lol_account_id, b.season_start, b.end_time, b.next_start,
+                   b.processed, b.saved, b.status, la.puuid, la.region
+            FROM backfill_jobs b
+            LEFT JOIN lol_accounts la ON la.id = b.lol_account_id
+            WHERE b.lol_account_id = ?
+        ''', (lol_account_id,))
+        result = cursor.fetchone()
+        conn.close()
+        return self._backfill_row_to_dict(result) if result else None
+    
+    def update_backfill_progress(self, lol_account_id: int, next_start: int, processed: int,
+                                 saved: int, status: str) -> bool:
+        """Grava o checkpoint do backfill (offset da próxima página e contadores acumulados)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE backfill_jobs
+                SET next_start = ?, processed = ?, saved = ?, status = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE lol_account_id = ?
+            ''', (next_start, processed, saved, status, lol_account_id))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"❌ [Backfill] Erro ao salvar checkpoint da conta {lol_account_id}: {e}")
+            return False
+    
+    def get_accounts_play_times(self, days: int = 60) -> Dict[int, List[str]]:
+        """Retorna os horários (played_at) das partidas recentes de cada conta, para o modelo de atividade"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT lol_account_id, played_at
+            FROM match_accounts
+            WHERE played_ts >= ?
+        ''', (int(datetime.now().timestamp()) - int(days) * 86400,))
+
+        play_times = {}
+        for lol_account_id, played_at in cursor.fetchall():
+            play_times.setdefault(lol_account_id, []).append(played_at)
+
+        conn.close()
+        return play_times
+
     def get_user_by_summoner_name(self, summoner_name: str) -> Optional[str]:
         """Busca discord_id pelo summoner name (ignora case e #TAG)"""
         conn = self.get_connection()
@@ -1217,16 +2050,20 @@ class Database:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            cursor.execute('SELECT COUNT(*) FROM matches')
+            cursor.execute('SELECT COUNT(*) FROM match_accounts')
             count = cursor.fetchone()[0]
             
-            cursor.execute('DELETE FROM matches')
+            cursor.execute('DELETE FROM match_accounts')
+            cursor.execute('DELETE FROM match_participants')
+            cursor.execute('DELETE FROM match_core')
+            self._clear_match_rollups(cursor)
             
             # Também limpa as notificações de live games antigas
             cursor.execute('DELETE FROM live_games_notified')
             
             conn.commit()
             conn.close()
+            self._reload_live_game_markers()
             
             print(f"🗑️ [DATABASE] {count} partidas deletadas do banco")
             return True, count
@@ -1240,16 +2077,19 @@ class Database:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            cursor.execute('SELECT COUNT(*) FROM matches WHERE lol_account_id = ?', (lol_account_id,))
+            cursor.execute('SELECT COUNT(*) FROM match_accounts WHERE lol_account_id = ?', (lol_account_id,))
             count = cursor.fetchone()[0]
             
-            cursor.execute('DELETE FROM matches WHERE lol_account_id = ?', (lol_account_id,))
+            cursor.execute('DELETE FROM match_accounts WHERE lol_account_id = ?', (lol_account_id,))
+            self._delete_orphan_match_rows(cursor)
+            self._clear_match_rollups(cursor, 'lol_account_id = ?', (lol_account_id,))
             
             # Limpa notificações de live games dessa conta
             cursor.execute('DELETE FROM live_games_notified WHERE lol_account_id = ?', (lol_account_id,))
             
             conn.commit()
             conn.close()
+            self._reload_live_game_markers()
             
             print(f"🗑️ [DATABASE] {count} partidas deletadas da conta ID {lol_account_id}")
             return True, count
@@ -1271,16 +2111,19 @@ class Database:
                 return True, 0
             
             placeholders = ','.join('?' * len(account_ids))
-            cursor.execute(f'SELECT COUNT(*) FROM matches WHERE lol_account_id IN ({placeholders})', account_ids)
+            cursor.execute(f'SELECT COUNT(*) FROM match_accounts WHERE lol_account_id IN ({placeholders})', account_ids)
             count = cursor.fetchone()[0]
             
-            cursor.execute(f'DELETE FROM matches WHERE lol_account_id IN ({placeholders})', account_ids)
+            cursor.execute(f'DELETE FROM match_accounts WHERE lol_account_id IN ({placeholders})', account_ids)
+            self._delete_orphan_match_rows(cursor)
+            self._clear_match_rollups(cursor, f'lol_account_id IN ({placeholders})', tuple(account_ids))
             
             # Limpa notificações de live games dessas contas
             cursor.execute(f'DELETE FROM live_games_notified WHERE lol_account_id IN ({placeholders})', account_ids)
             
             conn.commit()
             conn.close()
+            self._reload_live_game_markers()
             
             print(f"🗑️ [DATABASE] {count} partidas deletadas do usuário Discord {discord_id}")
             return True, count
@@ -1288,16 +2131,27 @@ class Database:
             print(f"❌ [DATABASE] Erro ao deletar partidas do usuário {discord_id}: {e}")
             return False, 0
     
+    ACTIVE_LIVE_GAMES_SQL = '''
+        SELECT lol_account_id, game_id, message_id, channel_id, guild_id, notified_at, puuid, summoner_name, champion_name
+        FROM live_games_notified
+        WHERE notified_at > datetime('now', '-' || ? || ' hours')
+        ORDER BY notified_at DESC
+    '''
+    
+    # Mensagens de live game dos jogadores (puuids) de uma partida que terminou (update_live_game_result no bot)
+    LIVE_GAME_MESSAGES_SQL = '''
+        SELECT DISTINCT message_id, channel_id, guild_id, lol_account_id, game_id
+        FROM live_games_notified
+        WHERE puuid IN ({placeholders})
+          AND message_id IS NOT NULL
+        ORDER BY notified_at DESC
+    '''
+    
     def get_active_live_games(self, hours: int = 2) -> List[Dict]:
         """Retorna lista de live games notificadas recentemente (últimas X horas) que ainda não foram processadas"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT lol_account_id, game_id, message_id, channel_id, guild_id, notified_at, puuid, summoner_name, champion_name
-            FROM live_games_notified
-            WHERE notified_at > datetime('now', '-' || ? || ' hours')
-            ORDER BY notified_at DESC
-        ''', (hours,))
+        cursor.execute(self.ACTIVE_LIVE_GAMES_SQL, (hours,))
 
         live_games = []
         for row in cursor.fetchall():
@@ -1331,6 +2185,7 @@ class Database:
             conn.commit()
             deleted = cursor.rowcount
             conn.close()
+            self._forget_live_game(game_id)
             
             print(f"🗑️ [DATABASE] {deleted} registro(s) de live game {game_id} removidos")
             return True
@@ -1350,6 +2205,7 @@ class Database:
             conn.commit()
             deleted = cursor.rowcount
             conn.close()
+            self._forget_live_game(game_id, lol_account_id)
             
             if deleted > 0:
                 print(f"✅ [DATABASE] Live game {game_id} removida da lista de notificações")
@@ -1369,6 +2225,7 @@ class Database:
                 WHERE id = ?
             ''', (new_puuid, new_summoner_id, new_account_id, account_id))
             conn.commit()
+            self._reindex_account(cursor, account_id)
             conn.close()
             return True
         except Exception as e:
@@ -1470,15 +2327,17 @@ class Database:
         conn.close()
         return bans
     
+    CHAMPION_BANNED_SQL = '''
+        SELECT id FROM champion_bans
+        WHERE lol_account_id = ? AND champion_name = ? AND expires_at > datetime('now')
+    '''
+    
     def is_champion_banned(self, lol_account_id: int, champion_name: str) -> bool:
         """Verifica se um campeão está banido para o jogador"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT id FROM champion_bans
-            WHERE lol_account_id = ? AND champion_name = ? AND expires_at > datetime('now')
-        ''', (lol_account_id, champion_name))
+        cursor.execute(self.CHAMPION_BANNED_SQL, (lol_account_id, champion_name))
         
         result = cursor.fetchone()
         conn.close()
@@ -1616,71 +2475,275 @@ class Database:
         conn.close()
         return bans
     
-    def was_performance_alert_sent(self, lol_account_id: int, match_id: str, champion_name: str) -> bool:
-        """Verifica se já foi enviado alerta de performance para esta partida e campeão"""
+    # ==================== MARCADORES "JÁ FEITO" EM MEMÓRIA ====================
+    # match_notifications_sent, performance_alerts_sent e live_games_notified ficam espelhadas em
+    # ExpiringMap. O banco continua sendo a fonte da verdade.
+    # Live games: a memória tem tudo o que a limpeza mantém no banco, então ausência = não notificada.
+    # Notificações/alertas: o banco guarda o histórico inteiro (sem limpeza) e a memória só a janela
+    # recente, como cache positivo: ausência na memória confere no banco (e guarda o acerto).
+    # A ausência confirmada no banco fica num cache negativo curto, para o loop do bot não repetir
+    # a consulta; marcar o envio tira a chave dele.
+    
+    SENT_MARKER_TTL_HOURS = 7 * 24
+    SENT_MARKER_MAX_ENTRIES = 50000
+    SENT_MARKER_MISS_TTL_SECONDS = 120
+    # Mesma janela da limpeza feita pelo check_live_games (cleanup_old_live_game_notifications)
+    LIVE_GAME_TTL_HOURS = 6
+    LIVE_GAME_MAX_ENTRIES = 5000
+    
+    def load_sent_markers(self) -> int:
+        """Carrega os marcadores da janela recente (boot). Retorna quantos ficaram em memória"""
+        match_notifications = ExpiringMap(self.SENT_MARKER_TTL_HOURS * 3600, self.SENT_MARKER_MAX_ENTRIES)
+        performance_alerts = ExpiringMap(self.SENT_MARKER_TTL_HOURS * 3600, self.SENT_MARKER_MAX_ENTRIES)
+        window = f'-{int(self.SENT_MARKER_TTL_HOURS)} hours'
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT lol_account_id, match_id, CAST(strftime('%s', sent_at) AS INTEGER)
+            FROM match_notifications_sent
+            WHERE sent_at >= datetime('now', ?)
+            ORDER BY sent_at
+        ''', (window,))
+        match_notifications.load(((row[0], row[1]), True, row[2]) for row in cursor.fetchall())
+        cursor.execute('''
+            SELECT lol_account_id, match_id, champion_name, CAST(strftime('%s', sent_at) AS INTEGER)
+            FROM performance_alerts_sent
+            WHERE sent_at >= datetime('now', ?)
+            ORDER BY sent_at
+        ''', (window,))
+        performance_alerts.load(((row[0], row[1], row[2]), True, row[3]) for row in cursor.fetchall())
+        conn.close()
+        
+        with self._markers_lock:
+            # O que ainda está na fila de escrita não chegou ao banco, mas já foi feito
+            for kind, params in self._pending_markers:
+                if kind == 'match':
+                    match_notifications.put(params)
+                else:
+                    performance_alerts.put(params[:3])
+            self._match_notifications, self._performance_alerts = match_notifications, performance_alerts
+        
+        self._load_live_game_markers()
+        return len(match_notifications) + len(performance_alerts) + len(self._live_games_notified)
+    
+    def _load_live_game_markers(self):
+        """Carrega as live games notificadas dentro da janela de limpeza"""
+        live_games = ExpiringMap(self.LIVE_GAME_TTL_HOURS * 3600, self.LIVE_GAME_MAX_ENTRIES)
+        game_accounts = ExpiringMap(self.LIVE_GAME_TTL_HOURS * 3600, self.LIVE_GAME_MAX_ENTRIES)
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT lol_account_id, game_id, message_id, channel_id, guild_id,
+                   CAST(strftime('%s', notified_at) AS INTEGER)
+            FROM live_games_notified
+            WHERE notified_at >= datetime('now', ?)
+            ORDER BY notified_at
+        ''', (f'-{int(self.LIVE_GAME_TTL_HOURS)} hours',))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        live_games.load(((row[0], str(row[1])), {'message_id': row[2], 'channel_id': row[3], 'guild_id': row[4]}, row[5])
+                        for row in rows)
+        accounts: Dict[str, set] = {}
+        last_notified: Dict[str, int] = {}
+        for row in rows:
+            accounts.setdefault(str(row[1]), set()).add(row[0])
+            last_notified[str(row[1])] = row[5]
+        game_accounts.load((game_id, frozenset(accounts[game_id]), last_notified[game_id])
+                           for game_id in sorted(last_notified, key=last_notified.get))
+        
+        with self._markers_lock:
+            self._live_games_notified, self._live_game_accounts = live_games, game_accounts
+    
+    def _reload_live_game_markers(self):
+        """Recarrega as live games depois de uma remoção em massa (só se já estavam em memória)"""
+        if self._live_games_notified is not None:
+            self._load_live_game_markers()
+    
+    def _remember_live_game(self, lol_account_id: int, game_id: str, message: Dict):
+        """Registra em memória uma live game recém-gravada (chamado depois do commit)"""
+        if self._live_games_notified is None:
+            self._load_live_game_markers()
+            return
+        game_id = str(game_id)
+        with self._markers_lock:
+            self._live_games_notified.put((lol_account_id, game_id), message)
+            self._live_game_accounts.put(game_id, self._live_game_accounts.get(game_id, frozenset()) | {lol_account_id})
+    
+    def _forget_live_game(self, game_id: str, lol_account_id: int = None):
+        """Tira da memória uma live game removida do banco (uma conta ou a partida inteira)"""
+        if self._live_games_notified is None:
+            return
+        game_id = str(game_id)
+        with self._markers_lock:
+            accounts = self._live_game_accounts.get(game_id, frozenset())
+            removed = accounts if lol_account_id is None else {lol_account_id}
+            for account_id in removed:
+                self._live_games_notified.discard((account_id, game_id))
+            if accounts - removed:
+                self._live_game_accounts.put(game_id, accounts - removed)
+            else:
+                self._live_game_accounts.discard(game_id)
+    
+    def flush_sent_markers(self) -> int:
+        """Grava no banco os marcadores de notificação/alerta pendentes. Retorna quantos"""
+        with self._flush_lock:
+            with self._markers_lock:
+                batch = list(self._pending_markers)
+            if not batch:
+                return 0
+            
+            try:
+                conn = self.get_connection()
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO match_notifications_sent
+                    (lol_account_id, match_id)
+                    VALUES (?, ?)
+                ''', [params for kind, params in batch if kind == 'match'])
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO performance_alerts_sent
+                    (lol_account_id, match_id, champion_name, alert_type)
+                    VALUES (?, ?, ?, ?)
+                ''', [params for kind, params in batch if kind == 'alert'])
+                conn.commit()
+                conn.close()
+            except Exception as e:
+                print(f"❌ Erro ao gravar {len(batch)} marcador(es) pendente(s), nova tentativa no próximo flush: {e}")
+                return 0
+            
+            with self._markers_lock:
+                del self._pending_markers[:len(batch)]
+            return len(batch)
+    
+    def get_sent_marker_stats(self) -> Dict[str, Dict[str, int]]:
+        """Métricas dos marcadores em memória (para logs/diagnóstico)"""
+        maps = {'notifications': self._match_notifications, 'alerts': self._performance_alerts,
+                'live_games': self._live_games_notified}
+        stats = {name: marker_map.get_stats() for name, marker_map in maps.items() if marker_map is not None}
+        stats['pending'] = {'entries': len(self._pending_markers)}
+        return stats
+    
+    MATCH_NOTIFICATION_SENT_SQL = '''
+        SELECT 1 FROM match_notifications_sent
+        WHERE lol_account_id = ? AND match_id = ?
+    '''
+    PERFORMANCE_ALERT_SENT_SQL = '''
+        SELECT 1 FROM performance_alerts_sent
+        WHERE lol_account_id = ? AND match_id = ? AND champion_name = ?
+    '''
+    
+    SENT_MATCH_NOTIFICATIONS_SQL = '''
+        SELECT match_id FROM match_notifications_sent
+        WHERE lol_account_id = ? AND match_id IN ({placeholders})
+    '''
+    
+    def _pending_marker_keys(self, kind: str, size: int) -> set:
+        """Chaves (tamanho size) ainda na fila de escrita do tipo kind"""
+        with self._markers_lock:
+            return {params[:size] for pending_kind, params in self._pending_markers if pending_kind == kind}
+    
+    def _sent_marker_in_db(self, kind: str, key: tuple) -> bool:
+        """Marcador ausente da memória (antigo ou podado): confere a fila de escrita e o banco"""
+        if key in self._pending_marker_keys(kind, len(key)):
+            return True
+        if (kind, key) in self._sent_marker_misses:
+            return False
+        
+        if kind == 'match':
+            markers, sql = self._match_notifications, self.MATCH_NOTIFICATION_SENT_SQL
+        else:
+            markers, sql = self._performance_alerts, self.PERFORMANCE_ALERT_SENT_SQL
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id FROM performance_alerts_sent
-                WHERE lol_account_id = ? AND match_id = ? AND champion_name = ?
-            ''', (lol_account_id, match_id, champion_name))
-            result = cursor.fetchone()
+            cursor.execute(sql, key)
+            found = cursor.fetchone() is not None
             conn.close()
-            return result is not None
         except Exception as e:
-            print(f"❌ Erro ao verificar alerta: {e}")
+            print(f"❌ Erro ao verificar marcador de envio: {e}")
             return False
+        
+        if found:
+            markers.put(key)
+        else:
+            self._sent_marker_misses.put((kind, key))
+        return found
     
-    def mark_performance_alert_sent(self, lol_account_id: int, match_id: str, champion_name: str, alert_type: str) -> bool:
-        """Marca que um alerta de performance foi enviado para esta partida e campeão"""
+    def get_sent_match_notifications(self, lol_account_id: int, match_ids: List[str]) -> set:
+        """
+        Dos match_ids, os que já tiveram notificação de score enviada para a conta.
+        Mesma resposta de was_match_notification_sent, mas as ausências da memória vão numa única
+        consulta ao banco; acertos entram na memória e ausências no cache negativo, então as
+        chamadas seguintes de was_match_notification_sent para essas partidas não vão ao banco.
+        """
+        if self._match_notifications is None:
+            self.load_sent_markers()
+        
+        sent = {match_id for match_id in match_ids if (lol_account_id, match_id) in self._match_notifications}
+        pending = self._pending_marker_keys('match', 2)
+        sent.update(match_id for match_id in match_ids if (lol_account_id, match_id) in pending)
+        missing = [match_id for match_id in dict.fromkeys(match_ids)
+                   if match_id not in sent and ('match', (lol_account_id, match_id)) not in self._sent_marker_misses]
+        if not missing:
+            return sent
+        
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR IGNORE INTO performance_alerts_sent
-                (lol_account_id, match_id, champion_name, alert_type)
-                VALUES (?, ?, ?, ?)
-            ''', (lol_account_id, match_id, champion_name, alert_type))
-            conn.commit()
+            placeholders = ','.join('?' * len(missing))
+            cursor.execute(self.SENT_MATCH_NOTIFICATIONS_SQL.format(placeholders=placeholders),
+                           (lol_account_id, *missing))
+            found = {row[0] for row in cursor.fetchall()}
             conn.close()
-            return True
         except Exception as e:
-            print(f"❌ Erro ao marcar alerta: {e}")
-            return False
+            print(f"❌ Erro ao verificar notificações enviadas da conta {lol_account_id}: {e}")
+            return sent
+        
+        for match_id in missing:
+            if match_id in found:
+                self._match_notifications.put((lol_account_id, match_id))
+            else:
+                self._sent_marker_misses.put(('match', (lol_account_id, match_id)))
+        return sent | found
+    
+    def was_performance_alert_sent(self, lol_account_id: int, match_id: str, champion_name: str) -> bool:
+        """Verifica se já foi enviado alerta de performance para esta partida e campeão"""
+        if self._performance_alerts is None:
+            self.load_sent_markers()
+        key = (lol_account_id, match_id, champion_name)
+        return key in self._performance_alerts or self._sent_marker_in_db('alert', key)
+    
+    def mark_performance_alert_sent(self, lol_account_id: int, match_id: str, champion_name: str, alert_type: str) -> bool:
+        """Marca que um alerta de performance foi enviado (memória na hora; banco no flush_sent_markers)"""
+        if self._performance_alerts is None:
+            self.load_sent_markers()
+        if (lol_account_id, match_id, champion_name) not in self._performance_alerts:
+            self._performance_alerts.put((lol_account_id, match_id, champion_name))
+            self._sent_marker_misses.discard(('alert', (lol_account_id, match_id, champion_name)))
+            with self._markers_lock:
+                self._pending_markers.append(('alert', (lol_account_id, match_id, champion_name, alert_type)))
+        return True
     
     def was_match_notification_sent(self, lol_account_id: int, match_id: str) -> bool:
         """Verifica se já foi enviada notificação de score para esta partida"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id FROM match_notifications_sent
-                WHERE lol_account_id = ? AND match_id = ?
-            ''', (lol_account_id, match_id))
-            result = cursor.fetchone()
-            conn.close()
-            return result is not None
-        except Exception as e:
-            print(f"❌ Erro ao verificar notificação: {e}")
-            return False
+        if self._match_notifications is None:
+            self.load_sent_markers()
+        key = (lol_account_id, match_id)
+        return key in self._match_notifications or self._sent_marker_in_db('match', key)
     
     def mark_match_notification_sent(self, lol_account_id: int, match_id: str) -> bool:
-        """Marca que uma notificação de score foi enviada para esta partida"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR IGNORE INTO match_notifications_sent
-                (lol_account_id, match_id)
-                VALUES (?, ?)
-            ''', (lol_account_id, match_id))
-            conn.commit()
-            conn.close()
-            return True
-        except Exception as e:
-            print(f"❌ Erro ao marcar notificação: {e}")
-            return False
+        """Marca que uma notificação de score foi enviada (memória na hora; banco no flush_sent_markers)"""
+        if self._match_notifications is None:
+            self.load_sent_markers()
+        if (lol_account_id, match_id) not in self._match_notifications:
+            self._match_notifications.put((lol_account_id, match_id))
+            self._sent_marker_misses.discard(('match', (lol_account_id, match_id)))
+            with self._markers_lock:
+                self._pending_markers.append(('match', (lol_account_id, match_id)))
+        return True
     
     # ==================== SISTEMA DE PINTADO DE OURO (NOTAS BAIXAS) ====================
     
@@ -1689,7 +2752,7 @@ class Database:
         try:
             from datetime import datetime
             if year is None:
-                year = datetime.now().year
+                year = datetime.now(BRAZIL_TZ).year
             
             conn = self.get_connection()
             cursor = conn.cursor()
@@ -1698,6 +2761,13 @@ class Database:
                 (lol_account_id, champion_name, role, match_id, mvp_score, year)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (lol_account_id, champion_name, role, match_id, mvp_score, year))
+            if cursor.rowcount == 1:
+                cursor.execute('''
+                    INSERT INTO stat_rollups (lol_account_id, year, champion_name, role, gold_medals)
+                    VALUES (?, ?, ?, ?, 1)
+                    ON CONFLICT(lol_account_id, year, champion_name, role) DO UPDATE SET
+                        gold_medals = gold_medals + 1
+                ''', (lol_account_id, year, champion_name, role))
             conn.commit()
             conn.close()
             return True
@@ -1709,7 +2779,7 @@ class Database:
         """Retorna contagem de pintados de ouro por campeão (filtrado por ano)"""
         from datetime import datetime
         if year is None:
-            year = datetime.now().year
+            year = datetime.now(BRAZIL_TZ).year
         
         conn = self.get_connection()
         cursor = conn.cursor()
@@ -1735,14 +2805,14 @@ class Database:
         """Retorna contagem de pintados de ouro por role/lane (filtrado por ano)"""
         from datetime import datetime
         if year is None:
-            year = datetime.now().year
+            year = datetime.now(BRAZIL_TZ).year
         
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT role, COUNT(*) as count
-            FROM gold_medals
-            WHERE lol_account_id = ? AND year = ?
+            SELECT role, SUM(gold_medals) as count
+            FROM stat_rollups
+            WHERE lol_account_id = ? AND year = ? AND gold_medals > 0
             GROUP BY role
             ORDER BY count DESC
         ''', (lol_account_id, year))
@@ -1761,12 +2831,12 @@ class Database:
         """Retorna total de pintados de ouro de uma conta (filtrado por ano)"""
         from datetime import datetime
         if year is None:
-            year = datetime.now().year
+            year = datetime.now(BRAZIL_TZ).year
         
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT COUNT(*) FROM gold_medals
+            SELECT COALESCE(SUM(gold_medals), 0) FROM stat_rollups
             WHERE lol_account_id = ? AND year = ?
         ''', (lol_account_id, year))
         
@@ -1778,14 +2848,14 @@ class Database:
         """Retorna total de pintados de ouro de todas as contas de um usuário Discord (filtrado por ano)"""
         from datetime import datetime
         if year is None:
-            year = datetime.now().year
+            year = datetime.now(BRAZIL_TZ).year
         
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT COUNT(*) FROM gold_medals gm
-            JOIN lol_accounts la ON gm.lol_account_id = la.id
-            WHERE la.discord_id = ? AND gm.year = ?
+            SELECT COALESCE(SUM(sr.gold_medals), 0) FROM stat_rollups sr
+            JOIN lol_accounts la ON sr.lol_account_id = la.id
+            WHERE la.discord_id = ? AND sr.year = ?
         ''', (discord_id, year))
         
         result = cursor.fetchone()[0]
@@ -1796,16 +2866,16 @@ class Database:
         """Retorna contagem de pintados de ouro por campeão de todas as contas (filtrado por ano)"""
         from datetime import datetime
         if year is None:
-            year = datetime.now().year
+            year = datetime.now(BRAZIL_TZ).year
         
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT gm.champion_name, COUNT(*) as count
-            FROM gold_medals gm
-            JOIN lol_accounts la ON gm.lol_account_id = la.id
-            WHERE la.discord_id = ? AND gm.year = ?
-            GROUP BY gm.champion_name
+            SELECT sr.champion_name, SUM(sr.gold_medals) as count
+            FROM stat_rollups sr
+            JOIN lol_accounts la ON sr.lol_account_id = la.id
+            WHERE la.discord_id = ? AND sr.year = ? AND sr.gold_medals > 0
+            GROUP BY sr.champion_name
             ORDER BY count DESC
         ''', (discord_id, year))
         
@@ -1823,16 +2893,16 @@ class Database:
         """Retorna contagem de pintados de ouro por role de todas as contas (filtrado por ano)"""
         from datetime import datetime
         if year is None:
-            year = datetime.now().year
+            year = datetime.now(BRAZIL_TZ).year
         
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT gm.role, COUNT(*) as count
-            FROM gold_medals gm
-            JOIN lol_accounts la ON gm.lol_account_id = la.id
-            WHERE la.discord_id = ? AND gm.year = ?
-            GROUP BY gm.role
+            SELECT sr.role, SUM(sr.gold_medals) as count
+            FROM stat_rollups sr
+            JOIN lol_accounts la ON sr.lol_account_id = la.id
+            WHERE la.discord_id = ? AND sr.year = ? AND sr.gold_medals > 0
+            GROUP BY sr.role
             ORDER BY count DESC
         ''', (discord_id, year))
         
@@ -1846,43 +2916,176 @@ class Database:
         conn.close()
         return results
     
-    # ==================== ESTATÍSTICAS DO PERFIL ====================
+    # ==================== ROLLUPS DE ESTATÍSTICAS ====================
     
-    def get_profile_stats(self, discord_id: str, year: int = None) -> Dict:
-        """Retorna estatísticas completas do perfil de um usuário (todas as contas, filtrado por ano)"""
-        from datetime import datetime
-        if year is None:
-            year = datetime.now().year
-        
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Total de partidas, tempo de jogo, vitórias (filtrado por ano)
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total_matches,
-                SUM(m.game_duration) as total_time,
-                SUM(CASE WHEN m.win = 1 THEN 1 ELSE 0 END) as wins,
-                AVG(m.kills) as avg_kills,
-                AVG(m.deaths) as avg_deaths,
-                AVG(m.assists) as avg_assists,
-                AVG(m.kda) as avg_kda,
-                AVG(m.damage_dealt) as avg_damage,
-                AVG(m.gold_earned) as avg_gold,
-                AVG(m.cs) as avg_cs,
-                AVG(m.vision_score) as avg_vision,
-                AVG(m.mvp_score) as avg_mvp_score
-            FROM matches m
-            JOIN lol_accounts la ON m.lol_account_id = la.id
-            WHERE la.discord_id = ?
-              AND (m.is_remake = 0 OR m.is_remake IS NULL)
-              AND strftime('%Y', m.played_at) = ?
-        ''', (discord_id, str(year)))
-        
-        row = cursor.fetchone()
-        conn.close()
+    # Somas mantidas em stat_rollups por (conta, ano, campeão, role), com a expressão somada por partida.
+    # As médias do perfil saem de soma / partidas; kda/mvp/kp guardam também quantas partidas têm o valor
+    # (o AVG do SQL ignora NULL, e partidas antigas migradas podem não ter essas colunas).
+    ROLLUP_MATCH_SUMS = (
+        ('games', '1'),
+        ('wins', 'CASE WHEN mp.win = 1 THEN 1 ELSE 0 END'),
+        ('total_time', 'mc.game_duration'),
+        ('kills', 'mp.kills'),
+        ('deaths', 'mp.deaths'),
+        ('assists', 'mp.assists'),
+        ('damage', 'mp.damage_dealt'),
+        ('gold', 'mp.gold_earned'),
+        ('cs', 'mp.cs'),
+        ('vision', 'mp.vision_score'),
+        ('kda_sum', 'mp.kda'),
+        ('kda_games', 'mp.kda IS NOT NULL'),
+        ('mvp_sum', 'mp.mvp_score'),
+        ('mvp_games', 'mp.mvp_score IS NOT NULL'),
+        ('kp_sum', 'mp.kill_participation'),
+        ('kp_games', 'mp.kill_participation IS NOT NULL'),
+    )
+    
+    def _migration_stat_rollups(self, cursor):
+        """Versão 2: tabela stat_rollups, preenchida com o histórico atual"""
+        columns = ',\n'.join(
+            f"                {column} {'REAL' if column.endswith('_sum') else 'INTEGER'} DEFAULT 0"
+            for column, _ in self.ROLLUP_MATCH_SUMS
+        )
+        # Campeão/role NULL viram '' na chave (NULL nunca conflita numa PRIMARY KEY)
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS stat_rollups (
+                lol_account_id INTEGER NOT NULL,
+                year INTEGER NOT NULL,
+                champion_name TEXT NOT NULL,
+                role TEXT NOT NULL,
+{columns},
+                gold_medals INTEGER DEFAULT 0,
+                PRIMARY KEY (lol_account_id, year, champion_name, role)
+            ) WITHOUT ROWID
+        ''')
+        self._fill_stat_rollups(cursor)
+    
+    def _apply_match_rollups(self, cursor, where: str, params: tuple, sign: int = 1):
+        """
+        Soma (sign=1) ou subtrai (sign=-1) dos rollups as partidas válidas (sem remake, com ano) dos
+        vínculos de match_accounts que casam com where (alias ma). Roda na transação de quem chama.
+        """
+        columns = ', '.join(column for column, _ in self.ROLLUP_MATCH_SUMS)
+        sums = ', '.join(f'{int(sign)} * COALESCE(SUM({expression}), 0)' for _, expression in self.ROLLUP_MATCH_SUMS)
+        updates = ', '.join(f'{column} = {column} + excluded.{column}' for column, _ in self.ROLLUP_MATCH_SUMS)
+        cursor.execute(f'''
+            INSERT INTO stat_rollups (lol_account_id, year, champion_name, role, {columns})
+            SELECT ma.lol_account_id, ma.played_year, COALESCE(mp.champion_name, ''), COALESCE(mp.role, ''), {sums}
+            FROM match_accounts ma
+            JOIN match_core mc ON mc.match_id = ma.match_id
+            JOIN match_participants mp ON mp.match_id = ma.match_id
+                                      AND mp.participant_index = ma.participant_index
+            WHERE {where}
+              AND (ma.is_remake = 0 OR ma.is_remake IS NULL)
+              AND ma.played_year IS NOT NULL
+            GROUP BY ma.lol_account_id, ma.played_year, COALESCE(mp.champion_name, ''), COALESCE(mp.role, '')
+            ON CONFLICT(lol_account_id, year, champion_name, role) DO UPDATE SET {updates}
+        ''', params)
+    
+    def _clear_match_rollups(self, cursor, where: str = '1', params: tuple = ()):
+        """Zera as somas de partidas das linhas de stat_rollups em where (os pintados de ouro ficam)"""
+        zeros = ', '.join(f'{column} = 0' for column, _ in self.ROLLUP_MATCH_SUMS)
+        cursor.execute(f'UPDATE stat_rollups SET {zeros} WHERE {where}', params)
+        cursor.execute(f'DELETE FROM stat_rollups WHERE ({where}) AND gold_medals = 0', params)
+    
+    def _fill_stat_rollups(self, cursor):
+        """Preenche stat_rollups (vazia) a partir de todas as partidas e pintados de ouro"""
+        self._apply_match_rollups(cursor, '1', ())
+        cursor.execute('''
+            INSERT INTO stat_rollups (lol_account_id, year, champion_name, role, gold_medals)
+            SELECT lol_account_id, year, champion_name, role, COUNT(*)
+            FROM gold_medals
+            WHERE 1
+            GROUP BY lol_account_id, year, champion_name, role
+            ON CONFLICT(lol_account_id, year, champion_name, role) DO UPDATE SET
+                gold_medals = gold_medals + excluded.gold_medals
+        ''')
+    
+    def rebuild_stat_rollups(self) -> int:
+        """Recalcula stat_rollups do zero (ex: depois de mexer no banco na mão). Retorna quantas linhas ficaram"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM stat_rollups')
+            self._fill_stat_rollups(cursor)
+            cursor.execute('SELECT COUNT(*) FROM stat_rollups')
+            rows = cursor.fetchone()[0]
+            conn.commit()
+            conn.close()
+            print(f"✅ [Rollups] stat_rollups recalculada: {rows} linha(s)")
+            return rows
+        except Exception as e:
+            print(f"❌ [Rollups] Erro ao recalcular stat_rollups: {e}")
+            return 0
+    
+    # Somas lidas de stat_rollups para montar as médias (ver _rollup_averages)
+    ROLLUP_SELECT = '''
+        SUM(sr.games), SUM(sr.wins), SUM(sr.total_time), SUM(sr.kills), SUM(sr.deaths), SUM(sr.assists),
+        SUM(sr.damage), SUM(sr.gold), SUM(sr.cs), SUM(sr.vision), SUM(sr.kda_sum), SUM(sr.kda_games),
+        SUM(sr.mvp_sum), SUM(sr.mvp_games), SUM(sr.kp_sum), SUM(sr.kp_games)
+    '''
+    
+    PROFILE_STATS_SQL = f'''
+        SELECT {ROLLUP_SELECT}
+        FROM stat_rollups sr
+        JOIN lol_accounts la ON sr.lol_account_id = la.id
+        WHERE la.discord_id = ?
+          AND sr.year = ?
+          AND sr.games > 0
+    '''
+    CHAMPION_STATS_SQL = f'''
+        SELECT {ROLLUP_SELECT}
+        FROM stat_rollups sr
+        JOIN lol_accounts la ON sr.lol_account_id = la.id
+        WHERE la.discord_id = ?
+          AND sr.year = ?
+          AND LOWER(sr.champion_name) = LOWER(?)
+          AND sr.games > 0
+    '''
+    
+    @staticmethod
+    def _rollup_averages(sums: tuple) -> Dict:
+        """Somas de ROLLUP_SELECT -> partidas, vitórias, tempo total e médias (sem arredondar)"""
+        (games, wins, total_time, kills, deaths, assists, damage, gold, cs, vision,
+         kda_sum, kda_games, mvp_sum, mvp_games, kp_sum, kp_games) = (value or 0 for value in sums)
+        
+        def average(total, count):
+            return total / count if count else 0
+        
+        return {
+            'games': games,
+            'wins': wins,
+            'total_time': total_time,
+            'avg_kills': average(kills, games),
+            'avg_deaths': average(deaths, games),
+            'avg_assists': average(assists, games),
+            'avg_kda': average(kda_sum, kda_games),
+            'avg_damage': average(damage, games),
+            'avg_gold': average(gold, games),
+            'avg_cs': average(cs, games),
+            'avg_vision': average(vision, games),
+            'avg_mvp_score': average(mvp_sum, mvp_games),
+            'avg_kp': average(kp_sum, kp_games),
+        }
+    
+    # ==================== ESTATÍSTICAS DO PERFIL ====================
+    
+    def get_profile_stats(self, discord_id: str, year: int = None) -> Dict:
+        """Retorna estatísticas completas do perfil de um usuário (todas as contas, filtrado por ano)"""
+        from datetime import datetime
+        if year is None:
+            year = datetime.now(BRAZIL_TZ).year
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
         
-        if not row or row[0] == 0:
+        # Total de partidas, tempo de jogo, vitórias (filtrado por ano): somas de stat_rollups
+        cursor.execute(self.PROFILE_STATS_SQL, (discord_id, year))
+        
+        stats = self._rollup_averages(cursor.fetchone())
+        conn.close()
+        
+        if stats['games'] == 0:
             return {
                 'total_matches': 0,
                 'total_time_seconds': 0,
@@ -1900,66 +3103,54 @@ class Database:
                 'avg_mvp_score': 0
             }
         
-        total_matches = row[0] or 0
-        wins = row[2] or 0
+        total_matches = stats['games']
+        wins = stats['wins']
         losses = total_matches - wins
         winrate = (wins / total_matches * 100) if total_matches > 0 else 0
         
         return {
             'total_matches': total_matches,
-            'total_time_seconds': row[1] or 0,
+            'total_time_seconds': stats['total_time'],
             'wins': wins,
             'losses': losses,
             'winrate': round(winrate, 1),
-            'avg_kills': round(row[3] or 0, 1),
-            'avg_deaths': round(row[4] or 0, 1),
-            'avg_assists': round(row[5] or 0, 1),
-            'avg_kda': round(row[6] or 0, 2),
-            'avg_damage': round(row[7] or 0, 0),
-            'avg_gold': round(row[8] or 0, 0),
-            'avg_cs': round(row[9] or 0, 1),
-            'avg_vision': round(row[10] or 0, 1),
-            'avg_mvp_score': round(row[11] or 0, 1)
+            'avg_kills': round(stats['avg_kills'], 1),
+            'avg_deaths': round(stats['avg_deaths'], 1),
+            'avg_assists': round(stats['avg_assists'], 1),
+            'avg_kda': round(stats['avg_kda'], 2),
+            'avg_damage': round(stats['avg_damage'], 0),
+            'avg_gold': round(stats['avg_gold'], 0),
+            'avg_cs': round(stats['avg_cs'], 1),
+            'avg_vision': round(stats['avg_vision'], 1),
+            'avg_mvp_score': round(stats['avg_mvp_score'], 1)
         }
     
     def get_top_champions(self, discord_id: str, limit: int = 3, year: int = None) -> List[Dict]:
         """Retorna os campeões mais jogados com estatísticas detalhadas (filtrado por ano)"""
         from datetime import datetime
         if year is None:
-            year = datetime.now().year
+            year = datetime.now(BRAZIL_TZ).year
         
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT 
-                m.champion_name,
-                COUNT(*) as games,
-                SUM(CASE WHEN m.win = 1 THEN 1 ELSE 0 END) as wins,
-                AVG(m.kills) as avg_kills,
-                AVG(m.deaths) as avg_deaths,
-                AVG(m.assists) as avg_assists,
-                AVG(m.kda) as avg_kda,
-                AVG(m.damage_dealt) as avg_damage,
-                AVG(m.gold_earned) as avg_gold,
-                AVG(m.cs) as avg_cs,
-                AVG(m.vision_score) as avg_vision,
-                AVG(m.mvp_score) as avg_mvp_score,
-                AVG(m.kill_participation) as avg_kp
-            FROM matches m
-            JOIN lol_accounts la ON m.lol_account_id = la.id
+        cursor.execute(f'''
+            SELECT NULLIF(sr.champion_name, ''), {self.ROLLUP_SELECT}
+            FROM stat_rollups sr
+            JOIN lol_accounts la ON sr.lol_account_id = la.id
             WHERE la.discord_id = ?
-              AND (m.is_remake = 0 OR m.is_remake IS NULL)
-              AND strftime('%Y', m.played_at) = ?
-            GROUP BY m.champion_name
-            ORDER BY games DESC
+              AND sr.year = ?
+              AND sr.games > 0
+            GROUP BY sr.champion_name
+            ORDER BY SUM(sr.games) DESC
             LIMIT ?
-        ''', (discord_id, str(year), limit))
+        ''', (discord_id, year, limit))
         
         champions = []
         for row in cursor.fetchall():
-            games = row[1]
-            wins = row[2]
+            stats = self._rollup_averages(row[1:])
+            games = stats['games']
+            wins = stats['wins']
             winrate = (wins / games * 100) if games > 0 else 0
             
             champions.append({
@@ -1968,16 +3159,16 @@ class Database:
                 'wins': wins,
                 'losses': games - wins,
                 'winrate': round(winrate, 1),
-                'avg_kills': round(row[3] or 0, 1),
-                'avg_deaths': round(row[4] or 0, 1),
-                'avg_assists': round(row[5] or 0, 1),
-                'avg_kda': round(row[6] or 0, 2),
-                'avg_damage': round(row[7] or 0, 0),
-                'avg_gold': round(row[8] or 0, 0),
-                'avg_cs': round(row[9] or 0, 1),
-                'avg_vision': round(row[10] or 0, 1),
-                'avg_mvp_score': round(row[11] or 0, 1),
-                'avg_kp': round(row[12] or 0, 1)
+                'avg_kills': round(stats['avg_kills'], 1),
+                'avg_deaths': round(stats['avg_deaths'], 1),
+                'avg_assists': round(stats['avg_assists'], 1),
+                'avg_kda': round(stats['avg_kda'], 2),
+                'avg_damage': round(stats['avg_damage'], 0),
+                'avg_gold': round(stats['avg_gold'], 0),
+                'avg_cs': round(stats['avg_cs'], 1),
+                'avg_vision': round(stats['avg_vision'], 1),
+                'avg_mvp_score': round(stats['avg_mvp_score'], 1),
+                'avg_kp': round(stats['avg_kp'], 1)
             })
         
         conn.close()
@@ -1987,33 +3178,29 @@ class Database:
         """Retorna estatísticas por role/lane (filtrado por ano)"""
         from datetime import datetime
         if year is None:
-            year = datetime.now().year
+            year = datetime.now(BRAZIL_TZ).year
         
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT 
-                m.role,
-                COUNT(*) as games,
-                SUM(CASE WHEN m.win = 1 THEN 1 ELSE 0 END) as wins,
-                AVG(m.kda) as avg_kda,
-                AVG(m.mvp_score) as avg_mvp_score
-            FROM matches m
-            JOIN lol_accounts la ON m.lol_account_id = la.id
+        cursor.execute(f'''
+            SELECT sr.role, {self.ROLLUP_SELECT}
+            FROM stat_rollups sr
+            JOIN lol_accounts la ON sr.lol_account_id = la.id
             WHERE la.discord_id = ?
-              AND (m.is_remake = 0 OR m.is_remake IS NULL)
-              AND m.role IS NOT NULL
-              AND m.role != 'Unknown'
-              AND strftime('%Y', m.played_at) = ?
-            GROUP BY m.role
-            ORDER BY games DESC
-        ''', (discord_id, str(year)))
+              AND sr.year = ?
+              AND sr.games > 0
+              AND sr.role != ''
+              AND sr.role != 'Unknown'
+            GROUP BY sr.role
+            ORDER BY SUM(sr.games) DESC
+        ''', (discord_id, year))
         
         roles = []
         for row in cursor.fetchall():
-            games = row[1]
-            wins = row[2]
+            stats = self._rollup_averages(row[1:])
+            games = stats['games']
+            wins = stats['wins']
             winrate = (wins / games * 100) if games > 0 else 0
             
             roles.append({
@@ -2021,8 +3208,8 @@ class Database:
                 'games': games,
                 'wins': wins,
                 'winrate': round(winrate, 1),
-                'avg_kda': round(row[3] or 0, 2),
-                'avg_mvp_score': round(row[4] or 0, 1)
+                'avg_kda': round(stats['avg_kda'], 2),
+                'avg_mvp_score': round(stats['avg_mvp_score'], 1)
             })
         
         conn.close()
@@ -2041,6 +3228,7 @@ class Database:
                 ON CONFLICT(guild_id) DO UPDATE SET voting_channel_id = ?, updated_at = CURRENT_TIMESTAMP
             ''', (guild_id, channel_id, channel_id))
             conn.commit()
+            self.reload_server_config(guild_id, cursor)
             conn.close()
             return True
         except Exception as e:
@@ -2049,12 +3237,7 @@ class Database:
     
     def get_voting_channel(self, guild_id: str) -> Optional[str]:
         """Retorna o canal de votação configurado"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT voting_channel_id FROM server_configs WHERE guild_id = ?', (guild_id,))
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else None
+        return self._server_config_value(guild_id, 'voting_channel_id')
     
     def create_pending_vote(self, game_id: str, guild_id: str, players: str, message_id: str = None, channel_id: str = None, expires_minutes: int = 5) -> bool:
         """Cria uma votação pendente para uma partida"""
@@ -2118,17 +3301,18 @@ class Database:
             return False
     
     def add_mvp_vote(self, game_id: str, voter_discord_id: str, voted_discord_id: str) -> bool:
-        """Adiciona um voto de MVP"""
+        """Adiciona um voto de MVP. False se o jogador já votou nesta partida (o primeiro voto vale)"""
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT OR REPLACE INTO mvp_votes (game_id, voter_discord_id, voted_discord_id)
+                INSERT OR IGNORE INTO mvp_votes (game_id, voter_discord_id, voted_discord_id)
                 VALUES (?, ?, ?)
             ''', (game_id, voter_discord_id, voted_discord_id))
+            added = cursor.rowcount == 1
             conn.commit()
             conn.close()
-            return True
+            return added
         except Exception as e:
             print(f"Erro ao adicionar voto: {e}")
             return False
@@ -2168,18 +3352,135 @@ class Database:
         conn.close()
         return counts
     
+    # ==================== PLACAR SEMANAL (CARRY / PIORZIN) ====================
+    
+    # Tabela de cada tipo de score em weekly_scores.kind
+    SCORE_TABLES = {'carry': 'carry_scores', 'piorzin': 'piorzin_scores'}
+    
+    def _migration_weekly_scores(self, cursor):
+        """Versão 3: placar semanal materializado (weekly_scores), preenchido com os scores atuais"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS weekly_scores (
+                kind TEXT NOT NULL,
+                week_start TEXT NOT NULL,
+                discord_id TEXT NOT NULL,
+                total_score INTEGER NOT NULL DEFAULT 0,
+                games INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (kind, week_start, discord_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_weekly_scores_rank
+            ON weekly_scores(kind, week_start, total_score DESC)
+        ''')
+        for kind, table in self.SCORE_TABLES.items():
+            cursor.execute(f'''
+                INSERT OR REPLACE INTO weekly_scores (kind, week_start, discord_id, total_score, games)
+                SELECT ?, earned_week, discord_id, SUM(score), COUNT(*)
+                FROM {table}
+                WHERE earned_week IS NOT NULL
+                GROUP BY earned_week, discord_id
+            ''', (kind,))
+    
+    def _migration_sent_markers(self, cursor):
+        """Versão 4: índices por sent_at para carregar só a janela recente dos marcadores no boot"""
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_match_notifications_sent_at ON match_notifications_sent(sent_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_performance_alerts_sent_at ON performance_alerts_sent(sent_at)')
+    
+    def _record_weekly_score(self, cursor, kind: str, discord_id: str, game_id: str, score: int, earned_week: str):
+        """
+        Atualiza weekly_scores para um score que vai ser gravado (INSERT OR REPLACE) na tabela do tipo.
+        Se o jogador já tinha score nessa partida, o valor antigo sai da semana em que foi contado.
+        Chamado antes do INSERT, na mesma transação.
+        """
+        cursor.execute(f'''
+            SELECT score, earned_week FROM {self.SCORE_TABLES[kind]}
+            WHERE discord_id = ? AND game_id = ?
+        ''', (discord_id, game_id))
+        previous = cursor.fetchone()
+        if previous and previous[1] is not None:
+            cursor.execute('''
+                UPDATE weekly_scores SET total_score = total_score - ?, games = games - 1
+                WHERE kind = ? AND week_start = ? AND discord_id = ?
+            ''', (previous[0], kind, previous[1], discord_id))
+            cursor.execute('''
+                DELETE FROM weekly_scores
+                WHERE kind = ? AND week_start = ? AND discord_id = ? AND games <= 0
+            ''', (kind, previous[1], discord_id))
+        
+        cursor.execute('''
+            INSERT INTO weekly_scores (kind, week_start, discord_id, total_score, games)
+            VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT(kind, week_start, discord_id) DO UPDATE SET
+                total_score = total_score + excluded.total_score,
+                games = games + 1
+        ''', (kind, earned_week, discord_id, score))
+    
+    # Placar das semanas (segunda-feira) entre week_start e week_end, com a posição de cada jogador.
+    # RANK(): empatados ficam na mesma posição; row_number só desempata a ordem de exibição.
+    WEEKLY_RANKING_SQL = '''
+        SELECT discord_id, SUM(total_score) AS total_score, SUM(games) AS games,
+               RANK() OVER (ORDER BY SUM(total_score) DESC) AS position,
+               ROW_NUMBER() OVER (ORDER BY SUM(total_score) DESC, discord_id) AS row_number,
+               COUNT(*) OVER () AS participants
+        FROM weekly_scores
+        WHERE kind = ? AND week_start >= ? AND week_start <= ?
+        GROUP BY discord_id
+    '''
+    
+    WEEKLY_LEADERBOARD_SQL = f'''
+        WITH ranked AS ({WEEKLY_RANKING_SQL})
+        SELECT discord_id, total_score, games, position, row_number, participants
+        FROM ranked
+        WHERE row_number <= MAX(?, 1) OR discord_id = ?
+        ORDER BY row_number
+    '''
+    
+    def get_weekly_leaderboard(self, kind: str, week_start: str, week_end: str,
+                               discord_id: str = None, limit: int = 10) -> Dict:
+        """
+        Top N do placar semanal ('carry' ou 'piorzin') e a posição de discord_id numa única consulta.
+        week_start/week_end: 'YYYY-MM-DD' (no bot, segunda a domingo da semana).
+        Retorna {'ranking': [...], 'player': {position, total_score, total_participants}, 'total_participants'}.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(self.WEEKLY_LEADERBOARD_SQL, (kind, week_start, week_end, limit, discord_id))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        # A primeira linha sempre vem (mesmo com limit=0), para o total de participantes
+        total_participants = rows[0][5] if rows else 0
+        ranking = []
+        player = {'position': 0, 'total_score': 0, 'total_participants': total_participants}
+        for player_id, total_score, games, position, row_number, _ in rows:
+            if row_number <= limit:
+                ranking.append({
+                    'discord_id': player_id,
+                    'total_score': total_score,
+                    'games': games,
+                    'position': position
+                })
+            if player_id == discord_id:
+                player = {'position': position, 'total_score': total_score, 'total_participants': total_participants}
+        
+        return {'ranking': ranking, 'player': player, 'total_participants': total_participants}
+    
     def add_carry_score(self, discord_id: str, game_id: str, score: int, reason: str = None) -> bool:
         """Adiciona carry score para um jogador"""
         try:
             from datetime import datetime
             conn = self.get_connection()
             cursor = conn.cursor()
-            year = datetime.now().year
+            earned_ts = int(datetime.now().timestamp())
+            # Ano, dia e semana do score no horário do Brasil
+            earned_date, year, earned_week = local_time_columns(earned_ts)
             
+            self._record_weekly_score(cursor, 'carry', discord_id, game_id, score, earned_week)
             cursor.execute('''
-                INSERT OR REPLACE INTO carry_scores (discord_id, game_id, score, reason, year)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (discord_id, game_id, score, reason, year))
+                INSERT OR REPLACE INTO carry_scores (discord_id, game_id, score, reason, year, earned_ts, earned_date, earned_week)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (discord_id, game_id, score, reason, year, earned_ts, earned_date, earned_week))
             conn.commit()
             conn.close()
             return True
@@ -2187,18 +3488,20 @@ class Database:
             print(f"Erro ao adicionar carry score: {e}")
             return False
     
+    TOTAL_CARRY_SCORE_SQL = '''
+        SELECT COALESCE(SUM(score), 0) FROM carry_scores
+        WHERE discord_id = ? AND year = ?
+    '''
+    
     def get_total_carry_score(self, discord_id: str, year: int = None) -> int:
         """Retorna o carry score total de um jogador (filtrado por ano)"""
         from datetime import datetime
         if year is None:
-            year = datetime.now().year
+            year = datetime.now(BRAZIL_TZ).year
         
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT COALESCE(SUM(score), 0) FROM carry_scores
-            WHERE discord_id = ? AND year = ?
-        ''', (discord_id, year))
+        cursor.execute(self.TOTAL_CARRY_SCORE_SQL, (discord_id, year))
         
         result = cursor.fetchone()[0]
         conn.close()
@@ -2208,7 +3511,7 @@ class Database:
         """Retorna ranking de carry score"""
         from datetime import datetime
         if year is None:
-            year = datetime.now().year
+            year = datetime.now(BRAZIL_TZ).year
         
         conn = self.get_connection()
         cursor = conn.cursor()
@@ -2235,62 +3538,11 @@ class Database:
     
     def get_weekly_carry_score_ranking(self, week_start: str, week_end: str, limit: int = 10) -> List[Dict]:
         """Retorna ranking de carry score da semana específica"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT discord_id, SUM(score) as total_score, COUNT(*) as games
-            FROM carry_scores
-            WHERE date(earned_at) >= ? AND date(earned_at) <= ?
-            GROUP BY discord_id
-            ORDER BY total_score DESC
-            LIMIT ?
-        ''', (week_start, week_end, limit))
-        
-        ranking = []
-        for row in cursor.fetchall():
-            ranking.append({
-                'discord_id': row[0],
-                'total_score': row[1],
-                'games': row[2]
-            })
-        conn.close()
-        return ranking
+        return self.get_weekly_leaderboard('carry', week_start, week_end, limit=limit)['ranking']
     
     def get_player_current_week_position(self, discord_id: str, week_start: str, week_end: str) -> Dict:
         """Retorna a posição atual do jogador no ranking da semana"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Busca ranking completo da semana
-        cursor.execute('''
-            SELECT discord_id, SUM(score) as total_score
-            FROM carry_scores
-            WHERE date(earned_at) >= ? AND date(earned_at) <= ?
-            GROUP BY discord_id
-            ORDER BY total_score DESC
-        ''', (week_start, week_end))
-        
-        ranking = cursor.fetchall()
-        conn.close()
-        
-        total_participants = len(ranking)
-        
-        # Encontra a posição do jogador
-        for position, (player_id, score) in enumerate(ranking, 1):
-            if player_id == discord_id:
-                return {
-                    'position': position,
-                    'total_score': score,
-                    'total_participants': total_participants
-                }
-        
-        # Jogador não está no ranking
-        return {
-            'position': 0,
-            'total_score': 0,
-            'total_participants': total_participants
-        }
+        return self.get_weekly_leaderboard('carry', week_start, week_end, discord_id, limit=0)['player']
     
     def set_top_flex_role(self, guild_id: str, role_id: str) -> bool:
         """Define o cargo de premiação do top_flex para um servidor"""
@@ -2303,6 +3555,7 @@ class Database:
                 ON CONFLICT(guild_id) DO UPDATE SET top_flex_role_id = ?, updated_at = CURRENT_TIMESTAMP
             ''', (guild_id, role_id, role_id))
             conn.commit()
+            self.reload_server_config(guild_id, cursor)
             conn.close()
             return True
         except Exception as e:
@@ -2311,12 +3564,7 @@ class Database:
     
     def get_top_flex_role(self, guild_id: str) -> Optional[str]:
         """Retorna o cargo de premiação do top_flex configurado"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT top_flex_role_id FROM server_configs WHERE guild_id = ?', (guild_id,))
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result and result[0] else None
+        return self._server_config_value(guild_id, 'top_flex_role_id') or None
     
     def add_top_flex_winner(self, discord_id: str, guild_id: str, week_start: str, week_end: str, total_score: int) -> bool:
         """Registra o vencedor do top_flex da semana"""
@@ -2367,12 +3615,15 @@ class Database:
             from datetime import datetime
             conn = self.get_connection()
             cursor = conn.cursor()
-            year = datetime.now().year
+            earned_ts = int(datetime.now().timestamp())
+            # Ano, dia e semana do score no horário do Brasil
+            earned_date, year, earned_week = local_time_columns(earned_ts)
             
+            self._record_weekly_score(cursor, 'piorzin', discord_id, game_id, score, earned_week)
             cursor.execute('''
-                INSERT OR REPLACE INTO piorzin_scores (discord_id, game_id, score, reason, year)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (discord_id, game_id, score, reason, year))
+                INSERT OR REPLACE INTO piorzin_scores (discord_id, game_id, score, reason, year, earned_ts, earned_date, earned_week)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (discord_id, game_id, score, reason, year, earned_ts, earned_date, earned_week))
             conn.commit()
             conn.close()
             print(f"✅ [Piorzin] Adicionado {score} pontos para {discord_id}")
@@ -2385,7 +3636,7 @@ class Database:
         """Retorna o piorzin score total de um jogador"""
         from datetime import datetime
         if year is None:
-            year = datetime.now().year
+            year = datetime.now(BRAZIL_TZ).year
         
         conn = self.get_connection()
         cursor = conn.cursor()
@@ -2400,27 +3651,7 @@ class Database:
     
     def get_weekly_piorzin_score_ranking(self, week_start: str, week_end: str, limit: int = 10) -> List[Dict]:
         """Retorna ranking de piorzin score da semana"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT discord_id, SUM(score) as total_score, COUNT(*) as games
-            FROM piorzin_scores
-            WHERE date(earned_at) >= ? AND date(earned_at) <= ?
-            GROUP BY discord_id
-            ORDER BY total_score DESC
-            LIMIT ?
-        ''', (week_start, week_end, limit))
-        
-        ranking = []
-        for row in cursor.fetchall():
-            ranking.append({
-                'discord_id': row[0],
-                'total_score': row[1],
-                'games': row[2]
-            })
-        conn.close()
-        return ranking
+        return self.get_weekly_leaderboard('piorzin', week_start, week_end, limit=limit)['ranking']
     
     def set_piorzin_role(self, guild_id: str, role_id: str) -> bool:
         """Define o cargo de premiação do piorzin para um servidor"""
@@ -2433,6 +3664,7 @@ class Database:
                 ON CONFLICT(guild_id) DO UPDATE SET piorzin_role_id = ?, updated_at = CURRENT_TIMESTAMP
             ''', (guild_id, role_id, role_id))
             conn.commit()
+            self.reload_server_config(guild_id, cursor)
             conn.close()
             return True
         except Exception as e:
@@ -2441,12 +3673,7 @@ class Database:
     
     def get_piorzin_role(self, guild_id: str) -> Optional[str]:
         """Retorna o cargo de premiação do piorzin configurado"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT piorzin_role_id FROM server_configs WHERE guild_id = ?', (guild_id,))
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result and result[0] else None
+        return self._server_config_value(guild_id, 'piorzin_role_id') or None
     
     def add_piorzin_winner(self, discord_id: str, guild_id: str, week_start: str, week_end: str, total_score: int) -> bool:
         """Registra o vencedor do piorzin da semana"""
@@ -2520,6 +3747,7 @@ class Database:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM carry_scores')
             deleted = cursor.rowcount
+            cursor.execute("DELETE FROM weekly_scores WHERE kind = 'carry'")
             conn.commit()
             conn.close()
             print(f"✅ [Reset] {deleted} registros de Carry Score deletados")
@@ -2535,6 +3763,7 @@ class Database:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM piorzin_scores')
             deleted = cursor.rowcount
+            cursor.execute("DELETE FROM weekly_scores WHERE kind = 'piorzin'")
             conn.commit()
             conn.close()
             print(f"✅ [Reset] {deleted} registros de Piorzin Score deletados")
@@ -2543,27 +3772,38 @@ class Database:
             print(f"❌ Erro ao resetar Piorzin Scores: {e}")
             return False
     
-    def save_weekly_ranking(self, week_start: str, week_end: str, ranking: List[Dict]) -> bool:
-        """Salva o ranking semanal de todos os participantes"""
+    def snapshot_weekly_ranking(self, week_start: str, week_end: str) -> List[Dict]:
+        """
+        Salva em weekly_rankings as posições de TODOS os participantes da semana (carry), copiadas do
+        placar semanal num único INSERT ... SELECT. Retorna o ranking salvo, em ordem de posição.
+        """
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
-            total_participants = len(ranking)
+            cursor.execute(f'''
+                WITH ranked AS ({self.WEEKLY_RANKING_SQL})
+                INSERT OR REPLACE INTO weekly_rankings
+                (discord_id, week_start, week_end, position, total_score, total_participants)
+                SELECT discord_id, ?, ?, position, total_score, participants
+                FROM ranked
+                ORDER BY row_number
+            ''', ('carry', week_start, week_end, week_start, week_end))
             
-            for position, player in enumerate(ranking, 1):
-                cursor.execute('''
-                    INSERT OR REPLACE INTO weekly_rankings 
-                    (discord_id, week_start, week_end, position, total_score, total_participants)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (player['discord_id'], week_start, week_end, position, player['total_score'], total_participants))
+            cursor.execute('''
+                SELECT discord_id, total_score, position, total_participants
+                FROM weekly_rankings
+                WHERE week_start = ?
+                ORDER BY position, discord_id
+            ''', (week_start,))
+            ranking = [{'discord_id': row[0], 'total_score': row[1], 'position': row[2]} for row in cursor.fetchall()]
             
             conn.commit()
             conn.close()
-            print(f"✅ [Weekly Ranking] Salvo ranking de {total_participants} participantes")
-            return True
+            print(f"✅ [Weekly Ranking] Salvo ranking de {len(ranking)} participantes")
+            return ranking
         except Exception as e:
             print(f"❌ Erro ao salvar ranking semanal: {e}")
-            return False
+            return []
     
     def get_player_weekly_history(self, discord_id: str, limit: int = 10) -> List[Dict]:
         """Retorna histórico de posições semanais de um jogador"""
@@ -2633,42 +3873,21 @@ class Database:
         """Retorna estatísticas detalhadas de um campeão específico para um jogador"""
         from datetime import datetime
         if year is None:
-            year = datetime.now().year
+            year = datetime.now(BRAZIL_TZ).year
         
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as games,
-                SUM(CASE WHEN m.win = 1 THEN 1 ELSE 0 END) as wins,
-                AVG(m.kills) as avg_kills,
-                AVG(m.deaths) as avg_deaths,
-                AVG(m.assists) as avg_assists,
-                AVG(m.kda) as avg_kda,
-                AVG(m.damage_dealt) as avg_damage,
-                AVG(m.gold_earned) as avg_gold,
-                AVG(m.cs) as avg_cs,
-                AVG(m.vision_score) as avg_vision,
-                AVG(m.mvp_score) as avg_mvp_score,
-                AVG(m.kill_participation) as avg_kp,
-                SUM(m.game_duration) as total_time
-            FROM matches m
-            JOIN lol_accounts la ON m.lol_account_id = la.id
-            WHERE la.discord_id = ?
-              AND LOWER(m.champion_name) = LOWER(?)
-              AND (m.is_remake = 0 OR m.is_remake IS NULL)
-              AND strftime('%Y', m.played_at) = ?
-        ''', (discord_id, champion_name, str(year)))
+        cursor.execute(self.CHAMPION_STATS_SQL, (discord_id, year, champion_name))
         
-        row = cursor.fetchone()
+        stats = self._rollup_averages(cursor.fetchone())
         conn.close()
         
-        if not row or row[0] == 0:
+        if stats['games'] == 0:
             return None
         
-        games = row[0]
-        wins = row[1] or 0
+        games = stats['games']
+        wins = stats['wins']
         winrate = (wins / games * 100) if games > 0 else 0
         
         return {
@@ -2677,17 +3896,17 @@ class Database:
             'wins': wins,
             'losses': games - wins,
             'winrate': round(winrate, 1),
-            'avg_kills': round(row[2] or 0, 1),
-            'avg_deaths': round(row[3] or 0, 1),
-            'avg_assists': round(row[4] or 0, 1),
-            'avg_kda': round(row[5] or 0, 2),
-            'avg_damage': round(row[6] or 0, 0),
-            'avg_gold': round(row[7] or 0, 0),
-            'avg_cs': round(row[8] or 0, 1),
-            'avg_vision': round(row[9] or 0, 1),
-            'avg_mvp_score': round(row[10] or 0, 1),
-            'avg_kp': round(row[11] or 0, 1),
-            'total_time_seconds': row[12] or 0
+            'avg_kills': round(stats['avg_kills'], 1),
+            'avg_deaths': round(stats['avg_deaths'], 1),
+            'avg_assists': round(stats['avg_assists'], 1),
+            'avg_kda': round(stats['avg_kda'], 2),
+            'avg_damage': round(stats['avg_damage'], 0),
+            'avg_gold': round(stats['avg_gold'], 0),
+            'avg_cs': round(stats['avg_cs'], 1),
+            'avg_vision': round(stats['avg_vision'], 1),
+            'avg_mvp_score': round(stats['avg_mvp_score'], 1),
+            'avg_kp': round(stats['avg_kp'], 1),
+            'total_time_seconds': stats['total_time']
         }
     
     def increment_pintado_de_ouro(self, lol_account_id: int) -> bool:
@@ -2772,19 +3991,388 @@ class Database:
         """Retorna quantidade de pintados de ouro de um campeão específico"""
         from datetime import datetime
         if year is None:
-            year = datetime.now().year
+            year = datetime.now(BRAZIL_TZ).year
         
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT COUNT(*) 
-            FROM gold_medals gm
-            JOIN lol_accounts la ON gm.lol_account_id = la.id
-            WHERE la.discord_id = ? 
-              AND LOWER(gm.champion_name) = LOWER(?)
-              AND gm.year = ?
-        ''', (discord_id, champion_name, year))
+            SELECT COALESCE(SUM(sr.gold_medals), 0)
+            FROM stat_rollups sr
+            JOIN lol_accounts la ON sr.lol_account_id = la.id
+            WHERE la.discord_id = ?
+              AND sr.year = ?
+              AND LOWER(sr.champion_name) = LOWER(?)
+        ''', (discord_id, year, champion_name))
         
         result = cursor.fetchone()[0]
         conn.close()
         return result
+
+    # ==================== CACHE DE DETALHES DE PARTIDAS ====================
+
+    def get_cached_match_payload(self, match_id: str) -> Optional[bytes]:
+        """Retorna o payload comprimido de uma partida em cache (ou None). Só leitura: o último
+        acesso é atualizado em lote por touch_cached_matches"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT payload FROM match_cache WHERE match_id = ?', (match_id,))
+            result = cursor.fetchone()
+            conn.close()
+            return result[0] if result else None
+        except Exception as e:
+            print(f"❌ [Match Cache] Erro ao ler partida {match_id}: {e}")
+            return None
+
+    def touch_cached_matches(self, match_ids: List[str]) -> bool:
+        """Atualiza o último acesso de várias partidas do cache numa única transação"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.executemany('''
+                UPDATE match_cache SET last_access = CURRENT_TIMESTAMP
+                WHERE match_id = ?
+            ''', [(match_id,) for match_id in match_ids])
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"❌ [Match Cache] Erro ao atualizar último acesso: {e}")
+            return False
+
+    def save_cached_match_payload(self, match_id: str, payload: bytes) -> bool:
+        """Salva (ou substitui) o payload comprimido de uma partida"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO match_cache (match_id, payload)
+                VALUES (?, ?)
+            ''', (match_id, sqlite3.Binary(payload)))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"❌ [Match Cache] Erro ao salvar partida {match_id}: {e}")
+            return False
+
+    def get_non_flex_matches(self, retention_days: int) -> List[tuple]:
+        """Partidas marcadas como de outras filas dentro da retenção: [(match_id, epoch da marcação)], mais antigas primeiro"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT match_id, CAST(strftime('%s', created_at) AS INTEGER)
+            FROM non_flex_matches
+            WHERE created_at >= datetime('now', ?)
+            ORDER BY created_at
+        ''', (f'-{int(retention_days)} days',))
+        result = cursor.fetchall()
+        conn.close()
+        return result
+
+    def add_non_flex_match(self, match_id: str, queue_id: int) -> bool:
+        """Marca uma partida como de outra fila (cache negativo)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR IGNORE INTO non_flex_matches (match_id, queue_id)
+                VALUES (?, ?)
+            ''', (match_id, queue_id))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"❌ [Match Cache] Erro ao marcar partida {match_id} como não-Flex: {e}")
+            return False
+
+    def prune_match_cache(self, retention_days: int = None, max_rows: int = None) -> int:
+        """
+        Aplica a política de retenção do cache de partidas:
+        remove entradas sem acesso há mais de retention_days e, se ainda passar de max_rows,
+        as menos acessadas recentemente. Retorna quantas linhas foram removidas.
+        """
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            removed = 0
+
+            if retention_days:
+                cursor.execute('''
+                    DELETE FROM match_cache
+                    WHERE last_access < datetime('now', ?)
+                ''', (f'-{int(retention_days)} days',))
+                removed += cursor.rowcount
+
+                cursor.execute('''
+                    DELETE FROM non_flex_matches
+                    WHERE created_at < datetime('now', ?)
+                ''', (f'-{int(retention_days)} days',))
+
+            if max_rows:
+                cursor.execute('''
+                    DELETE FROM match_cache
+                    WHERE match_id IN (
+                        SELECT match_id FROM match_cache
+                        ORDER BY last_access DESC
+                        LIMIT -1 OFFSET ?
+                    )
+                ''', (int(max_rows),))
+                removed += cursor.rowcount
+
+            conn.commit()
+            conn.close()
+            return removed
+        except Exception as e:
+            print(f"❌ [Match Cache] Erro ao limpar cache: {e}")
+            return 0
+
+    def get_match_cache_size(self) -> int:
+        """Retorna quantas partidas estão no cache persistente"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM match_cache')
+        result = cursor.fetchone()[0]
+        conn.close()
+        return result
+
+    # Colunas de match_participants usadas para recalcular o MVP Score (na ordem dos workers do rescore)
+    RESCORE_COLUMNS = (
+        'participant_index', 'puuid', 'team_id', 'role', 'win', 'kills', 'deaths', 'assists',
+        'damage_dealt', 'gold_earned', 'cs', 'vision_score',
+    )
+
+    def get_rescore_batch(self, after_match_id: str, limit: int, version: int) -> List[tuple]:
+        """
+        Próximo lote de partidas com jogadores calculados por outra versão do MVP Score.
+        Paginação por match_id (> after_match_id); só partidas com os 10 jogadores gravados.
+        Retorna [(match_id, [linha de RESCORE_COLUMNS, ...]), ...] na ordem de match_id.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT mp.match_id, {', '.join('mp.' + column for column in self.RESCORE_COLUMNS)}
+            FROM match_participants mp
+            WHERE mp.match_id IN (
+                SELECT mc.match_id FROM match_core mc
+                WHERE mc.full_roster = 1 AND mc.match_id > ?
+                  AND EXISTS (
+                      SELECT 1 FROM match_participants p
+                      WHERE p.match_id = mc.match_id
+                        AND (p.scoring_version IS NULL OR p.scoring_version != ?)
+                  )
+                ORDER BY mc.match_id
+                LIMIT ?
+            )
+            ORDER BY mp.match_id, mp.participant_index
+        ''', (after_match_id, version, limit))
+
+        games = []
+        for row in cursor.fetchall():
+            if not games or games[-1][0] != row[0]:
+                games.append((row[0], []))
+            games[-1][1].append(row[1:])
+
+        conn.close()
+        return games
+
+    def save_rescored_scores(self, updates: List[tuple]) -> int:
+        """Grava scores recalculados numa única transação: [(mvp_score, mvp_placement, versão, match_id, participant_index)]"""
+        if not updates:
+            return 0
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            # mvp_sum dos rollups: tira os scores antigos das partidas do lote e soma os novos
+            match_ids = sorted({update[3] for update in updates})
+            for match_id in match_ids:
+                self._apply_match_rollups(cursor, 'ma.match_id = ?', (match_id,), sign=-1)
+            cursor.executemany('''
+                UPDATE match_participants
+                SET mvp_score = ?, mvp_placement = ?, scoring_version = ?
+                WHERE match_id = ? AND participant_index = ?
+            ''', updates)
+            for match_id in match_ids:
+                self._apply_match_rollups(cursor, 'ma.match_id = ?', (match_id,))
+            conn.commit()
+            conn.close()
+            return len(updates)
+        except Exception as e:
+            print(f"❌ [Rescore] Erro ao gravar lote de scores: {e}")
+            return 0
+
+    def get_rescore_summary(self, version: int) -> Dict[str, int]:
+        """Quantas partidas/jogadores já estão na versão atual do MVP Score"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*),
+                   SUM(CASE WHEN mp.scoring_version = ? THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN mc.full_roster = 1 THEN 0 ELSE 1 END)
+            FROM match_participants mp
+            JOIN match_core mc ON mc.match_id = mp.match_id
+        ''', (version,))
+        total, current, legacy = cursor.fetchone()
+        conn.close()
+        return {
+            'rows': total or 0,
+            'current': current or 0,
+            'pending': (total or 0) - (current or 0) - (legacy or 0),
+            'legacy': legacy or 0,
+        }
+
+    def save_scoring_profile(self, guild_id: str, name: str, weights: Dict, created_by: str = None) -> bool:
+        """Cria/atualiza um perfil de pontuação do servidor (weights: {'support': {...}, 'carry': {...}})"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO scoring_profiles (guild_id, name, weights, created_by)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(guild_id, name) DO UPDATE SET
+                    weights = excluded.weights,
+                    created_by = excluded.created_by,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', (guild_id, name, json.dumps(weights), created_by))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"❌ Erro ao salvar perfil de pontuação: {e}")
+            return False
+
+    def get_scoring_profile(self, guild_id: str, name: str) -> Optional[Dict]:
+        """Retorna os pesos de um perfil do servidor (None se não existir)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT weights FROM scoring_profiles WHERE guild_id = ? AND name = ?
+        ''', (guild_id, name))
+        result = cursor.fetchone()
+        conn.close()
+        return json.loads(result[0]) if result else None
+
+    def get_scoring_profiles(self, guild_id: str) -> List[Dict]:
+        """Lista os perfis de pontuação do servidor"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT name, weights, created_by, updated_at FROM scoring_profiles
+            WHERE guild_id = ?
+            ORDER BY name
+        ''', (guild_id,))
+        profiles = [{
+            'name': row[0],
+            'weights': json.loads(row[1]),
+            'created_by': row[2],
+            'updated_at': row[3]
+        } for row in cursor.fetchall()]
+        conn.close()
+        return profiles
+
+    def delete_scoring_profile(self, guild_id: str, name: str) -> bool:
+        """Remove um perfil (se estiver ativo, o servidor volta ao perfil padrão)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM scoring_profiles WHERE guild_id = ? AND name = ?', (guild_id, name))
+            deleted = cursor.rowcount
+            cursor.execute('''
+                UPDATE server_configs SET scoring_profile = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE guild_id = ? AND scoring_profile = ?
+            ''', (guild_id, name))
+            conn.commit()
+            self.reload_server_config(guild_id, cursor)
+            conn.close()
+            return deleted > 0
+        except Exception as e:
+            print(f"❌ Erro ao remover perfil de pontuação: {e}")
+            return False
+
+    def set_active_scoring_profile(self, guild_id: str, name: Optional[str]) -> bool:
+        """Define o perfil de pontuação ativo do servidor (None = perfil padrão)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO server_configs (guild_id, scoring_profile, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(guild_id) DO UPDATE SET scoring_profile = ?, updated_at = CURRENT_TIMESTAMP
+            ''', (guild_id, name, name))
+            conn.commit()
+            self.reload_server_config(guild_id, cursor)
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"❌ Erro ao ativar perfil de pontuação: {e}")
+            return False
+
+    def get_active_scoring_profile(self, guild_id: str) -> Optional[Dict]:
+        """Perfil ativo do servidor: {'name', 'weights'} (None = perfil padrão)"""
+        if not self._server_config_value(guild_id, 'scoring_profile'):
+            return None
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT sp.name, sp.weights
+            FROM server_configs sc
+            JOIN scoring_profiles sp ON sp.guild_id = sc.guild_id AND sp.name = sc.scoring_profile
+            WHERE sc.guild_id = ?
+        ''', (guild_id,))
+        result = cursor.fetchone()
+        conn.close()
+        return {'name': result[0], 'weights': json.loads(result[1])} if result else None
+
+    RECENT_SCORING_GAMES_SQL = '''
+        SELECT mc.match_id, mc.played_at
+        FROM match_core mc
+        WHERE mc.full_roster = 1
+          AND (mc.is_remake = 0 OR mc.is_remake IS NULL)
+          AND mc.match_id IN (
+              SELECT ma.match_id FROM match_accounts ma
+              JOIN lol_accounts la ON la.id = ma.lol_account_id
+              WHERE la.discord_id IN ({placeholders})
+          )
+        ORDER BY mc.played_at DESC
+        LIMIT ?
+    '''
+    
+    def get_recent_scoring_games(self, discord_ids: List[str], limit: int = 50) -> List[Dict]:
+        """
+        Últimas partidas completas (10 jogadores salvos) com contas dos discord_ids, da mais antiga
+        para a mais recente. Cada partida: 'match_id', 'played_at', 'rows' (RESCORE_COLUMNS +
+        champion_name, na ordem da partida) e 'linked' [(participant_index, lol_account_id, discord_id)].
+        """
+        if not discord_ids:
+            return []
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        user_placeholders = ','.join('?' * len(discord_ids))
+        cursor.execute(self.RECENT_SCORING_GAMES_SQL.format(placeholders=user_placeholders), (*discord_ids, limit))
+        games = {row[0]: {'match_id': row[0], 'played_at': row[1], 'rows': [], 'linked': []}
+                 for row in cursor.fetchall()}
+
+        if games:
+            match_placeholders = ','.join('?' * len(games))
+            cursor.execute(f'''
+                SELECT match_id, {', '.join(self.RESCORE_COLUMNS)}, champion_name
+                FROM match_participants
+                WHERE match_id IN ({match_placeholders}) AND participant_index < ?
+                ORDER BY match_id, participant_index
+            ''', (*games, self.LEGACY_PARTICIPANT_OFFSET))
+            for row in cursor.fetchall():
+                games[row[0]]['rows'].append(row[1:])
+
+            cursor.execute(f'''
+                SELECT ma.match_id, ma.participant_index, ma.lol_account_id, la.discord_id
+                FROM match_accounts ma
+                JOIN lol_accounts la ON la.id = ma.lol_account_id
+                WHERE ma.match_id IN ({match_placeholders}) AND la.discord_id IN ({user_placeholders})
+            ''', (*games, *discord_ids))
+            for match_id, participant_index, lol_account_id, discord_id in cursor.fetchall():
+                games[match_id]['linked'].append((participant_index, lol_account_id, discord_id))
+
+        conn.close()
+        return sorted(games.values(), key=lambda game: game['played_at'] or '')
@@ -0,0 +1,159 @@
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Dict, List
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Conexão SQLite reaproveitada: close() devolve a conexão ao pool (desfazendo qualquer
+    transação pendente, como aconteceria ao fechar) em vez de fechá-la de verdade.
+    """
+
+    def close(self):
+        pool = getattr(self, '_pool', None)
+        if pool is None:
+            super().close()
+        else:
+            pool.release(self)
+
+    def really_close(self):
+        super().close()
+
+
+class ConnectionPool:
+    """
+    Conexões SQLite de longa duração, com uma lista de conexões livres por thread.
+
+    Cada conexão só é usada pela thread que a pegou (sqlite3 não é seguro para uma mesma
+    conexão em várias threads); threads diferentes usam conexões diferentes e, com WAL,
+    leituras não bloqueiam a escrita. Chamadas aninhadas na mesma thread recebem conexões
+    distintas, então uma transação em andamento nunca é compartilhada.
+    """
+
+    # Aplicados em cada conexão nova (journal_mode=WAL fica gravado no arquivo do banco)
+    PRAGMAS = (
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA temp_store=MEMORY',
+    )
+
+    def __init__(self, db_name: str, max_idle_per_thread: int = 4, busy_timeout_ms: int = 5000,
+                 mmap_size: int = 256 * 1024 * 1024, cached_statements: int = 256):
+        self.db_name = db_name
+        self.max_idle_per_thread = max_idle_per_thread
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Referências fracas: uma conexão esquecida sem close() continua sendo liberada pelo GC
+        self._open = weakref.WeakSet()
+        self.stats = {'created': 0, 'reused': 0, 'discarded': 0}
+
+    def _connect(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=self.busy_timeout_ms / 1000,
+            factory=PooledConnection,
+            cached_statements=self.cached_statements,
+            # A posse é controlada pelo pool (uma thread por vez); permite fechar tudo no desligamento
+            check_same_thread=False,
+        )
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma).fetchall()
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}').fetchall()
+
+        conn._pool = self
+        conn._owner = threading.get_ident()
+        with self._lock:
+            self._open.add(conn)
+        self.stats['created'] += 1
+        return conn
+
+    def _idle(self) -> List[PooledConnection]:
+        idle = getattr(self._local, 'idle', None)
+        if idle is None:
+            idle = self._local.idle = []
+        return idle
+
+    def acquire(self) -> PooledConnection:
+        """Conexão livre da thread atual (ou uma nova)"""
+        idle = self._idle()
+        if idle:
+            self.stats['reused'] += 1
+            return idle.pop()
+        return self._connect()
+
+    def release(self, conn: PooledConnection):
+        """Devolve a conexão ao pool da thread (ou fecha se o pool da thread já estiver cheio)"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.ProgrammingError:
+            # Conexão já fechada (ex: close_all no desligamento)
+            return
+
+        idle = self._idle()
+        if conn._owner == threading.get_ident() and len(idle) < self.max_idle_per_thread and conn not in idle:
+            idle.append(conn)
+            return
+
+        self._discard(conn)
+
+    def _discard(self, conn: PooledConnection):
+        with self._lock:
+            self._open.discard(conn)
+        self.stats['discarded'] += 1
+        conn.really_close()
+
+    def close_all(self):
+        """Fecha todas as conexões (desligamento do bot)"""
+        with self._lock:
+            connections, self._open = list(self._open), weakref.WeakSet()
+        for conn in connections:
+            try:
+                conn.really_close()
+            except sqlite3.ProgrammingError:
+                pass
+        self._local = threading.local()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, 'open': len(self._open)}
+
+
+def benchmark(db_name: str, queries: int = 5000) -> Dict[str, float]:
+    """
+    Compara o custo por consulta (microssegundos) de abrir/fechar uma conexão a cada consulta
+    (modelo antigo) com o pool de conexões reaproveitadas.
+    """
+    sql = 'SELECT COUNT(*) FROM sqlite_master WHERE type = ?'
+
+    started = time.perf_counter()
+    for _ in range(queries):
+        conn = sqlite3.connect(db_name)
+        conn.execute(sql, ('table',)).fetchone()
+        conn.close()
+    per_connect = (time.perf_counter() - started) / queries * 1e6
+
+    pool = ConnectionPool(db_name)
+    started = time.perf_counter()
+    for _ in range(queries):
+        conn = pool.acquire()
+        conn.execute(sql, ('table',)).fetchone()
+        conn.close()
+    pooled = (time.perf_counter() - started) / queries * 1e6
+    pool.close_all()
+
+    return {'connect_per_query_us': round(per_connect, 1), 'pooled_us': round(pooled, 1)}
+
+
+if __name__ == '__main__':
+    import sys
+
+    results = benchmark(sys.argv[1] if len(sys.argv) > 1 else 'bot_lol.db')
+    print(f"🔌 Conexão por consulta: {results['connect_per_query_us']} µs | "
+          f"pool: {results['pooled_us']} µs por consulta")
@@ -0,0 +1,82 @@
+import threading
+import time
+from typing import Any, Dict, Hashable, Iterable, Tuple
+
+
+class ExpiringMap:
+    """
+    Chaves em memória com expiração (TTL) e tamanho máximo, para marcadores de "já feito"
+    (notificação enviada, alerta enviado, live game notificada) consultados a cada ciclo.
+
+    Consultar é O(1) e nunca vai ao banco. O dict fica na ordem em que as chaves expiram
+    (reinserir uma chave a manda para o fim), então expirar ou podar só olha o começo.
+    Cada chave pode guardar um valor (padrão True, uso como conjunto).
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0}
+
+    def put(self, key: Hashable, value: Any = True):
+        """Guarda (ou renova) a chave, expirando em ttl_seconds a partir de agora"""
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires_at, value)
+            self._trim()
+
+    def load(self, items: Iterable[Tuple[Hashable, Any, float]]):
+        """Substitui o conteúdo por (chave, valor, added_at), em ordem crescente de added_at"""
+        now = time.time()
+        entries = {}
+        for key, value, added_at in items:
+            if added_at + self.ttl_seconds > now:
+                entries.pop(key, None)
+                entries[key] = (added_at + self.ttl_seconds, value)
+        with self._lock:
+            self._entries = entries
+            self._trim()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return default
+        if entry[0] <= time.time():
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+                    self.stats['expired'] += 1
+            self.stats['misses'] += 1
+            return default
+        self.stats['hits'] += 1
+        return entry[1]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, None) is not None
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _trim(self):
+        """Remove as expiradas e as mais antigas acima do limite (chamado com o lock)"""
+        now = time.time()
+        while self._entries:
+            key = next(iter(self._entries))
+            if self._entries[key][0] <= now:
+                self.stats['expired'] += 1
+            elif len(self._entries) > self.max_entries:
+                self.stats['evicted'] += 1
+            else:
+                break
+            del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, 'entries': len(self._entries)}
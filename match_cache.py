@@ -0,0 +1,158 @@
+import json
+import zlib
+from collections import OrderedDict
+from typing import Optional, Dict
+
+from expiring_map import ExpiringMap
+
+
+class MatchCache:
+    """
+    Cache em dois níveis para os detalhes de partidas da match-v5.
+
+    Partidas terminadas nunca mudam, então o JSON pode ser reaproveitado para sempre:
+    - Nível 1: LRU em memória (limitado por quantidade de partidas)
+    - Nível 2: tabela match_cache no SQLite, com o JSON comprimido (zlib)
+
+    Depois de reiniciar o bot, partidas já baixadas saem do SQLite sem gastar orçamento da API.
+    Ler do SQLite não escreve nada: o último acesso (usado na retenção) é atualizado em lote,
+    a cada touch_every leituras do disco e antes de cada prune.
+
+    Partidas de filas que o bot não acompanha não são guardadas: entram num cache negativo
+    persistente (só o match_id) para nunca serem baixadas de novo. Em memória ele tem a mesma
+    retenção do SQLite e no máximo non_flex_memory_size partidas (uma ausência só custa um download).
+    """
+
+    # Filas acompanhadas pelo bot (Ranked Flex e personalizadas)
+    TRACKED_QUEUES = (440, 0)
+
+    def __init__(self, db, memory_size: int = 500, retention_days: int = 120,
+                 max_rows: int = 50000, compression_level: int = 6, prune_every: int = 500,
+                 touch_every: int = 100, non_flex_memory_size: int = 20000):
+        self.db = db
+        self.memory_size = memory_size
+        self.retention_days = retention_days
+        self.max_rows = max_rows
+        self.compression_level = compression_level
+        self.prune_every = prune_every
+        self.touch_every = touch_every
+        self.non_flex_memory_size = non_flex_memory_size
+
+        self._memory: OrderedDict = OrderedDict()
+        self._non_flex: Optional[ExpiringMap] = None
+        self._stores_since_prune = 0
+        self._touched: set = set()  # lidas do disco desde o último touch_cached_matches
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'non_flex_hits': 0,
+            'stores': 0,
+            'evictions': 0,
+            'pruned': 0,
+        }
+
+    def _remember(self, match_id: str, match_data: Dict):
+        """Coloca a partida no topo do LRU, removendo a menos usada se passar do limite"""
+        self._memory[match_id] = match_data
+        self._memory.move_to_end(match_id)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def get(self, match_id: str) -> Optional[Dict]:
+        """Busca a partida na memória e depois no SQLite (None se não estiver em cache)"""
+        match_data = self._memory.get(match_id)
+        if match_data is not None:
+            self._memory.move_to_end(match_id)
+            self.stats['memory_hits'] += 1
+            return match_data
+
+        payload = self.db.get_cached_match_payload(match_id)
+        if payload is not None:
+            try:
+                match_data = json.loads(zlib.decompress(payload))
+            except (zlib.error, ValueError) as e:
+                print(f"⚠️ [Match Cache] Payload inválido para {match_id}, ignorando: {e}")
+                match_data = None
+
+            if match_data is not None:
+                self._remember(match_id, match_data)
+                self.stats['disk_hits'] += 1
+                self._touched.add(match_id)
+                if len(self._touched) >= self.touch_every:
+                    self.flush_touched()
+                return match_data
+
+        self.stats['misses'] += 1
+        return None
+
+    def _load_non_flex(self) -> ExpiringMap:
+        non_flex = ExpiringMap(self.retention_days * 86400, self.non_flex_memory_size)
+        non_flex.load((match_id, True, created_at)
+                      for match_id, created_at in self.db.get_non_flex_matches(self.retention_days))
+        return non_flex
+
+    def is_non_flex(self, match_id: str) -> bool:
+        """Verifica se a partida já é conhecida como de outra fila (carrega o cache negativo na 1ª consulta)"""
+        if self._non_flex is None:
+            self._non_flex = self._load_non_flex()
+        if match_id in self._non_flex:
+            self.stats['non_flex_hits'] += 1
+            return True
+        return False
+
+    def mark_non_flex(self, match_id: str, queue_id: int):
+        """Adiciona a partida ao cache negativo (memória + SQLite)"""
+        if self._non_flex is None:
+            self._non_flex = self._load_non_flex()
+        if match_id not in self._non_flex:
+            self._non_flex.put(match_id)
+            self.db.add_non_flex_match(match_id, queue_id)
+
+    def put(self, match_id: str, match_data: Dict):
+        """Guarda a partida nos dois níveis (só partidas completas, com o bloco 'info')"""
+        if not match_data or 'info' not in match_data:
+            return
+
+        queue_id = match_data['info'].get('queueId')
+        if queue_id not in self.TRACKED_QUEUES:
+            self.mark_non_flex(match_id, queue_id)
+            return
+
+        self._remember(match_id, match_data)
+
+        payload = zlib.compress(json.dumps(match_data, separators=(',', ':')).encode('utf-8'),
+                                self.compression_level)
+        if self.db.save_cached_match_payload(match_id, payload):
+            self.stats['stores'] += 1
+            self._stores_since_prune += 1
+
+        if self.prune_every and self._stores_since_prune >= self.prune_every:
+            self.prune()
+
+    def flush_touched(self):
+        """Grava o último acesso das partidas lidas do disco desde o último flush"""
+        if not self._touched:
+            return
+        touched, self._touched = self._touched, set()
+        self.db.touch_cached_matches(list(touched))
+
+    def prune(self) -> int:
+        """Aplica a política de retenção/tamanho na tabela do SQLite"""
+        self._stores_since_prune = 0
+        self.flush_touched()
+        removed = self.db.prune_match_cache(self.retention_days, self.max_rows)
+        self.stats['pruned'] += removed
+        if removed:
+            print(f"🧹 [Match Cache] {removed} partidas removidas do cache persistente")
+        return removed
+
+    def get_stats(self) -> Dict[str, float]:
+        """Métricas de acerto do cache (para logs/diagnóstico)"""
+        stats = dict(self.stats)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['memory_entries'] = len(self._memory)
+        stats['non_flex_entries'] = len(self._non_flex) if self._non_flex is not None else 0
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 3) if lookups else 0.0
+        return stats
@@ -0,0 +1,30 @@
+"""
+Aplica (ou só lista) as migrações pendentes do banco, as mesmas que o bot aplica ao iniciar.
+
+Uso: python migrate.py [--db bot_lol.db] [--dry-run] [--rebuild-rollups]
+
+A versão do esquema fica em PRAGMA user_version; cada migração de Database.MIGRATIONS roda na
+sua própria transação e só avança a versão se terminar sem erro.
+--rebuild-rollups recalcula do zero a tabela stat_rollups (estatísticas do /perfil e /champinfo),
+por exemplo depois de editar partidas direto no banco.
+"""
+import argparse
+
+from database import Database
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Migrações do esquema do banco (PRAGMA user_version)')
+    parser.add_argument('--db', default=None, help='arquivo do banco (padrão: o mesmo do bot)')
+    parser.add_argument('--dry-run', action='store_true', help='só lista as migrações pendentes')
+    parser.add_argument('--rebuild-rollups', action='store_true',
+                        help='recalcula stat_rollups a partir das partidas (depois das migrações)')
+    args = parser.parse_args()
+
+    db = Database(args.db, auto_migrate=False)
+    pending = db.init_database(dry_run=args.dry_run)
+    if not pending:
+        print("✅ [Migrações] Banco já está na versão mais recente")
+    if args.rebuild_rollups and not args.dry_run:
+        db.rebuild_stat_rollups()
+    db.close()
@@ -0,0 +1,155 @@
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Tipos de polling agendados por conta
+POLL_SPECTATOR = 'spectator'
+POLL_HISTORY = 'history'
+
+HOURS_PER_WEEK = 24 * 7
+
+
+def hour_of_week(moment: datetime) -> int:
+    """Posição da hora na semana (0 = segunda 00h, 167 = domingo 23h)"""
+    return moment.weekday() * 24 + moment.hour
+
+
+class AccountActivity:
+    """Modelo de atividade de uma conta: histograma de partidas por hora da semana + última partida"""
+
+    def __init__(self):
+        self.histogram = [0] * HOURS_PER_WEEK
+        self.total_games = 0
+        self.last_played: Optional[datetime] = None
+
+    def add_game(self, played_at: datetime):
+        self.histogram[hour_of_week(played_at)] += 1
+        self.total_games += 1
+        if self.last_played is None or played_at > self.last_played:
+            self.last_played = played_at
+
+    def share_around(self, moment: datetime, spread: int = 1) -> float:
+        """Fração das partidas que caem na hora atual da semana (± spread horas)"""
+        if not self.total_games:
+            return 0.0
+        slot = hour_of_week(moment)
+        games = sum(self.histogram[(slot + offset) % HOURS_PER_WEEK] for offset in range(-spread, spread + 1))
+        return games / self.total_games
+
+
+class PollScheduler:
+    """
+    Agenda o polling (spectator e histórico) de cada conta individualmente.
+
+    - Contas vistas em partida voltam imediatamente para o intervalo base
+    - Contas ociosas dobram o intervalo a cada polling sem atividade (backoff exponencial)
+    - O teto do backoff depende do modelo de atividade: horário em que a conta costuma jogar
+      mantém o polling rápido; contas sem partidas recentes podem ir até o teto máximo
+    """
+
+    BASE_INTERVALS = {
+        POLL_SPECTATOR: 180,
+        POLL_HISTORY: 120,
+    }
+
+    # Teto do backoff (expoente de 2 sobre o intervalo base)
+    HOT_MAX_LEVEL = 1        # horário em que a conta costuma jogar
+    RECENT_MAX_LEVEL = 3     # jogou nos últimos RECENT_DAYS dias
+    IDLE_MAX_LEVEL = 5       # conta parada
+
+    RECENT_DAYS = 7
+    HOT_SHARE = 0.05         # fração mínima das partidas na janela de ±1h para considerar "horário quente"
+    HOT_MIN_GAMES = 3
+    MODEL_DAYS = 60          # histórico usado para o modelo de atividade
+    MODEL_REFRESH = 3600     # segundos entre recarregamentos do modelo
+
+    def __init__(self, db):
+        self.db = db
+        self._activity: Dict[int, AccountActivity] = {}
+        self._idle_level: Dict[int, Dict[str, int]] = {}
+        self._last_poll: Dict[int, Dict[str, float]] = {}
+        self._model_loaded_at = 0.0
+        self.stats = {'due': 0, 'skipped': 0, 'snap_backs': 0}
+
+    def refresh_model(self, force: bool = False):
+        """Recarrega o histograma de atividade a partir de matches.played_at (no máximo 1x por hora)"""
+        if not force and time.monotonic() - self._model_loaded_at < self.MODEL_REFRESH:
+            return
+
+        activity = {}
+        for account_id, played_at_list in self.db.get_accounts_play_times(self.MODEL_DAYS).items():
+            model = AccountActivity()
+            for played_at in played_at_list:
+                try:
+                    model.add_game(datetime.fromisoformat(played_at))
+                except (TypeError, ValueError):
+                    continue
+            activity[account_id] = model
+
+        self._activity = activity
+        self._model_loaded_at = time.monotonic()
+        print(f"📈 [Polling] Modelo de atividade atualizado para {len(activity)} conta(s)")
+
+    def _max_level(self, account_id: int, now: datetime) -> int:
+        model = self._activity.get(account_id)
+        if model is None or model.last_played is None:
+            return self.IDLE_MAX_LEVEL
+
+        if model.total_games >= self.HOT_MIN_GAMES and model.share_around(now) >= self.HOT_SHARE:
+            return self.HOT_MAX_LEVEL
+        if (now - model.last_played).days < self.RECENT_DAYS:
+            return self.RECENT_MAX_LEVEL
+        return self.IDLE_MAX_LEVEL
+
+    def get_interval(self, account_id: int, kind: str) -> float:
+        """Intervalo atual (segundos) entre pollings desta conta"""
+        level = self._idle_level.get(account_id, {}).get(kind, 0)
+        max_level = self._max_level(account_id, datetime.now())
+        return self.BASE_INTERVALS[kind] * (2 ** min(level, max_level))
+
+    def is_due(self, account_id: int, kind: str) -> bool:
+        """
+        Verifica se a conta deve ser consultada agora (contas novas são sempre consultadas).
+        O intervalo é recalculado a cada tick, então a chegada do horário em que a conta
+        costuma jogar encurta imediatamente um backoff longo.
+        """
+        last_poll = self._last_poll.get(account_id, {}).get(kind)
+        # Pequena folga para o tick do loop não pular a conta por milissegundos
+        due = last_poll is None or time.monotonic() - last_poll >= self.get_interval(account_id, kind) - 5
+        self.stats['due' if due else 'skipped'] += 1
+        return due
+
+    def filter_due(self, account_ids: List[int], kind: str) -> List[int]:
+        return [account_id for account_id in account_ids if self.is_due(account_id, kind)]
+
+    def record_idle(self, account_id: int, kind: str):
+        """Polling sem atividade: aumenta o backoff e agenda o próximo"""
+        levels = self._idle_level.setdefault(account_id, {})
+        max_level = self._max_level(account_id, datetime.now())
+        levels[kind] = min(levels.get(kind, -1) + 1, max_level)
+        self._last_poll.setdefault(account_id, {})[kind] = time.monotonic()
+
+    def record_active(self, account_id: int):
+        """Conta vista em partida (ou com partida nova): volta ao polling rápido em todos os tipos"""
+        levels = self._idle_level.setdefault(account_id, {})
+        if any(levels.get(kind, 0) > 0 for kind in self.BASE_INTERVALS):
+            self.stats['snap_backs'] += 1
+        now = time.monotonic()
+        for kind in self.BASE_INTERVALS:
+            levels[kind] = 0
+            self._last_poll.setdefault(account_id, {})[kind] = now
+
+    def forget(self, account_id: int):
+        """Remove a conta do agendador (conta desvinculada)"""
+        self._idle_level.pop(account_id, None)
+        self._last_poll.pop(account_id, None)
+
+    def get_status(self) -> Dict[str, int]:
+        """Resumo do agendador para logs"""
+        levels = [level for kinds in self._idle_level.values() for level in kinds.values()]
+        return {
+            **self.stats,
+            'accounts': len(self._last_poll),
+            'fast': sum(1 for level in levels if level == 0),
+            'backed_off': sum(1 for level in levels if level > 0),
+        }
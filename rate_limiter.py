@@ -0,0 +1,264 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Classes de prioridade (menor número = atendido primeiro)
+PRIORITY_INTERACTIVE = 0       # slash commands (/logar, /resync_accounts, ...)
+PRIORITY_FINISH_DETECTION = 1  # detecção de fim de partida / atualização de live games
+PRIORITY_BACKGROUND = 2        # varreduras periódicas (spectator, histórico)
+PRIORITY_BACKFILL = 3          # importação do histórico da temporada (só usa a sobra do orçamento)
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_FINISH_DETECTION: 'finish',
+    PRIORITY_BACKGROUND: 'background',
+    PRIORITY_BACKFILL: 'backfill',
+}
+
+
+def parse_rate_limit_header(value: Optional[str]) -> List[Tuple[int, int]]:
+    """Converte um header da Riot ('20:1,100:120') em [(20, 1), (100, 120)] -> (quantidade, janela em segundos)"""
+    pairs = []
+    if not value:
+        return pairs
+
+    for part in value.split(','):
+        try:
+            amount, window = part.strip().split(':')
+            pairs.append((int(amount), int(window)))
+        except ValueError:
+            continue
+
+    return pairs
+
+
+class RateLimitBucket:
+    """
+    Bucket de rate limit com uma ou mais janelas fixas (mesmo modelo da Riot:
+    a janela começa na primeira requisição e reseta após N segundos).
+    """
+
+    def __init__(self, limits: List[Tuple[int, int]] = None, safety_margin: float = 0.95):
+        self.safety_margin = safety_margin
+        self.blocked_until = 0.0
+        # janela (segundos) -> {'limit', 'start', 'count'}
+        self._windows: Dict[int, Dict] = {}
+        self.set_limits(limits or [])
+
+    def set_limits(self, limits: List[Tuple[int, int]]):
+        """Atualiza os limites (mantém as contagens das janelas que continuam existindo)"""
+        windows = {}
+        for limit, window in limits:
+            current = self._windows.get(window, {'start': 0.0, 'count': 0})
+            windows[window] = {'limit': limit, 'start': current['start'], 'count': current['count']}
+        self._windows = windows
+
+    def sync_counts(self, counts: List[Tuple[int, int]], now: float):
+        """Sincroniza com o '-Count' retornado pela API (a contagem do servidor prevalece se for maior)"""
+        for count, window in counts:
+            state = self._windows.get(window)
+            if not state:
+                continue
+            if now - state['start'] >= window:
+                state['start'] = now
+                state['count'] = 0
+            state['count'] = max(state['count'], count)
+
+    def _effective_limit(self, limit: int, reserve: float = 0.0) -> int:
+        return max(1, int(limit * self.safety_margin * (1 - reserve)))
+
+    def wait_time(self, now: float, reserve: float = 0.0) -> float:
+        """
+        Segundos até o bucket aceitar mais uma requisição (0 = disponível).
+        reserve: fração de cada janela que fica reservada para prioridades maiores.
+        """
+        wait = max(0.0, self.blocked_until - now)
+
+        for window, state in self._windows.items():
+            if now - state['start'] >= window:
+                continue
+            if state['count'] >= self._effective_limit(state['limit'], reserve):
+                wait = max(wait, state['start'] + window - now)
+
+        return wait
+
+    def consume(self, now: float):
+        """Registra uma requisição em todas as janelas do bucket"""
+        for window, state in self._windows.items():
+            if now - state['start'] >= window:
+                state['start'] = now
+                state['count'] = 0
+            state['count'] += 1
+
+    def block(self, seconds: float, now: float):
+        """Bloqueia o bucket (usado quando a API responde 429)"""
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+    def describe(self, now: float) -> str:
+        parts = []
+        for window, state in sorted(self._windows.items()):
+            count = state['count'] if now - state['start'] < window else 0
+            parts.append(f"{count}/{self._effective_limit(state['limit'])} em {window}s")
+        return ', '.join(parts) if parts else 'sem limite conhecido'
+
+
+class RiotRateLimiter:
+    """
+    Rate limiter da Riot API guiado pelos headers X-App-Rate-Limit / X-Method-Rate-Limit.
+
+    Mantém um bucket de aplicação por host (americas, br1, ...) e um bucket de método
+    por (host, método). Uma requisição só espera pelos buckets que ela consome, então
+    chamadas de spectator no br1 não bloqueiam match-v5 no americas.
+
+    Dentro de um host, quem espera é atendido por prioridade: o próximo token livre vai
+    para a maior classe que consiga usá-lo. Classes baixas não usam a reserva das
+    janelas e são descartadas (shed) quando o orçamento está esgotado.
+    """
+
+    # Limites padrão de uma development key (usados até a primeira resposta com headers)
+    DEFAULT_APP_LIMITS = '20:1,100:120'
+
+    # Fração do orçamento de aplicação que cada classe NÃO pode usar
+    PRIORITY_RESERVE = {
+        PRIORITY_INTERACTIVE: 0.0,
+        PRIORITY_FINISH_DETECTION: 0.0,
+        PRIORITY_BACKGROUND: 0.1,
+        PRIORITY_BACKFILL: 0.5,
+    }
+
+    # Espera máxima antes de descartar a requisição (None = nunca descarta)
+    PRIORITY_MAX_WAIT = {
+        PRIORITY_INTERACTIVE: None,
+        PRIORITY_FINISH_DETECTION: None,
+        PRIORITY_BACKGROUND: 5.0,
+        PRIORITY_BACKFILL: None,  # o job de backfill só espera, nunca perde a vez
+    }
+
+    def __init__(self, default_app_limits: str = None, safety_margin: float = 0.95):
+        self.default_app_limits = parse_rate_limit_header(default_app_limits or self.DEFAULT_APP_LIMITS)
+        self.safety_margin = safety_margin
+        self._app_buckets: Dict[str, RateLimitBucket] = {}
+        self._method_buckets: Dict[Tuple[str, str], RateLimitBucket] = {}
+
+        # Fila de espera por host: heap de (prioridade, ordem de chegada, bucket do método)
+        self._waiters: Dict[str, List[Tuple[int, int, RateLimitBucket]]] = {}
+        self._conditions: Dict[str, asyncio.Condition] = {}
+        self._sequence = itertools.count()
+        self.shed_count: Dict[str, int] = {name: 0 for name in PRIORITY_NAMES.values()}
+
+    def _get_buckets(self, host: str, method: str) -> Tuple[RateLimitBucket, RateLimitBucket]:
+        app_bucket = self._app_buckets.get(host)
+        if app_bucket is None:
+            app_bucket = RateLimitBucket(self.default_app_limits, self.safety_margin)
+            self._app_buckets[host] = app_bucket
+
+        method_bucket = self._method_buckets.get((host, method))
+        if method_bucket is None:
+            # Limite do método só é conhecido após a primeira resposta
+            method_bucket = RateLimitBucket([], self.safety_margin)
+            self._method_buckets[(host, method)] = method_bucket
+
+        return app_bucket, method_bucket
+
+    def _has_eligible_ahead(self, host: str, ticket: Tuple, now: float) -> bool:
+        """Verifica se alguém na frente da fila (maior prioridade/chegou antes) já pode usar um token"""
+        for other in self._waiters.get(host, []):
+            if other[:2] < ticket[:2] and other[2].wait_time(now) <= 0:
+                return True
+        return False
+
+    async def acquire(self, host: str, method: str, priority: int = PRIORITY_BACKGROUND) -> bool:
+        """
+        Aguarda até existir token nos buckets de aplicação e de método e o consome.
+        Retorna False se a requisição foi descartada (prioridade baixa com orçamento esgotado).
+        """
+        app_bucket, method_bucket = self._get_buckets(host, method)
+        reserve = self.PRIORITY_RESERVE.get(priority, 0.0)
+        max_wait = self.PRIORITY_MAX_WAIT.get(priority)
+
+        ticket = (priority, next(self._sequence), method_bucket)
+        waiters = self._waiters.setdefault(host, [])
+        condition = self._conditions.setdefault(host, asyncio.Condition())
+        heapq.heappush(waiters, ticket)
+        logged = False
+
+        try:
+            async with condition:
+                while True:
+                    now = time.monotonic()
+                    wait = max(app_bucket.wait_time(now, reserve), method_bucket.wait_time(now))
+
+                    if max_wait is not None and wait > max_wait:
+                        name = PRIORITY_NAMES.get(priority, str(priority))
+                        self.shed_count[name] = self.shed_count.get(name, 0) + 1
+                        print(f"🪫 [Rate Limit] Orçamento esgotado em {host}: requisição {name} "
+                              f"({method}) descartada (espera de {wait:.1f}s)")
+                        return False
+
+                    if wait <= 0 and not self._has_eligible_ahead(host, ticket, now):
+                        app_bucket.consume(now)
+                        method_bucket.consume(now)
+                        return True
+
+                    if wait > 5 and not logged:
+                        print(f"⏳ [Rate Limit] {host} / {method}: aguardando {wait:.1f}s "
+                              f"(app: {app_bucket.describe(now)} | método: {method_bucket.describe(now)})")
+                        logged = True
+
+                    # Acorda quando o bucket libera ou quando alguém consome/sai da fila
+                    try:
+                        await asyncio.wait_for(condition.wait(), timeout=wait if wait > 0 else 0.5)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            waiters.remove(ticket)
+            heapq.heapify(waiters)
+            async with condition:
+                condition.notify_all()
+
+    def update_from_headers(self, host: str, method: str, headers):
+        """Atualiza limites e contagens a partir dos headers da resposta"""
+        app_bucket, method_bucket = self._get_buckets(host, method)
+        now = time.monotonic()
+
+        app_limits = parse_rate_limit_header(headers.get('X-App-Rate-Limit'))
+        if app_limits:
+            app_bucket.set_limits(app_limits)
+            app_bucket.sync_counts(parse_rate_limit_header(headers.get('X-App-Rate-Limit-Count')), now)
+
+        method_limits = parse_rate_limit_header(headers.get('X-Method-Rate-Limit'))
+        if method_limits:
+            method_bucket.set_limits(method_limits)
+            method_bucket.sync_counts(parse_rate_limit_header(headers.get('X-Method-Rate-Limit-Count')), now)
+
+    def on_rate_limited(self, host: str, method: str, headers) -> float:
+        """Trata um 429: bloqueia apenas o bucket indicado por X-Rate-Limit-Type. Retorna o Retry-After"""
+        app_bucket, method_bucket = self._get_buckets(host, method)
+        now = time.monotonic()
+
+        try:
+            retry_after = float(headers.get('Retry-After', 1))
+        except (TypeError, ValueError):
+            retry_after = 1.0
+
+        limit_type = headers.get('X-Rate-Limit-Type', 'service')
+        if limit_type == 'application':
+            app_bucket.block(retry_after, now)
+        else:
+            # 'method' ou 'service' (sobrecarga do serviço) afetam só este endpoint
+            method_bucket.block(retry_after, now)
+
+        print(f"🚫 [Rate Limit] 429 ({limit_type}) em {host} / {method}, bucket bloqueado por {retry_after:.0f}s")
+        return retry_after
+
+    def get_status(self) -> Dict[str, str]:
+        """Resumo do uso atual de cada bucket (para logs/diagnóstico)"""
+        now = time.monotonic()
+        status = {'shed': ', '.join(f"{name}={count}" for name, count in self.shed_count.items())}
+        for host, bucket in self._app_buckets.items():
+            status[host] = bucket.describe(now)
+        for (host, method), bucket in self._method_buckets.items():
+            status[f"{host} / {method}"] = bucket.describe(now)
+        return status
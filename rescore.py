@@ -0,0 +1,96 @@
+"""
+Recalcula offline o MVP Score de todas as partidas salvas (sem nenhuma chamada à API).
+
+Uso: python rescore.py [--db bot_lol.db] [--workers N] [--chunk 500]
+
+Quando a fórmula em scoring.py muda (pesos por role, ajustes de KDA...), incremente
+SCORING_VERSION e rode este job: as partidas com os 10 jogadores em match_participants são
+lidas em lotes, recalculadas num pool de processos e gravadas em transações por lote.
+Cada jogador guarda a versão usada, então o job pode ser interrompido e rodado de novo:
+só as partidas que ainda não estão na versão atual são processadas.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List
+
+from database import Database
+from scoring import SCORING_VERSION, compute_scoreboard, participants_from_rows
+
+
+def score_games(games: List[tuple], version: int) -> List[tuple]:
+    """
+    Worker: recalcula um lote de partidas (linhas de Database.RESCORE_COLUMNS).
+    Retorna as atualizações no formato de Database.save_rescored_scores.
+    """
+    updates = []
+    for match_id, rows in games:
+        participants = participants_from_rows(rows)
+
+        # Mesmo valor gravado na ingestão: score sem o bônus de vitória + colocação na partida
+        scoreboard = compute_scoreboard(participants)
+        for row, entry in zip(rows, scoreboard['players']):
+            updates.append((entry['base_score'], entry['placement'], version, match_id, row[0]))
+
+    return updates
+
+
+def rescore_matches(db: Database, chunk_size: int = 500, workers: int = None,
+                    version: int = SCORING_VERSION) -> Dict[str, int]:
+    """Recalcula todas as partidas pendentes; retorna quantas partidas/jogadores foram gravados"""
+    workers = workers or os.cpu_count() or 1
+    summary = db.get_rescore_summary(version)
+    print(f"🧮 [Rescore] Versão {version}: {summary['pending']} jogador(es) pendente(s), "
+          f"{summary['current']} já atualizados, {summary['legacy']} sem a partida completa (ignorados)")
+
+    started = time.monotonic()
+    totals = {'games': 0, 'rows': 0}
+    last_match_id = ''
+
+    def save(updates: List[tuple]):
+        totals['rows'] += db.save_rescored_scores(updates)
+        elapsed = max(time.monotonic() - started, 0.001)
+        print(f"   💾 {totals['rows']} jogador(es) gravados ({totals['rows'] / elapsed:,.0f}/s)")
+
+    if workers <= 1:
+        while True:
+            games = db.get_rescore_batch(last_match_id, chunk_size, version)
+            if not games:
+                break
+            last_match_id = games[-1][0]
+            totals['games'] += len(games)
+            save(score_games(games, version))
+    else:
+        # Leitura e gravação ficam no processo principal; no máximo 2 lotes por worker em andamento
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            running = set()
+            while True:
+                games = db.get_rescore_batch(last_match_id, chunk_size, version)
+                if not games:
+                    break
+                last_match_id = games[-1][0]
+                totals['games'] += len(games)
+                running.add(pool.submit(score_games, games, version))
+
+                if len(running) >= workers * 2:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        save(future.result())
+
+            for future in running:
+                save(future.result())
+
+    elapsed = time.monotonic() - started
+    print(f"✅ [Rescore] {totals['games']} partida(s) / {totals['rows']} jogador(es) recalculados em {elapsed:.1f}s")
+    return totals
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recalcula o MVP Score das partidas salvas (offline)')
+    parser.add_argument('--db', default=None, help='arquivo do banco (padrão: o mesmo do bot)')
+    parser.add_argument('--workers', type=int, default=None, help='processos (padrão: número de CPUs)')
+    parser.add_argument('--chunk', type=int, default=500, help='partidas por lote')
+    args = parser.parse_args()
+
+    rescore_matches(Database(args.db), chunk_size=args.chunk, workers=args.workers)
@@ -1,8 +1,20 @@
 import aiohttp
 import asyncio
-import time
 from typing import Optional, Dict, List
 from datetime import datetime
+from urllib.parse import urlsplit
+from scoring import SCORING_VERSION, ScoreboardCache, score_player
+from rate_limiter import (
+    RiotRateLimiter,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_FINISH_DETECTION,
+    PRIORITY_BACKGROUND,
+    PRIORITY_BACKFILL,
+)
+
+class RiotBadRequest(Exception):
+    """A API rejeitou os parâmetros da requisição (HTTP 400)"""
+
 
 class RiotAPI:
     REGIONS = {
@@ -33,68 +45,221 @@ class RiotAPI:
         'oc1': 'sea',
     }
     
-    def __init__(self, api_key: str):
+    # Classes de prioridade do rate limiter (slash commands > fim de partida > varreduras)
+    PRIORITY_INTERACTIVE = PRIORITY_INTERACTIVE
+    PRIORITY_FINISH_DETECTION = PRIORITY_FINISH_DETECTION
+    PRIORITY_BACKGROUND = PRIORITY_BACKGROUND
+    PRIORITY_BACKFILL = PRIORITY_BACKFILL
+
+    # Filtros da listagem de partidas, do mais específico ao mais genérico.
+    # Se a API rejeitar um conjunto (400), passa para o próximo e lembra disso.
+    MATCH_ID_FILTERS = {
+        440: [{'queue': 440, 'type': 'ranked'}, {'queue': 440}, {}],
+    }
+
+    # Pool de conexões HTTP (uma sessão keep-alive por host de roteamento/plataforma)
+    CONNECTION_LIMIT_PER_HOST = 10
+    DNS_CACHE_TTL = 300
+    KEEPALIVE_TIMEOUT = 60
+    REQUEST_TIMEOUT = 15
+
+    def __init__(self, api_key: str, match_cache=None):
         self.api_key = api_key
         self.headers = {
             "X-Riot-Token": api_key
         }
 
-        self._last_request_time = 0
-        self._request_interval = 1.5
-        self._rate_limit_lock = asyncio.Lock()
-        self._request_count_2min = 0
-        self._rate_limit_window_start = time.time()
-        self._max_requests_per_2min = 95
+        # Sessões de longa duração por host (americas.api..., br1.api..., etc)
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._connection_stats: Dict[str, Dict[str, int]] = {}
+
+        # Rate limiter guiado pelos headers da Riot (buckets por host e por método)
+        self._rate_limiter = RiotRateLimiter()
+
+        # Single-flight: requisições idênticas em andamento (mesma prioridade) compartilham a mesma task
+        self._inflight: Dict[tuple, Dict] = {}
+        self._coalesce_stats: Dict[str, Dict[str, int]] = {}
+
+        # Cache de detalhes de partidas (memória + SQLite), consultado antes de qualquer requisição
+        self.match_cache = match_cache
 
-    async def _rate_limit_wait(self):
-        async with self._rate_limit_lock:
-            current_time = time.time()
+        # Scoreboards calculados por partida, compartilhados por todos os jogadores vinculados nela
+        self.scoreboards = ScoreboardCache()
 
-            if current_time - self._rate_limit_window_start > 120:
-                self._request_count_2min = 0
-                self._rate_limit_window_start = current_time
+        # Nível de fallback dos filtros da listagem por fila (índice em MATCH_ID_FILTERS)
+        self._match_filter_level: Dict[int, int] = {}
 
-            if self._request_count_2min >= self._max_requests_per_2min:
-                sleep_time = 120 - (current_time - self._rate_limit_window_start) + 1
-                print(f"⏳ [Rate Limit] Aguardando {sleep_time:.1f}s para resetar janela de 2 minutos")
-                await asyncio.sleep(sleep_time)
-                self._request_count_2min = 0
-                self._rate_limit_window_start = time.time()
+    def _get_session(self, url: str) -> aiohttp.ClientSession:
+        """Retorna a sessão persistente do host da URL (cria sob demanda, com keep-alive e cache de DNS)"""
+        host = urlsplit(url).hostname
+        session = self._sessions.get(host)
 
-            time_since_last = current_time - self._last_request_time
-            if time_since_last < self._request_interval:
-                await asyncio.sleep(self._request_interval - time_since_last)
+        if session is None or session.closed:
+            stats = self._connection_stats.setdefault(host, {
+                'requests': 0,
+                'connections_created': 0,
+                'connections_reused': 0
+            })
 
-            self._last_request_time = time.time()
-            self._request_count_2min += 1
+            async def on_connection_create_end(session, context, params):
+                stats['connections_created'] += 1
 
-    async def _make_request(self, url: str, params: dict = None) -> Optional[Dict]:
+            async def on_connection_reuseconn(session, context, params):
+                stats['connections_reused'] += 1
+
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(on_connection_create_end)
+            trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+
+            connector = aiohttp.TCPConnector(
+                limit=self.CONNECTION_LIMIT_PER_HOST,
+                limit_per_host=self.CONNECTION_LIMIT_PER_HOST,
+                ttl_dns_cache=self.DNS_CACHE_TTL,
+                keepalive_timeout=self.KEEPALIVE_TIMEOUT,
+                enable_cleanup_closed=True
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.REQUEST_TIMEOUT),
+                trace_configs=[trace_config]
+            )
+            self._sessions[host] = session
+            print(f"🔌 [Riot API] Nova sessão HTTP persistente para {host}")
+
+        self._connection_stats[host]['requests'] += 1
+        return session
+
+    def get_connection_stats(self) -> Dict[str, Dict[str, int]]:
+        """Retorna contadores de requisições e conexões (criadas/reutilizadas) por host"""
+        return {host: dict(stats) for host, stats in self._connection_stats.items()}
+
+    async def close(self):
+        """Fecha todas as sessões HTTP (chamado no desligamento do bot)"""
+        for host, session in list(self._sessions.items()):
+            if not session.closed:
+                await session.close()
+            stats = self._connection_stats.get(host, {})
+            print(f"🔌 [Riot API] Sessão {host} fechada - {stats.get('requests', 0)} requisições, "
+                  f"{stats.get('connections_created', 0)} conexões abertas, "
+                  f"{stats.get('connections_reused', 0)} reutilizadas")
+        self._sessions.clear()
+
+        for method, stats in self._coalesce_stats.items():
+            if stats['saved']:
+                print(f"🔗 [Riot API] {method}: {stats['saved']}/{stats['calls']} chamadas reaproveitadas (single-flight)")
+
+        if self.match_cache is not None:
+            self.match_cache.flush_touched()
+            print(f"🗃️ [Match Cache] {self.match_cache.get_stats()}")
+        print(f"🧮 [Scoreboard] {self.scoreboards.get_stats()}")
+
+    def get_coalesce_stats(self) -> Dict[str, Dict[str, int]]:
+        """Retorna, por endpoint, quantas chamadas foram feitas e quantas foram economizadas pelo single-flight"""
+        return {method: dict(stats) for method, stats in self._coalesce_stats.items()}
+
+    async def _coalesce(self, method: str, url: str, params: Optional[dict], priority: int, fetch):
+        """
+        Executa fetch() uma única vez para cada (prioridade, url, params) em andamento.
+        Chamadas concorrentes idênticas aguardam o mesmo resultado em vez de repetir a requisição.
+        A prioridade faz parte da chave: uma chamada interativa nunca herda o descarte (shed) nem a
+        posição na fila de uma requisição de fundo/backfill.
+        """
+        key = (priority, url, tuple(sorted((params or {}).items())))
+        stats = self._coalesce_stats.setdefault(method, {'calls': 0, 'saved': 0})
+        stats['calls'] += 1
+
+        entry = self._inflight.get(key)
+        if entry is not None:
+            stats['saved'] += 1
+            entry['waiters'] += 1
+            try:
+                # shield: o cancelamento de um dos chamadores não cancela a requisição dos outros
+                return await asyncio.shield(entry['task'])
+            finally:
+                entry['waiters'] -= 1
+
+        task = asyncio.get_running_loop().create_task(fetch())
+        entry = {'task': task, 'waiters': 0}
+        self._inflight[key] = entry
+
+        def _done(_):
+            if self._inflight.get(key) is entry:
+                del self._inflight[key]
+            # Evita o aviso "exception was never retrieved" quando ninguém mais aguardava
+            if not task.cancelled():
+                task.exception()
+
+        task.add_done_callback(_done)
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # Quem iniciou foi cancelado: a requisição só é cancelada se ninguém mais a aguarda
+            if not entry['waiters']:
+                del self._inflight[key]
+                task.cancel()
+            raise
+
+    async def _send(self, url: str, params: dict = None, method: str = 'default',
+                    priority: int = PRIORITY_BACKGROUND) -> tuple:
+        """
+        Executa uma requisição GET respeitando o rate limiter.
+        Retorna (status, dados): dados é o JSON em 200, o texto da resposta em erros
+        e o Retry-After em 429 (o bucket afetado já fica bloqueado no limiter).
+        Retorna (None, None) se o limiter descartou a requisição por falta de orçamento.
+        """
+        host = urlsplit(url).hostname
+        if not await self._rate_limiter.acquire(host, method, priority):
+            return None, None
+
+        session = self._get_session(url)
+        async with session.get(url, params=params) as response:
+            self._rate_limiter.update_from_headers(host, method, response.headers)
+
+            if response.status == 200:
+                return response.status, await response.json()
+            if response.status == 429:
+                return response.status, self._rate_limiter.on_rate_limited(host, method, response.headers)
+            return response.status, await response.text()
+
+    async def _make_request(self, url: str, params: dict = None, method: str = 'default',
+                            priority: int = PRIORITY_BACKGROUND, raise_bad_request: bool = False) -> Optional[Dict]:
+        return await self._coalesce(method, url, params, priority,
+                                    lambda: self._request_with_retries(url, params, method, priority,
+                                                                       raise_bad_request))
+
+    async def _request_with_retries(self, url: str, params: dict, method: str, priority: int,
+                                    raise_bad_request: bool = False) -> Optional[Dict]:
         max_retries = 3
         retry_delay = 2
 
         for attempt in range(max_retries):
-            await self._rate_limit_wait()
-
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, headers=self.headers, params=params) as response:
-                        if response.status == 429:
-                            retry_after = int(response.headers.get('Retry-After', 60))
-                            print(f"🚫 [Rate Limit] API retornou 429, aguardando {retry_after}s")
-                            await asyncio.sleep(retry_after)
-                            continue
-
-                        if response.status == 200:
-                            return await response.json()
-                        elif response.status == 404:
-                            return None
-                        else:
-                            print(f"Erro na API Riot: {response.status}")
-                            if attempt < max_retries - 1:
-                                await asyncio.sleep(retry_delay)
-                                retry_delay *= 2  # Backoff exponencial
-                            return None
-
+                status, data = await self._send(url, params, method, priority)
+
+                if status is None:
+                    # Descartada pelo limiter (varredura de baixa prioridade sem orçamento)
+                    return None
+
+                if status == 429:
+                    # O limiter segura o próximo acquire até o Retry-After
+                    continue
+
+                if status == 200:
+                    return data
+                elif status == 404:
+                    return None
+                elif status == 400 and raise_bad_request:
+                    raise RiotBadRequest(str(data)[:200])
+                else:
+                    print(f"Erro na API Riot: {status}")
+                    if attempt < max_retries - 1:
+                        await asyncio.sleep(retry_delay)
+                        retry_delay *= 2  # Backoff exponencial
+                    return None
+
+            except RiotBadRequest:
+                raise
             except Exception as e:
                 print(f"Erro na requisição: {e}")
                 if attempt < max_retries - 1:
@@ -104,51 +269,143 @@ class RiotAPI:
 
         return None
 
-    async def get_account_by_riot_id(self, game_name: str, tag_line: str, region: str = 'br1') -> Optional[Dict]:
+    async def get_account_by_riot_id(self, game_name: str, tag_line: str, region: str = 'br1',
+                                     priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict]:
         """Busca informações da conta pelo Riot ID (nome#tag)"""
         routing = self.ROUTING.get(region, 'americas')
         url = f"https://{routing}.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
 
-        return await self._make_request(url)
+        return await self._make_request(url, method='account-v1.by-riot-id', priority=priority)
     
-    async def get_summoner_by_puuid(self, puuid: str, region: str = 'br1') -> Optional[Dict]:
+    async def get_summoner_by_puuid(self, puuid: str, region: str = 'br1',
+                                    priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict]:
         """Busca informações do invocador pelo PUUID"""
         if region not in self.REGIONS:
             return None
 
         url = f"https://{self.REGIONS[region]}/lol/summoner/v4/summoners/by-puuid/{puuid}"
 
-        return await self._make_request(url)
+        return await self._make_request(url, method='summoner-v4.by-puuid', priority=priority)
     
+    async def _list_match_ids(self, url: str, params: dict, queue: Optional[int],
+                              priority: int) -> Optional[List[str]]:
+        """
+        Lista IDs de partidas aplicando o filtro de fila (queue/type) mais específico aceito pela API.
+        Se a API responder 400, cai para o próximo conjunto de filtros e mantém o fallback.
+        """
+        filter_sets = self.MATCH_ID_FILTERS.get(queue, [{'queue': queue}, {}]) if queue is not None else [{}]
+
+        while True:
+            level = self._match_filter_level.get(queue, 0)
+            filters = filter_sets[min(level, len(filter_sets) - 1)]
+            try:
+                return await self._make_request(url, {**params, **filters}, method='match-v5.ids-by-puuid',
+                                                priority=priority, raise_bad_request=bool(filters))
+            except RiotBadRequest as e:
+                # Outra requisição concorrente pode já ter avançado o fallback
+                self._match_filter_level[queue] = max(self._match_filter_level.get(queue, 0), level + 1)
+                print(f"⚠️ [Riot API] Filtro {filters} rejeitado na listagem de partidas (400: {e}), "
+                      f"usando {filter_sets[min(level + 1, len(filter_sets) - 1)] or 'sem filtro'}")
+
     async def get_match_history(self, puuid: str, region: str = 'br1', count: int = 20,
-                                queue: int = 440) -> Optional[List[str]]:
-        """Busca histórico de partidas (queue 440 = Ranked Flex)"""
+                                queue: Optional[int] = 440, priority: int = PRIORITY_BACKGROUND) -> Optional[List[str]]:
+        """Busca histórico de partidas (queue 440 = Ranked Flex; None = todas as filas)"""
         routing = self.ROUTING.get(region, 'americas')
         url = f"https://{routing}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids"
 
-        # Nota: O parâmetro 'queue' foi removido pois causava erro 400
-        # Agora filtramos as partidas pelo queueId após buscar os detalhes
         params = {
             'start': 0,
             'count': min(count, 20)  # Limita a 20 para não sobrecarregar
         }
 
-        return await self._make_request(url, params)
+        return await self._list_match_ids(url, params, queue, priority)
     
-    async def get_match_details(self, match_id: str, region: str = 'br1') -> Optional[Dict]:
-        """Busca detalhes de uma partida específica"""
+    async def get_match_ids_since(self, puuid: str, region: str = 'br1', start_time: int = None,
+                                  page_size: int = 100, max_pages: int = 5, queue: Optional[int] = None,
+                                  priority: int = PRIORITY_BACKGROUND) -> Optional[List[str]]:
+        """
+        Lista os IDs de partidas iniciadas a partir de start_time (epoch em segundos),
+        paginando com start/count (máx. 100 por página). Retorna do mais antigo para o mais recente,
+        ou None se a listagem falhar.
+        """
+        routing = self.ROUTING.get(region, 'americas')
+        url = f"https://{routing}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids"
+        page_size = max(1, min(page_size, 100))
+
+        match_ids = []
+        for page in range(max_pages):
+            params = {
+                'start': page * page_size,
+                'count': page_size
+            }
+            if start_time:
+                params['startTime'] = int(start_time)
+
+            page_ids = await self._list_match_ids(url, params, queue, priority)
+            if page_ids is None:
+                # Falha no meio da paginação: melhor não avançar nada do que pular partidas
+                return None
+
+            match_ids.extend(page_ids)
+            if len(page_ids) < page_size:
+                break
+
+        # A API retorna do mais recente para o mais antigo
+        match_ids.reverse()
+        return match_ids
+
+    async def get_match_ids_page(self, puuid: str, region: str = 'br1', start: int = 0, count: int = 100,
+                                 start_time: int = None, end_time: int = None, queue: Optional[int] = 440,
+                                 priority: int = PRIORITY_BACKFILL) -> Optional[List[str]]:
+        """
+        Uma página da listagem de partidas entre start_time e end_time (epoch em segundos).
+        Com end_time fixo os offsets ficam estáveis, o que permite retomar a paginação depois.
+        """
+        routing = self.ROUTING.get(region, 'americas')
+        url = f"https://{routing}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids"
+
+        params = {
+            'start': start,
+            'count': max(1, min(count, 100))
+        }
+        if start_time:
+            params['startTime'] = int(start_time)
+        if end_time:
+            params['endTime'] = int(end_time)
+
+        return await self._list_match_ids(url, params, queue, priority)
+
+    async def get_match_details(self, match_id: str, region: str = 'br1',
+                                priority: int = PRIORITY_BACKGROUND) -> Optional[Dict]:
+        """
+        Busca detalhes de uma partida específica.
+        Partidas já conhecidas como de outras filas (cache negativo) retornam None sem requisição.
+        """
         routing = self.ROUTING.get(region, 'americas')
         url = f"https://{routing}.api.riotgames.com/lol/match/v5/matches/{match_id}"
 
-        return await self._make_request(url)
+        if self.match_cache is not None:
+            if self.match_cache.is_non_flex(match_id):
+                return None
+            cached = self.match_cache.get(match_id)
+            if cached is not None:
+                return cached
+
+        match_data = await self._make_request(url, method='match-v5.match', priority=priority)
+
+        if match_data and self.match_cache is not None:
+            self.match_cache.put(match_id, match_data)
 
-    async def get_flex_matches_batch(self, puuid: str, region: str = 'br1', max_matches: int = 20) -> List[Dict]:
+        return match_data
+
+    async def get_flex_matches_batch(self, puuid: str, region: str = 'br1', max_matches: int = 20,
+                                     priority: int = PRIORITY_BACKGROUND) -> List[Dict]:
         """Busca múltiplas partidas de Ranked Flex do jogador (para evitar duplicatas)"""
         if not puuid or len(puuid) < 10:
             print(f"⚠️ PUUID inválido: {puuid}")
             return []
 
-        match_ids = await self.get_match_history(puuid, region, count=1)
+        match_ids = await self.get_match_history(puuid, region, count=1, priority=priority)
 
         if not match_ids:
             return []
@@ -158,7 +415,7 @@ class RiotAPI:
         # Verifica cada partida e coleta apenas as de flex (queue 440)
         for match_id in match_ids:
             try:
-                match_data = await self.get_match_details(match_id, region)
+                match_data = await self.get_match_details(match_id, region, priority=priority)
 
                 if match_data:
                     queue_id = match_data.get('info', {}).get('queueId', 0)
@@ -171,7 +428,8 @@ class RiotAPI:
 
         return flex_matches
 
-    async def get_active_game(self, puuid: str, region: str = 'br1') -> Optional[Dict]:
+    async def get_active_game(self, puuid: str, region: str = 'br1',
+                              priority: int = PRIORITY_BACKGROUND) -> Optional[Dict]:
         """Busca informações de partida em andamento (Spectator API)"""
         if region not in self.REGIONS:
             return None
@@ -179,33 +437,26 @@ class RiotAPI:
         # Spectator V5 usa PUUID diretamente
         url = f"https://{self.REGIONS[region]}/lol/spectator/v5/active-games/by-summoner/{puuid}"
 
-        # Usa o método _make_request mas com tratamento especial para erro 404
-        await self._rate_limit_wait()
-
+        # Tratamento especial: 404 é normal (jogador fora de partida) e 429 não é repetido
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=self.headers) as response:
-                    if response.status == 429:
-                        # Rate limit - aguardar mais tempo
-                        retry_after = int(response.headers.get('Retry-After', 60))
-                        print(f"🚫 [Rate Limit] API retornou 429, aguardando {retry_after}s")
-                        await asyncio.sleep(retry_after)
-                        return None
-
-                    if response.status == 200:
-                        return await response.json()
-                    elif response.status == 404:
-                        # Jogador não está em partida (normal, não é erro)
-                        return None
-                    else:
-                        # Apenas mostra erro uma vez por minuto para não spammar logs
-                        if not hasattr(self, '_last_spectator_error') or \
-                           (datetime.now() - self._last_spectator_error).seconds > 60:
-                            print(f"Erro ao buscar partida ativa: {response.status}")
-                            text = await response.text()
-                            print(f"Resposta da API: {text[:200]}")
-                            self._last_spectator_error = datetime.now()
-                        return None
+            status, data = await self._coalesce(
+                'spectator-v5.active-game', url, None, priority,
+                lambda: self._send(url, method='spectator-v5.active-game', priority=priority)
+            )
+
+            if status == 200:
+                return data
+            elif status in (None, 404, 429):
+                # 404: jogador não está em partida (normal, não é erro); None: descartada pelo limiter
+                return None
+            else:
+                # Apenas mostra erro uma vez por minuto para não spammar logs
+                if not hasattr(self, '_last_spectator_error') or \
+                   (datetime.now() - self._last_spectator_error).seconds > 60:
+                    print(f"Erro ao buscar partida ativa: {status}")
+                    print(f"Resposta da API: {str(data)[:200]}")
+                    self._last_spectator_error = datetime.now()
+                return None
         except Exception as e:
             print(f"Erro ao buscar partida ativa: {e}")
             return None
@@ -344,249 +595,87 @@ class RiotAPI:
         Compara o jogador com TODOS os 10 jogadores da partida
         Ajusta pesos baseado na role do jogador
         Retorna: (score, placement) - ex: (65, 7) = 65 pontos, 7º lugar
+
+        Para a partida inteira prefira get_scoreboard (rankings calculados uma única vez).
         """
-        # Normaliza baseado no rank entre 10 jogadores
-        def rank_normalize(value: float, all_values: list, player_index: int) -> tuple:
-            """Normaliza baseado na posição no ranking dos 10 jogadores"""
-            if len(all_values) <= 1:
-                return 1.0, 1
-            
-            # Cria lista de tuplas (valor, índice_original) para manter ordem única
-            indexed_values = [(v, i) for i, v in enumerate(all_values)]
-            # Ordena por valor (descendente), depois por índice (ascendente) para quebrar empates
-            sorted_indexed = sorted(indexed_values, key=lambda x: (-x[0], x[1]))
-            
-            # Encontra a posição do jogador (1º ao 10º) usando o índice correto
-            try:
-                # Encontra a posição única baseada na tupla (valor, índice)
-                rank = next(i + 1 for i, (v, idx) in enumerate(sorted_indexed) if idx == player_index)
-            except (StopIteration, ValueError):
-                return 0.5, 5
-            
-            # 1º = 100%, 2º = 90%, 3º = 80%, ..., 10º = 10%
-            # Escala linear: (11 - rank) / 10
-            normalized = max(0.0, (11 - rank) / 10)
-            return normalized, rank
-        
-        # Extrai métricas do jogador
-        kda = player_stats['kda']
-        kill_participation = player_stats['kill_participation']
-        damage = player_stats['total_damage_to_champions']
-        gold = player_stats['gold_earned']
-        cs = player_stats['total_minions_killed'] + player_stats['neutral_minions_killed']
-        vision = player_stats['vision_score']
-        
-        # Compara com TODOS os 10 jogadores
-        all_kdas = all_players_stats.get('all_kdas', [kda])
-        all_kps = all_players_stats.get('all_kps', [kill_participation])
-        all_damages = all_players_stats.get('all_damages', [damage])
-        all_golds = all_players_stats.get('all_golds', [gold])
-        all_cs = all_players_stats.get('all_cs', [cs])
-        all_visions = all_players_stats.get('all_visions', [vision])
-        
-        # Pega o índice do jogador na lista (encontra pela correspondência exata de todas as métricas)
-        player_index = -1
-        for i, (k, kp, d, g, c, v) in enumerate(zip(all_kdas, all_kps, all_damages, all_golds, all_cs, all_visions)):
-            if k == kda and kp == kill_participation and d == damage and g == gold and c == cs and v == vision:
-                player_index = i
-                break
-        
-        # Se não encontrou, usa o primeiro
-        if player_index == -1:
-            player_index = 0
-        
-        # Calcula scores normalizados E posições
-        norm_kda, rank_kda = rank_normalize(kda, all_kdas, player_index)
-        norm_kp, rank_kp = rank_normalize(kill_participation, all_kps, player_index)
-        norm_damage, rank_damage = rank_normalize(damage, all_damages, player_index)
-        norm_gold, rank_gold = rank_normalize(gold, all_golds, player_index)
-        norm_cs, rank_cs = rank_normalize(cs, all_cs, player_index)
-        norm_vision, rank_vision = rank_normalize(vision, all_visions, player_index)
-        
-        # PESOS por ROLE (estilo OP.GG)
-        # Suporte: mais peso em visão e KP, menos em CS e dano
-        if role.upper() in ['UTILITY', 'SUPPORT']:
-            weights = {
-                'kda': 0.30,       # KDA importante
-                'kp': 0.25,        # KP muito importante para suporte
-                'damage': 0.10,    # Dano menos importante
-                'gold': 0.10,      # Gold menos importante
-                'vision': 0.20,    # Visão MUITO importante para suporte
-                'cs': 0.05         # CS quase irrelevante para suporte
-            }
-        else:
-            # Carries (Top, Mid, ADC, Jungle) - focado em KDA/Dano/Gold
-            weights = {
-                'kda': 0.35,       # KDA é rei
-                'damage': 0.30,    # Dano muito importante
-                'gold': 0.15,      # Gold importante
-                'kp': 0.10,        # KP importante
-                'cs': 0.05,        # CS menos importante
-                'vision': 0.05     # Vision quase ignorada (realista com sites)
-            }
-        
-        score = (
-            norm_kda * weights['kda'] +
-            norm_kp * weights['kp'] +
-            norm_damage * weights['damage'] +
-            norm_gold * weights['gold'] +
-            norm_cs * weights['cs'] +
-            norm_vision * weights['vision']
-        ) * 100
-        
-        kda_value = player_stats.get('kda', 0)
-        deaths = player_stats.get('deaths', 0)
-        
-        if deaths <= 1:
-            pass
-        elif kda_value < 1.0:
-            if kda_value < 0.5:
-                score = max(score - 40, 0)
-            elif kda_value < 0.75:
-                score = max(score - 25, 0)
-            else:
-                score = max(score - 15, 0)
-        elif kda_value >= 1.0:
-            if kda_value >= 5.0:
-                score = min(score + 15, 100)
-            elif kda_value >= 3.0:
-                score = min(score + 10, 100)
-            elif kda_value >= 2.0:
-                score = min(score + 5, 100)
-        
-        won = player_stats.get('win', False)
-        if won:
-            score = min(score + 5, 100)
-        
-        overall_placement = (
-            rank_kda * weights['kda'] +
-            rank_kp * weights['kp'] +
-            rank_damage * weights['damage'] +
-            rank_gold * weights['gold'] +
-            rank_cs * weights['cs'] +
-            rank_vision * weights['vision']
-        )
-        
-        return (int(min(max(score, 0), 100)), overall_placement)
+        return score_player(player_stats, all_players_stats, role)
+
+    def get_scoreboard(self, match_data: Dict, profile=None) -> Dict:
+        """
+        Scoreboard dos 10 jogadores da partida (memoizado por match_id, ver ScoreboardCache).
+        profile: perfil de pontuação do servidor (padrão: o perfil usado nos scores salvos).
+        """
+        return self.scoreboards.get(match_data, profile)
     
+    # Nome exibido de cada role (teamPosition da match-v5)
+    ROLE_NAMES = {
+        'TOP': 'Top',
+        'JUNGLE': 'Jungle',
+        'MIDDLE': 'Mid',
+        'BOTTOM': 'ADC',
+        'UTILITY': 'Support'
+    }
+
+    def _participant_row(self, entry: Dict) -> Dict:
+        """Linha de match_participants de um jogador do scoreboard (mesmas chaves das estatísticas)"""
+        p = entry['player']
+        kills, deaths, assists = p.get('kills', 0), p.get('deaths', 0), p.get('assists', 0)
+        return {
+            'participant_index': entry['index'],
+            'puuid': entry['puuid'],
+            'team_id': entry['team_id'],
+            'champion_id': p.get('championId'),
+            'champion_name': p.get('championName', 'Unknown'),
+            'role': self.ROLE_NAMES.get(entry['role'], entry['role']),
+            'win': p.get('win', False),
+            'kills': kills,
+            'deaths': deaths,
+            'assists': assists,
+            'damage_dealt': p.get('totalDamageDealtToChampions', 0),
+            'damage_taken': p.get('totalDamageTaken', 0),
+            'damage_to_objectives': p.get('damageDealtToObjectives', 0),
+            'gold_earned': p.get('goldEarned', 0),
+            'cs': p.get('totalMinionsKilled', 0) + p.get('neutralMinionsKilled', 0),
+            'vision_score': p.get('visionScore', 0),
+            'wards_placed': p.get('wardsPlaced', 0),
+            'wards_killed': p.get('wardsKilled', 0),
+            'champ_level': p.get('champLevel', 0),
+            'turret_kills': p.get('turretKills', 0),
+            'largest_multi_kill': p.get('largestMultiKill', 0),
+            'total_heal': p.get('totalHeal', 0),
+            'time_ccing_others': p.get('timeCCingOthers', 0),
+            'team_kills': entry['team_kills'],
+            'mvp_score': entry['base_score'],
+            'mvp_placement': entry['placement'],
+            'scoring_version': SCORING_VERSION,
+            'kda': round((kills + assists) / max(deaths, 1), 2),
+            'kill_participation': round((kills + assists) / max(entry['team_kills'], 1) * 100, 1),
+        }
+
     def extract_player_stats(self, match_data: Dict, puuid: str) -> Optional[Dict]:
         """Extrai as estatísticas do jogador específico de uma partida"""
         try:
             # Encontra o participante com o PUUID correspondente
             participant = None
-            team_id = None
             for p in match_data['info']['participants']:
                 if p['puuid'] == puuid:
                     participant = p
-                    team_id = p['teamId']
                     break
             
             if not participant:
                 return None
             
-            # Calcula total de kills do time (para Carry Score)
-            team_kills = sum(
-                p['kills'] for p in match_data['info']['participants']
-                if p['teamId'] == team_id
-            )
-            
-            # Coleta stats de TODOS os 10 jogadores (para MVP Score)
-            all_kdas = []
-            all_damages = []
-            all_golds = []
-            all_cs = []
-            all_visions = []
-            
-            for p in match_data['info']['participants']:
-                # Calcula KDA do jogador
-                deaths = p['deaths'] if p['deaths'] > 0 else 1
-                player_kda = (p['kills'] + p['assists']) / deaths
-                all_kdas.append(player_kda)
-                
-                all_damages.append(p.get('totalDamageDealtToChampions', 0))
-                all_golds.append(p.get('goldEarned', 0))
-                all_cs.append(p.get('totalMinionsKilled', 0) + p.get('neutralMinionsKilled', 0))
-                all_visions.append(p.get('visionScore', 0))
-            
-            # Calcula KPs de todos (precisa dos kills de cada time)
-            team_1_kills = sum(p['kills'] for p in match_data['info']['participants'] if p['teamId'] == 100)
-            team_2_kills = sum(p['kills'] for p in match_data['info']['participants'] if p['teamId'] == 200)
-            
-            all_kps = []
-            for p in match_data['info']['participants']:
-                team_total_kills = team_1_kills if p['teamId'] == 100 else team_2_kills
-                player_kp = (p['kills'] + p['assists']) / max(team_total_kills, 1)
-                all_kps.append(player_kp)
-            
-            # Dados de TODOS os jogadores para cálculo do MVP Score
-            all_players_stats = {
-                'all_kdas': all_kdas,
-                'all_kps': all_kps,
-                'all_damages': all_damages,
-                'all_golds': all_golds,
-                'all_cs': all_cs,
-                'all_visions': all_visions
-            }
-            
-            # Extrai role PRIMEIRO (necessária para cálculo do MVP Score)
-            role = participant.get('teamPosition', '')
-            if not role or role == '':
-                role = participant.get('individualPosition', 'MIDDLE')
-            
-            # Prepara stats do jogador para MVP Score
-            player_mvp_stats = {
-                'kda': (participant['kills'] + participant['assists']) / max(participant['deaths'], 1),
-                'kill_participation': (participant['kills'] + participant['assists']) / max(team_kills, 1),
-                'total_damage_to_champions': participant.get('totalDamageDealtToChampions', 0),
-                'gold_earned': participant.get('goldEarned', 0),
-                'total_minions_killed': participant.get('totalMinionsKilled', 0),
-                'neutral_minions_killed': participant.get('neutralMinionsKilled', 0),
-                'vision_score': participant.get('visionScore', 0)
-            }
-            
-            # Calcula o MVP score inicial (retorna tupla: score, placement temporário)
-            mvp_score, _ = self.calculate_mvp_score(player_mvp_stats, all_players_stats, role)
-            
-            # Calcula scores de TODOS os jogadores para determinar placement único
-            all_player_scores = []
-            for i, p in enumerate(match_data['info']['participants']):
-                p_role = p.get('teamPosition', '') or p.get('individualPosition', 'MIDDLE')
-                p_team_id = p['teamId']
-                p_team_kills = sum(
-                    pl['kills'] for pl in match_data['info']['participants']
-                    if pl['teamId'] == p_team_id
-                )
-                
-                p_stats = {
-                    'kda': (p['kills'] + p['assists']) / max(p['deaths'], 1),
-                    'kill_participation': (p['kills'] + p['assists']) / max(p_team_kills, 1),
-                    'total_damage_to_champions': p.get('totalDamageDealtToChampions', 0),
-                    'gold_earned': p.get('goldEarned', 0),
-                    'total_minions_killed': p.get('totalMinionsKilled', 0),
-                    'neutral_minions_killed': p.get('neutralMinionsKilled', 0),
-                    'vision_score': p.get('visionScore', 0),
-                    'win': p.get('win', False)
-                }
-                
-                p_score, _ = self.calculate_mvp_score(p_stats, all_players_stats, p_role)
-                all_player_scores.append((p_score, i, p['puuid']))
-            
-            # Ordena por score (descendente), depois por índice (para desempate consistente)
-            all_player_scores.sort(key=lambda x: (-x[0], x[1]))
-            
-            mvp_placement = next(
-                i + 1 for i, (score, idx, p_puuid) in enumerate(all_player_scores)
-                if p_puuid == puuid
-            )
+            # MVP Score dos 10 jogadores, calculado uma vez por partida e reaproveitado pelos outros jogadores
+            scoreboard = self.get_scoreboard(match_data)
+            entry = scoreboard['by_puuid'][puuid]
+            team_kills = entry['team_kills']
+            role = entry['role']
+
+            # O score salvo do jogador não inclui o bônus de vitória; o placement usa o score completo
+            mvp_score = entry['base_score']
+            mvp_placement = entry['placement']
             
-            role_names = {
-                'TOP': 'Top',
-                'JUNGLE': 'Jungle',
-                'MIDDLE': 'Mid',
-                'BOTTOM': 'ADC',
-                'UTILITY': 'Support'
-            }
-            role_display = role_names.get(role, role)
+            role_display = self.ROLE_NAMES.get(role, role)
             
             # Extrai game duration com fallback para diferentes formatos
             game_duration = match_data['info'].get('gameDuration')
@@ -616,7 +705,13 @@ class RiotAPI:
                 'kda': round((participant.get('kills', 0) + participant.get('assists', 0)) / max(participant.get('deaths', 1), 1), 2),
                 'kill_participation': round((participant.get('kills', 0) + participant.get('assists', 0)) / max(team_kills, 1) * 100, 1),
                 'played_at': datetime.fromtimestamp(match_data['info'].get('gameStartTimestamp', 0) / 1000).isoformat() if match_data['info'].get('gameStartTimestamp') else datetime.now().isoformat(),
-                'is_remake': is_remake
+                'played_ts': match_data['info']['gameStartTimestamp'] // 1000 if match_data['info'].get('gameStartTimestamp') else None,
+                'is_remake': is_remake,
+                # Dados para o armazenamento normalizado (partida e os 10 jogadores gravados uma vez)
+                'queue_id': match_data['info'].get('queueId'),
+                'puuid': puuid,
+                'participant_index': entry['index'],
+                'participants': [self._participant_row(e) for e in scoreboard['players']]
             }
             
             return stats
@@ -0,0 +1,526 @@
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Versão da fórmula do MVP Score, gravada em cada jogador (match_participants.scoring_version).
+# Ao mudar pesos/ajustes, incremente e rode "python rescore.py" para recalcular as partidas salvas.
+SCORING_VERSION = 1
+
+# Métricas usadas no MVP Score, na mesma ordem da soma ponderada (a ordem importa para o float final)
+METRICS = ('kda', 'kp', 'damage', 'gold', 'cs', 'vision')
+
+# PESOS por ROLE (estilo OP.GG)
+# Suporte: mais peso em visão e KP, menos em CS e dano
+SUPPORT_WEIGHTS = {
+    'kda': 0.30,       # KDA importante
+    'kp': 0.25,        # KP muito importante para suporte
+    'damage': 0.10,    # Dano menos importante
+    'gold': 0.10,      # Gold menos importante
+    'vision': 0.20,    # Visão MUITO importante para suporte
+    'cs': 0.05         # CS quase irrelevante para suporte
+}
+
+# Carries (Top, Mid, ADC, Jungle) - focado em KDA/Dano/Gold
+CARRY_WEIGHTS = {
+    'kda': 0.35,       # KDA é rei
+    'damage': 0.30,    # Dano muito importante
+    'gold': 0.15,      # Gold importante
+    'kp': 0.10,        # KP importante
+    'cs': 0.05,        # CS menos importante
+    'vision': 0.05     # Vision quase ignorada (realista com sites)
+}
+
+
+# Nomes aceitos para cada métrica ao configurar um perfil (comando /perfil_score)
+METRIC_ALIASES = {
+    'kda': 'kda',
+    'kp': 'kp',
+    'dano': 'damage',
+    'damage': 'damage',
+    'gold': 'gold',
+    'ouro': 'gold',
+    'cs': 'cs',
+    'farm': 'cs',
+    'visao': 'vision',
+    'visão': 'vision',
+    'vision': 'vision',
+}
+
+
+def is_support_role(role: str) -> bool:
+    return (role or '').upper() in ['UTILITY', 'SUPPORT']
+
+
+def get_role_weights(role: str) -> Dict[str, float]:
+    """Vetor de pesos da role (suporte ou carry)"""
+    if is_support_role(role):
+        return SUPPORT_WEIGHTS
+    return CARRY_WEIGHTS
+
+
+class ScoringProfile:
+    """
+    Perfil de pesos do MVP Score (um conjunto para suporte e outro para as demais roles).
+    Os pesos são pré-compilados em vetores na ordem de METRICS, usados direto na soma ponderada.
+    """
+
+    def __init__(self, name: str, support_weights: Dict[str, float], carry_weights: Dict[str, float]):
+        self.name = name
+        self.support_weights = {metric: support_weights[metric] for metric in METRICS}
+        self.carry_weights = {metric: carry_weights[metric] for metric in METRICS}
+        self.support_vector = tuple(self.support_weights[metric] for metric in METRICS)
+        self.carry_vector = tuple(self.carry_weights[metric] for metric in METRICS)
+        # Identifica o perfil no cache de scoreboards (muda se os pesos mudarem)
+        self.key = (name, self.support_vector, self.carry_vector)
+
+    def vector_for(self, role: str) -> tuple:
+        return self.support_vector if is_support_role(role) else self.carry_vector
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        return {'support': dict(self.support_weights), 'carry': dict(self.carry_weights)}
+
+    @classmethod
+    def from_dict(cls, name: str, weights: Dict[str, Dict[str, float]]) -> 'ScoringProfile':
+        return cls(name, weights['support'], weights['carry'])
+
+
+# Perfil usado nos scores salvos no banco e nos servidores sem perfil próprio
+DEFAULT_PROFILE = ScoringProfile('padrao', SUPPORT_WEIGHTS, CARRY_WEIGHTS)
+
+
+def parse_weights(text: str, base: Dict[str, float]) -> Dict[str, float]:
+    """
+    Converte 'visao=30 cs=2 dano=25' (percentuais) em pesos por métrica. Métricas omitidas mantêm o
+    peso de base; o resultado é normalizado para somar 1. Levanta ValueError com a mensagem para o usuário.
+    """
+    weights = {metric: base[metric] * 100 for metric in METRICS}
+    for part in (text or '').replace(',', ' ').split():
+        if '=' not in part:
+            raise ValueError(f"Formato inválido em '{part}' (use metrica=peso, ex: visao=30)")
+        name, value = part.split('=', 1)
+        metric = METRIC_ALIASES.get(name.strip().lower())
+        if metric is None:
+            raise ValueError(f"Métrica desconhecida '{name}' (use: kda, kp, dano, gold, cs, visao)")
+        try:
+            weights[metric] = float(value)
+        except ValueError:
+            raise ValueError(f"Peso inválido para {name}: '{value}'")
+        if weights[metric] < 0:
+            raise ValueError(f"Peso de {name} não pode ser negativo")
+
+    total = sum(weights[metric] for metric in METRICS)
+    if total <= 0:
+        raise ValueError("A soma dos pesos precisa ser maior que zero")
+    return {metric: weights[metric] / total for metric in METRICS}
+
+
+def rank_positions(values: List[float]) -> List[int]:
+    """
+    Posição (1º ao N-ésimo) de cada valor, do maior para o menor.
+    Empates são desfeitos pelo índice original (quem aparece antes fica na frente).
+    """
+    order = sorted(range(len(values)), key=lambda i: (-values[i], i))
+    ranks = [0] * len(values)
+    for position, index in enumerate(order, 1):
+        ranks[index] = position
+    return ranks
+
+
+def adjust_score(score: float, kda: float, deaths: int, won: bool) -> int:
+    """Aplica os ajustes por KDA e vitória e limita o score entre 0 e 100"""
+    if deaths <= 1:
+        pass
+    elif kda < 1.0:
+        if kda < 0.5:
+            score = max(score - 40, 0)
+        elif kda < 0.75:
+            score = max(score - 25, 0)
+        else:
+            score = max(score - 15, 0)
+    elif kda >= 1.0:
+        if kda >= 5.0:
+            score = min(score + 15, 100)
+        elif kda >= 3.0:
+            score = min(score + 10, 100)
+        elif kda >= 2.0:
+            score = min(score + 5, 100)
+
+    if won:
+        score = min(score + 5, 100)
+
+    return int(min(max(score, 0), 100))
+
+
+def rank_to_norm(rank: int) -> float:
+    """1º = 100%, 2º = 90%, 3º = 80%, ..., 10º = 10% (escala linear: (11 - rank) / 10)"""
+    return max(0.0, (11 - rank) / 10)
+
+
+def weighted_sum(values: tuple, vector: tuple) -> float:
+    """Soma ponderada na ordem de METRICS (mesma ordem de operações da fórmula original)"""
+    total = 0
+    for value, weight in zip(values, vector):
+        total += value * weight
+    return total
+
+
+def score_from_ranks(norms: Dict[str, float], ranks: Dict[str, int], role: str, kda: float,
+                     deaths: int = 0, won: bool = False, profile: ScoringProfile = None) -> tuple:
+    """Calcula (score, placement ponderado) a partir das notas e posições do jogador em cada métrica"""
+    vector = (profile or DEFAULT_PROFILE).vector_for(role)
+
+    score = weighted_sum(tuple(norms[metric] for metric in METRICS), vector) * 100
+    overall_placement = weighted_sum(tuple(ranks[metric] for metric in METRICS), vector)
+
+    return adjust_score(score, kda, deaths, won), overall_placement
+
+
+def _resolve_indexes(columns: Dict[str, List[float]], count: int) -> List[int]:
+    """
+    Índice usado nos rankings de cada jogador: o primeiro jogador com exatamente as mesmas métricas.
+    (O cálculo antigo achava o jogador pela correspondência dos valores, então jogadores com as seis
+    métricas idênticas herdam as posições do primeiro; mantido para os scores não mudarem.)
+    """
+    first_seen = {}
+    resolved = []
+    for i in range(count):
+        key = tuple(columns[metric][i] for metric in METRICS)
+        resolved.append(first_seen.setdefault(key, i))
+    return resolved
+
+
+def rank_match(participants: List[Dict]) -> Dict:
+    """
+    Parte do MVP Score que não depende dos pesos: métricas, posições e notas de cada jogador.
+    Retorna 'team_kills', 'columns' (métrica -> valores dos jogadores) e 'rows', uma por jogador:
+    (notas, posições, role, kda, vitória), com notas/posições em tuplas na ordem de METRICS.
+    Calculado uma vez por partida, serve para pontuar com qualquer perfil (score_rows).
+    """
+    count = len(participants)
+
+    team_kills = {}
+    for p in participants:
+        team_kills[p['teamId']] = team_kills.get(p['teamId'], 0) + p['kills']
+
+    columns = {metric: [] for metric in METRICS}
+    for p in participants:
+        columns['kda'].append((p['kills'] + p['assists']) / max(p['deaths'], 1))
+        columns['kp'].append((p['kills'] + p['assists']) / max(team_kills[p['teamId']], 1))
+        columns['damage'].append(p.get('totalDamageDealtToChampions', 0))
+        columns['gold'].append(p.get('goldEarned', 0))
+        columns['cs'].append(p.get('totalMinionsKilled', 0) + p.get('neutralMinionsKilled', 0))
+        columns['vision'].append(p.get('visionScore', 0))
+
+    ranks = {metric: rank_positions(values) for metric, values in columns.items()}
+    resolved = _resolve_indexes(columns, count)
+
+    rows = []
+    for i, p in enumerate(participants):
+        role = p.get('teamPosition', '') or p.get('individualPosition', 'MIDDLE')
+        if count <= 1:
+            player_ranks = tuple(1 for metric in METRICS)
+        else:
+            player_ranks = tuple(ranks[metric][resolved[i]] for metric in METRICS)
+        norms = tuple(rank_to_norm(rank) for rank in player_ranks)
+        rows.append((norms, player_ranks, role, columns['kda'][i], p.get('win', False)))
+
+    return {
+        'team_kills': team_kills,
+        'columns': columns,
+        'rows': rows,
+    }
+
+
+def score_rows(rows: List[tuple], profile: ScoringProfile = None) -> List[tuple]:
+    """
+    Aplica o vetor de pesos do perfil às linhas de rank_match.
+    Retorna (mvp_score, base_score, placement ponderado) de cada jogador.
+    """
+    profile = profile or DEFAULT_PROFILE
+    scores = []
+    for norms, ranks, role, kda, won in rows:
+        vector = profile.vector_for(role)
+        raw_score = weighted_sum(norms, vector) * 100
+        # O cálculo original nunca recebia 'deaths', então o ajuste por KDA não é aplicado;
+        # mantido assim para os scores continuarem idênticos aos já salvos.
+        scores.append((
+            adjust_score(raw_score, kda, 0, won),
+            adjust_score(raw_score, kda, 0, False),
+            weighted_sum(ranks, vector),
+        ))
+    return scores
+
+
+def compute_scoreboard(participants: List[Dict], profile: ScoringProfile = None, ranked: Dict = None) -> Dict:
+    """
+    Calcula o MVP Score dos 10 jogadores de uma partida de uma vez.
+
+    Os rankings de cada métrica são calculados uma única vez; depois cada jogador só aplica o
+    vetor de pesos da role (do perfil, padrão DEFAULT_PROFILE) e os ajustes. Retorna:
+    - 'players': uma entrada por participante (mesma ordem da partida)
+    - 'by_puuid': puuid -> entrada
+    - 'team_kills': teamId -> total de kills do time
+
+    Cada entrada tem 'mvp_score' (com bônus de vitória), 'base_score' (sem o bônus, que é o valor
+    salvo para o jogador) e 'placement' (1 a 10, ordenado por mvp_score e índice).
+    ranked: resultado de rank_match já calculado para a partida (evita refazer os rankings).
+    """
+    ranked = ranked or rank_match(participants)
+    team_kills = ranked['team_kills']
+    columns = ranked['columns']
+    scores = score_rows(ranked['rows'], profile)
+    # Colocação pelo mvp_score; empate desfeito pela ordem na partida
+    placements = rank_positions([mvp_score for mvp_score, _, _ in scores])
+
+    players = []
+    for i, p in enumerate(participants):
+        mvp_score, base_score, weighted_placement = scores[i]
+        players.append({
+            'index': i,
+            'puuid': p.get('puuid'),
+            'player': p,
+            'role': ranked['rows'][i][2],
+            'team_id': p['teamId'],
+            'team_kills': team_kills[p['teamId']],
+            'kda': columns['kda'][i],
+            'kp': columns['kp'][i],
+            'damage': columns['damage'][i],
+            'gold': columns['gold'][i],
+            'cs': columns['cs'][i],
+            'vision': columns['vision'][i],
+            'win': ranked['rows'][i][4],
+            'mvp_score': mvp_score,
+            'base_score': base_score,
+            'weighted_placement': weighted_placement,
+            'placement': placements[i],
+        })
+
+    by_puuid = {}
+    for entry in players:
+        # Em caso de puuid repetido vale o primeiro, como na busca do cálculo antigo
+        by_puuid.setdefault(entry['puuid'], entry)
+
+    return {
+        'players': players,
+        'by_puuid': by_puuid,
+        'team_kills': team_kills,
+    }
+
+
+def participants_from_rows(rows: List[tuple]) -> List[Dict]:
+    """
+    Converte linhas salvas de match_participants (colunas de Database.RESCORE_COLUMNS, na ordem
+    da partida) no formato de participante da match-v5 usado por rank_match/compute_scoreboard.
+    """
+    participants = []
+    for row in rows:
+        (participant_index, puuid, team_id, role, win, kills, deaths, assists,
+         damage_dealt, gold_earned, cs, vision_score) = row[:12]
+        participants.append({
+            'puuid': puuid,
+            'teamId': team_id,
+            'teamPosition': role or '',
+            'win': bool(win),
+            'kills': kills or 0,
+            'deaths': deaths or 0,
+            'assists': assists or 0,
+            'totalDamageDealtToChampions': damage_dealt or 0,
+            'goldEarned': gold_earned or 0,
+            'totalMinionsKilled': cs or 0,
+            'visionScore': vision_score or 0,
+        })
+    return participants
+
+
+# Regras de restrição de campeão (check_champion_performance no bot)
+BAN_IMMEDIATE_SCORE = 35   # MVP abaixo disso: restrição imediata
+BAN_STREAK_SCORE = 45      # MVP abaixo disso nas últimas BAN_STREAK_GAMES partidas com o campeão
+BAN_STREAK_GAMES = 3
+
+
+def simulate_profiles(games: List[Dict], current: ScoringProfile, candidate: ScoringProfile) -> Dict:
+    """
+    What-if: pontua as partidas salvas (Database.get_recent_scoring_games, da mais antiga para a
+    mais recente) com os dois perfis. Os rankings de cada partida são calculados uma vez e só o
+    vetor de pesos muda entre os perfis. Retorna:
+    - 'games': partidas simuladas
+    - 'ranking': por discord_id -> {'games', 'current', 'candidate'} (média de MVP Score) e
+      'current_position' / 'candidate_position' no ranking por média
+    - 'bans': perfil ('current'/'candidate') -> {(lol_account_id, campeão, match_id)} restrições disparadas
+    - 'changed_placements': jogadores vinculados cuja colocação na partida mudou
+    """
+    profiles = {'current': current, 'candidate': candidate}
+    totals: Dict[str, Dict] = {}
+    bans = {name: set() for name in profiles}
+    history = {name: {} for name in profiles}
+    changed_placements = 0
+
+    for game in games:
+        if len(game['rows']) < 2 or not game['linked']:
+            continue
+        ranked = rank_match(participants_from_rows(game['rows']))
+        positions = {row[0]: i for i, row in enumerate(game['rows'])}
+
+        results = {}
+        for name, profile in profiles.items():
+            scores = score_rows(ranked['rows'], profile)
+            results[name] = (scores, rank_positions([score[0] for score in scores]))
+
+        for participant_index, lol_account_id, discord_id in game['linked']:
+            i = positions.get(participant_index)
+            if i is None:
+                continue
+            champion = game['rows'][i][12]
+            player = totals.setdefault(discord_id, {'games': 0, 'current': 0, 'candidate': 0})
+            player['games'] += 1
+
+            if results['current'][1][i] != results['candidate'][1][i]:
+                changed_placements += 1
+
+            for name in profiles:
+                # Valor salvo do jogador: score sem o bônus de vitória
+                score = results[name][0][i][1]
+                player[name] += score
+
+                recent = history[name].setdefault((lol_account_id, champion), [])
+                recent.append(score)
+                del recent[:-BAN_STREAK_GAMES]
+                if score < BAN_IMMEDIATE_SCORE or (
+                        len(recent) >= BAN_STREAK_GAMES and all(s < BAN_STREAK_SCORE for s in recent)):
+                    bans[name].add((lol_account_id, champion, game['match_id']))
+
+    ranking = {}
+    for discord_id, player in totals.items():
+        ranking[discord_id] = {
+            'games': player['games'],
+            'current': round(player['current'] / player['games'], 1),
+            'candidate': round(player['candidate'] / player['games'], 1),
+        }
+    for name in profiles:
+        ordered = sorted(ranking, key=lambda discord_id: -ranking[discord_id][name])
+        for position, discord_id in enumerate(ordered, 1):
+            ranking[discord_id][f'{name}_position'] = position
+
+    return {
+        'games': len(games),
+        'ranking': ranking,
+        'bans': bans,
+        'changed_placements': changed_placements,
+    }
+
+
+class ScoreboardCache:
+    """
+    Scoreboards já calculados, por match_id, durante a janela de processamento da partida.
+
+    Quando vários jogadores vinculados estão na mesma partida, o salvamento no banco, a edição
+    da mensagem de live game, a votação de MVP e a verificação de campeão leem o mesmo
+    scoreboard em vez de recalcular os 10 scores. Os rankings da partida são guardados uma vez
+    e cada perfil de pontuação usado (servidores com perfil próprio) ganha seu scoreboard.
+    Limitado por quantidade (LRU) e por tempo; os loops liberam a partida com release()
+    quando terminam de processá-la.
+    """
+
+    def __init__(self, max_entries: int = 64, ttl: int = 900):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # match_id -> [último uso, rank_match, {perfil: scoreboard}]
+        self._entries: OrderedDict = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'released': 0}
+
+    def _expire(self, now: float):
+        """Remove as partidas sem uso há mais de ttl segundos (as mais antigas ficam no início)"""
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if now - entry[0] < self.ttl:
+                break
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def get(self, match_data: Dict, profile: ScoringProfile = None) -> Dict:
+        """Scoreboard da partida no perfil (calcula só na primeira chamada dentro da janela)"""
+        profile = profile or DEFAULT_PROFILE
+        participants = match_data['info']['participants']
+        match_id = (match_data.get('metadata') or {}).get('matchId')
+        if not match_id:
+            return compute_scoreboard(participants, profile)
+
+        now = time.monotonic()
+        self._expire(now)
+
+        entry = self._entries.get(match_id)
+        if entry is None:
+            entry = [now, rank_match(participants), {}]
+            self._entries[match_id] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+        else:
+            entry[0] = now
+            self._entries.move_to_end(match_id)
+
+        scoreboard = entry[2].get(profile.key)
+        if scoreboard is not None:
+            self.stats['hits'] += 1
+            return scoreboard
+
+        scoreboard = compute_scoreboard(participants, profile, ranked=entry[1])
+        entry[2][profile.key] = scoreboard
+        self.stats['misses'] += 1
+        return scoreboard
+
+    def release(self, match_id: str):
+        """Remove a partida do cache (processamento concluído)"""
+        if self._entries.pop(match_id, None) is not None:
+            self.stats['released'] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, 'entries': len(self._entries)}
+
+
+def score_player(player_stats: Dict, all_players_stats: Dict, role: str = '') -> tuple:
+    """
+    Score de um jogador a partir das listas de métricas dos 10 jogadores
+    (interface de RiotAPI.calculate_mvp_score). Retorna (score, placement ponderado).
+    """
+    kda = player_stats['kda']
+    values = {
+        'kda': kda,
+        'kp': player_stats['kill_participation'],
+        'damage': player_stats['total_damage_to_champions'],
+        'gold': player_stats['gold_earned'],
+        'cs': player_stats['total_minions_killed'] + player_stats['neutral_minions_killed'],
+        'vision': player_stats['vision_score'],
+    }
+    columns = {
+        'kda': all_players_stats.get('all_kdas', [values['kda']]),
+        'kp': all_players_stats.get('all_kps', [values['kp']]),
+        'damage': all_players_stats.get('all_damages', [values['damage']]),
+        'gold': all_players_stats.get('all_golds', [values['gold']]),
+        'cs': all_players_stats.get('all_cs', [values['cs']]),
+        'vision': all_players_stats.get('all_visions', [values['vision']]),
+    }
+
+    # Pega o índice do jogador na lista (correspondência exata de todas as métricas; senão o primeiro)
+    player_index: Optional[int] = None
+    for i, row in enumerate(zip(*(columns[metric] for metric in METRICS))):
+        if row == tuple(values[metric] for metric in METRICS):
+            player_index = i
+            break
+    if player_index is None:
+        player_index = 0
+
+    norms = {}
+    ranks = {}
+    for metric in METRICS:
+        metric_values = columns[metric]
+        if len(metric_values) <= 1:
+            norms[metric], ranks[metric] = 1.0, 1
+        elif player_index < len(metric_values):
+            ranks[metric] = rank_positions(metric_values)[player_index]
+            norms[metric] = rank_to_norm(ranks[metric])
+        else:
+            norms[metric], ranks[metric] = 0.5, 5
+
+    return score_from_ranks(norms, ranks, role, kda,
+                            deaths=player_stats.get('deaths', 0), won=player_stats.get('win', False))
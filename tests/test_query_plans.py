@@ -0,0 +1,26 @@
+"""As consultas quentes do Database usam índice num banco novo (criado pelas migrações)"""
+import os
+
+from database import Database
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    db = Database(os.path.join(tmp_path, 'bot_lol.db'))
+    try:
+        assert db.check_query_plans() == {}
+    finally:
+        db.close()
+
+
+def test_hot_queries_run(tmp_path):
+    """O SQL compartilhado com os métodos é válido com os parâmetros de exemplo"""
+    db = Database(os.path.join(tmp_path, 'bot_lol.db'))
+    try:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        for name, sql, params in db.hot_queries():
+            cursor.execute(sql, params)
+            cursor.fetchall()
+        conn.close()
+    finally:
+        db.close()
@@ -0,0 +1,124 @@
+"""
+Equivalência do compute_scoreboard com o cálculo antigo (RiotAPI.calculate_mvp_score +
+extract_player_stats, antes do scoreboard por partida).
+
+As fixtures em tests/fixtures são partidas no formato match-v5 (só os campos usados pelo
+cálculo), montadas para cobrir: partida comum, empates (métricas iguais e duas linhas com as
+seis métricas idênticas, KDA sem mortes, suporte sem teamPosition), participante repetido e
+remake com quase tudo zerado. Os valores abaixo foram gerados rodando o código antigo nelas.
+"""
+import json
+import os
+
+import pytest
+
+from riot_api import RiotAPI
+from scoring import compute_scoreboard
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# Por participante, na ordem da partida:
+# (score salvo, placement salvo, mvp_score com bônus de vitória, weighted placement)
+# O score/placement salvos vêm do extract_player_stats antigo, que busca o primeiro participante
+# com o puuid; por isso a linha repetida repete os valores da primeira.
+LEGACY = {
+    'flex_normal': [
+        (75, 3, 80, 3.5),
+        (66, 4, 71, 4.35),
+        (78, 2, 83, 3.1500000000000004),
+        (52, 6, 57, 5.7),
+        (79, 1, 84, 3.05),
+        (43, 7, 43, 6.7),
+        (43, 8, 43, 6.649999999999999),
+        (37, 10, 37, 7.25),
+        (43, 9, 43, 6.7),
+        (66, 5, 66, 4.4),
+    ],
+    'flex_ties': [
+        (53, 6, 58, 5.599999999999999),
+        (74, 1, 79, 3.5999999999999996),
+        (62, 4, 67, 4.750000000000001),
+        (72, 2, 77, 3.7499999999999996),
+        (62, 5, 67, 4.75),
+        (51, 9, 51, 5.8999999999999995),
+        (58, 7, 58, 5.1499999999999995),
+        (58, 8, 58, 5.1499999999999995),
+        (24, 10, 24, 8.5),
+        (72, 3, 72, 3.8000000000000003),
+    ],
+    'flex_duplicate_row': [
+        (69, 2, 74, 4.1),
+        (27, 10, 32, 8.25),
+        (33, 9, 38, 7.6499999999999995),
+        (85, 1, 90, 2.45),
+        (47, 6, 52, 6.3),
+        (47, 7, 47, 6.3),
+        (61, 5, 61, 4.9),
+        (73, 3, 73, 3.6999999999999997),
+        (85, 1, 72, 3.7499999999999996),
+        (46, 8, 46, 6.400000000000001),
+    ],
+    'flex_remake': [
+        (92, 8, 92, 1.75),
+        (92, 9, 92, 1.75),
+        (95, 6, 95, 1.5),
+        (92, 10, 92, 1.75),
+        (93, 7, 93, 1.6500000000000001),
+        (92, 2, 97, 1.75),
+        (92, 3, 97, 1.75),
+        (92, 4, 97, 1.75),
+        (92, 5, 97, 1.75),
+        (93, 1, 98, 1.6500000000000001),
+    ],
+}
+
+
+def load_match(name: str) -> dict:
+    with open(os.path.join(FIXTURES_DIR, f'{name}.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize('name', sorted(LEGACY))
+def test_scoreboard_matches_legacy_scores(name):
+    match = load_match(name)
+    participants = match['info']['participants']
+    scoreboard = compute_scoreboard(participants)
+
+    for i, (saved_score, saved_placement, mvp_score, weighted_placement) in enumerate(LEGACY[name]):
+        entry = scoreboard['players'][i]
+        assert entry['mvp_score'] == mvp_score, f'{name}[{i}] mvp_score'
+        assert entry['weighted_placement'] == weighted_placement, f'{name}[{i}] weighted_placement'
+
+        saved = scoreboard['by_puuid'][participants[i]['puuid']]
+        assert saved['base_score'] == saved_score, f'{name}[{i}] base_score'
+        assert saved['placement'] == saved_placement, f'{name}[{i}] placement'
+
+
+@pytest.mark.parametrize('name', sorted(LEGACY))
+def test_extract_player_stats_matches_legacy(name):
+    match = load_match(name)
+    api = RiotAPI('test-key')
+
+    for i, p in enumerate(match['info']['participants']):
+        saved_score, saved_placement, _, _ = LEGACY[name][i]
+        stats = api.extract_player_stats(match, p['puuid'])
+        assert stats['mvp_score'] == saved_score, f'{name}[{i}] mvp_score'
+        assert stats['mvp_placement'] == saved_placement, f'{name}[{i}] mvp_placement'
+
+
+def test_saved_score_has_no_win_bonus():
+    """O score salvo nunca teve o bônus de vitória; só o placement usa o score completo"""
+    scoreboard = compute_scoreboard(load_match('flex_normal')['info']['participants'])
+    for entry in scoreboard['players']:
+        if entry['win']:
+            assert entry['mvp_score'] > entry['base_score']
+        else:
+            assert entry['mvp_score'] == entry['base_score']
+
+
+def test_identical_rows_share_ranks_and_split_placement_by_index():
+    scoreboard = compute_scoreboard(load_match('flex_ties')['info']['participants'])
+    first, second = scoreboard['players'][6], scoreboard['players'][7]
+    assert first['mvp_score'] == second['mvp_score']
+    assert first['weighted_placement'] == second['weighted_placement']
+    assert (first['placement'], second['placement']) == (7, 8)